@@ -0,0 +1,150 @@
+import json
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal
+
+# Rough chars-per-token ratio for English/JSON text
+CHARS_PER_TOKEN = 4
+
+# Stop tracking new values for a column past this many distinct ones
+# (names, emails...) so memory stays bounded on large results
+MAX_TRACKED_VALUES = 1000
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+def _order_kind(value):
+    """Values of the same kind compare with < (dates don't with datetimes, naive datetimes don't with aware ones)."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return "number"
+    if isinstance(value, datetime):
+        return "datetime" if value.tzinfo is None else "datetime_tz"
+    if isinstance(value, date):
+        return "date"
+    return None
+
+
+class _ColumnStats:
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.numeric = 0
+        self.total = 0.0
+        self.kind = None
+        self.min = None
+        self.max = None
+        self.values = Counter()
+        self.overflow = False
+
+    def add(self, value):
+        self.count += 1
+        if value is None:
+            self.nulls += 1
+            return
+
+        kind = _order_kind(value)
+        if kind:
+            if kind == "number":
+                self.numeric += 1
+                self.total += float(value)
+            # min/max over the column's first kind of value only
+            if self.kind is None:
+                self.kind = kind
+            if kind == self.kind:
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+            return
+
+        try:
+            hash(value)
+        except TypeError:
+            # Arrays and JSON columns: counted by their serialized form
+            value = _dumps(value)
+        if value in self.values or len(self.values) < MAX_TRACKED_VALUES:
+            self.values[value] += 1
+        else:
+            self.overflow = True
+
+    def summary(self, top_k):
+        present = self.count - self.nulls
+        out = {"nulls": self.nulls} if self.nulls else {}
+        if self.min is not None:
+            out.update({"min": self.min, "max": self.max})
+            if self.numeric:
+                out["mean"] = round(self.total / self.numeric, 2)
+        elif self.values:
+            distinct = len(self.values)
+            out["distinct"] = f">{distinct}" if self.overflow else distinct
+            # Only worth listing if values actually repeat
+            if distinct < present:
+                out["top"] = self.values.most_common(top_k)
+        return out
+
+
+def summarize_rows(rows: list, top_k: int = 5):
+    """Per-column statistics over a list of row dicts, in one pass over the rows."""
+    columns = {}
+    for row in rows:
+        for name, value in row.items():
+            stats = columns.get(name)
+            if stats is None:
+                stats = columns[name] = _ColumnStats()
+            stats.add(value)
+    return {name: stats.summary(top_k) for name, stats in columns.items()}
+
+
+def _sample_indices(n, k):
+    """k indices spread evenly over range(n), always including the first row."""
+    if k >= n:
+        return list(range(n))
+    step = n / k
+    return [int(i * step) for i in range(k)]
+
+
+def compact_result(data, token_budget: int, max_sample_rows: int) -> str:
+    """
+    Render a query result for the reasoner prompt within roughly `token_budget`
+    tokens. Small results are included as-is; larger ones are replaced by
+    column statistics plus an evenly spaced sample of rows.
+    """
+    if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+        return _dumps(data)
+
+    # Stops serializing as soon as the budget is exceeded
+    rendered, used = [], 0
+    for row in data:
+        row_json = _dumps(row)
+        used += estimate_tokens(row_json)
+        if used > token_budget:
+            break
+        rendered.append(row_json)
+    else:
+        return f"Total rows: {len(data)}\n[{','.join(rendered)}]"
+
+    stats = _dumps(summarize_rows(data))
+    budget = token_budget - estimate_tokens(stats)
+
+    sample = []
+    for i in _sample_indices(len(data), max_sample_rows):
+        row = _dumps(data[i])
+        cost = estimate_tokens(row)
+        if cost > budget:
+            break
+        sample.append(row)
+        budget -= cost
+
+    return (
+        f"Total rows: {len(data)} (showing {len(sample)} sample rows)\n"
+        f"Column summary:\n{stats}\n"
+        f"Sample rows:\n[{','.join(sample)}]"
+    )
@@ -1,18 +1,165 @@
-from app.mcp.tools import TOOLS
+import asyncio
+from app.mcp.tools import PAGED_TOOLS, TOOLS, TOOL_SQL, UNTRUSTED_SQL_TOOLS
+from app.database.db_executor import Rejection, RowStream, execute_offset_page, execute_page, run_db_task
 from app.utils.logger import get_logger
+from app.core.config import settings
 
 logger = get_logger(__name__)
 
+class PagingNotSupported(Exception):
+    """A page was asked for a plan whose result can't be paged."""
+
 class ExecutorAgent:
     """
     Executes the tool selected by the Planner.
     Safety: Only runs tools defined in the TOOLS whitelist.
+
+    Multi-step plans ({"steps": [{"id", "tool", "parameters"}]}) are
+    independent tool calls, run concurrently. "data" is then {step id: rows}.
     """
     
     def __init__(self):
         self.tools = TOOLS # Whitelist
 
     def execute(self, plan: dict):
+        if "steps" in plan:
+            return self._execute_steps(plan["steps"])
+
+        call = self._resolve_call(plan)
+        if "error" in call:
+            return call
+
+        try:
+            # Run the tool
+            result = call["func"](call["arg"])
+            return self._success(call["tool"], result)
+
+        except Exception as e:
+            logger.error(f"Tool execution failed: {e}")
+            return {"error": f"Execution error: {str(e)}"}
+
+    async def execute_async(self, plan: dict):
+        """Same as execute(), but runs the tool on the DB worker threads."""
+        if "steps" in plan:
+            return await self._execute_steps_async(plan["steps"])
+
+        call = self._resolve_call(plan)
+        if "error" in call:
+            return call
+
+        try:
+            result = await run_db_task(call["func"], call["arg"])
+            return self._success(call["tool"], result)
+
+        except Exception as e:
+            logger.error(f"Tool execution failed: {e}")
+            return {"error": f"Execution error: {str(e)}"}
+
+    async def execute_page_async(self, plan: dict, page_size: int, after=None):
+        """
+        One page of the tool's result. On success "next_after" is where the
+        next page starts (None on the last page). The lookups in PAGED_TOOLS
+        are read by keyset (db_executor.execute_page, `after` is the last
+        id); other tools, whose rows have no unique id, by position
+        (execute_offset_page, `after` is the row offset).
+        Raises PagingNotSupported for multi-step plans.
+        """
+        if "steps" in plan:
+            raise PagingNotSupported("Paging isn't supported for questions planned as several steps")
+
+        call = self._resolve_call(plan)
+        if "error" in call:
+            return call
+
+        query, params = TOOL_SQL[call["tool"]](call["arg"])
+        try:
+            if call["tool"] in PAGED_TOOLS:
+                page = await run_db_task(execute_page, query, params, page_size, after)
+            else:
+                untrusted = call["tool"] in UNTRUSTED_SQL_TOOLS
+                page = await run_db_task(execute_offset_page, query, params, page_size, after or 0, untrusted)
+        except Exception as e:
+            logger.error(f"Tool execution failed: {e}")
+            return {"error": f"Execution error: {str(e)}"}
+
+        result = self._success(call["tool"], page)
+        if "error" not in result:
+            # A DB error comes back as a plain list, with no next page
+            result["next_after"] = getattr(page, "next_after", None)
+        return result
+
+    def stream(self, plan: dict, **limits):
+        """
+        Like execute(), but returns a RowStream over the tool's SQL so rows can
+        be forwarded batch by batch. `limits` (max_rows, max_bytes) override the
+        default caps. Returns an error dict if the plan is invalid.
+        """
+        if "steps" in plan:
+            return {"error": "Streaming rows needs a single-tool plan"}
+
+        call = self._resolve_call(plan)
+        if "error" in call:
+            return call
+
+        query, params = TOOL_SQL[call["tool"]](call["arg"])
+        untrusted = call["tool"] in UNTRUSTED_SQL_TOOLS
+        return RowStream(query, params, untrusted=untrusted, **limits)
+
+    def _execute_steps(self, steps):
+        """Sync version of _execute_steps_async(): one step at a time."""
+        by_id = self._steps_by_id(steps)
+        if "error" in by_id:
+            return by_id
+        return self._merge_steps({step_id: self.execute(step) for step_id, step in by_id.items()})
+
+    async def _execute_steps_async(self, steps):
+        """The steps run concurrently, so a plan takes as long as its slowest step."""
+        by_id = self._steps_by_id(steps)
+        if "error" in by_id:
+            return by_id
+        done = await asyncio.gather(*(self.execute_async(step) for step in by_id.values()))
+        return self._merge_steps(dict(zip(by_id, done)))
+
+    def _steps_by_id(self, steps):
+        """Validate a multi-step plan: {step id: single-tool plan}, or an error dict."""
+        if not isinstance(steps, list) or not steps:
+            return {"error": "Plan has no steps"}
+        if len(steps) > settings.PLAN_MAX_STEPS:
+            return {"error": f"Plan has {len(steps)} steps, the limit is {settings.PLAN_MAX_STEPS}"}
+
+        by_id = {}
+        for i, step in enumerate(steps):
+            if not isinstance(step, dict):
+                return {"error": "Invalid plan step"}
+            step_id = str(step.get("id") or f"step{i + 1}")
+            if step_id in by_id:
+                return {"error": f"Duplicate step id '{step_id}'"}
+            # Only single-tool steps: no nesting
+            by_id[step_id] = {"tool": step.get("tool"), "parameters": step.get("parameters", {})}
+        return by_id
+
+    def _merge_steps(self, results):
+        # One rejected query sends the whole plan back to the planner
+        for result in results.values():
+            if "rejection" in result:
+                return result
+
+        failed = {step_id: r["error"] for step_id, r in results.items() if "error" in r}
+        if len(failed) == len(results):
+            return {"error": "; ".join(f"{step_id}: {error}" for step_id, error in failed.items())}
+
+        # A failed step is reported in place of its rows so the rest still get explained
+        return {
+            "status": "success",
+            "tool": [r.get("tool") for r in results.values() if "error" not in r],
+            "data": {
+                step_id: {"error": r["error"]} if "error" in r else r["data"]
+                for step_id, r in results.items()
+            }
+        }
+
+    def _resolve_call(self, plan: dict):
+        """Validate the plan against the whitelist and pick out the tool argument."""
         tool_name = plan.get("tool")
         if not tool_name:
             return {"error": "No tool selected"}
@@ -22,30 +169,28 @@ class ExecutorAgent:
         if tool_name not in self.tools:
             return {"error": f"Tool '{tool_name}' is not allowed"}
 
-        try:
-            func = self.tools[tool_name]
-            params = plan.get("parameters", {})
-            
-            # Simple parameter extraction
-            # We assume the tool takes exactly one argument for this POC
-            if isinstance(params, dict) and params:
-                arg_val = list(params.values())[0]
-            elif isinstance(params, list) and params:
-                arg_val = params[0]
-            elif isinstance(params, str):
-                arg_val = params
-            else:
-                return {"error": "Missing parameters"}
+        params = plan.get("parameters", {})
+        
+        # Simple parameter extraction
+        # We assume the tool takes exactly one argument for this POC
+        if isinstance(params, dict) and params:
+            arg_val = list(params.values())[0]
+        elif isinstance(params, list) and params:
+            arg_val = params[0]
+        elif isinstance(params, str):
+            arg_val = params
+        else:
+            return {"error": "Missing parameters"}
 
-            # Run the tool
-            result = func(arg_val)
-            
-            return {
-                "status": "success",
-                "tool": tool_name,
-                "data": result
-            }
+        return {"tool": tool_name, "func": self.tools[tool_name], "arg": arg_val}
 
-        except Exception as e:
-            logger.error(f"Tool execution failed: {e}")
-            return {"error": f"Execution error: {str(e)}"}
+    def _success(self, tool_name, result):
+        # The SQL guard refused the query: surface it so the plan can be retried
+        if isinstance(result, Rejection):
+            return {"error": result.error["error"], "rejection": result.error}
+
+        return {
+            "status": "success",
+            "tool": tool_name,
+            "data": result
+        }
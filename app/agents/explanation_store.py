@@ -0,0 +1,146 @@
+import asyncio
+import time
+import uuid
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Job:
+    def __init__(self, task, expires_at):
+        self.task = task
+        self.expires_at = expires_at
+        self.expiry = None  # TimerHandle
+        self.unclaimed = None  # TimerHandle, until the first get()
+
+
+class ExplanationStore:
+    """
+    Explanations computed in the background for deferred /query responses.
+
+    Jobs run as event-loop tasks, at most `workers` at a time; past
+    `max_pending` unfinished jobs new submissions are refused. Each job is
+    kept for `ttl_seconds` after submission: whatever nobody fetched by then
+    is dropped, and cancelled if it's still queued or running. A job nobody
+    has asked about within `unclaimed_seconds` is cancelled early, so clients
+    that never fetch explanations don't keep the workers busy.
+    """
+
+    def __init__(self, workers: int, max_pending: int, ttl_seconds: float, unclaimed_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.unclaimed_seconds = unclaimed_seconds
+        self.max_pending = max_pending
+        self._workers = asyncio.Semaphore(workers)
+        self._jobs = {}
+        self.submitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.abandoned = 0
+        self.cancelled = 0
+
+    def submit(self, make_coro):
+        """
+        Schedule `make_coro()` (a coroutine function returning the explanation).
+        Returns the explanation id, or None if too many jobs are pending.
+        Must be called from the event loop.
+        """
+        if self.pending() >= self.max_pending:
+            self.rejected += 1
+            logger.warning("Explanation queue full, not deferring")
+            return None
+
+        explanation_id = uuid.uuid4().hex
+        task = asyncio.ensure_future(self._run(make_coro))
+        task.add_done_callback(_mark_retrieved)
+
+        job = self._jobs[explanation_id] = _Job(task, time.monotonic() + self.ttl_seconds)
+        loop = asyncio.get_running_loop()
+        job.expiry = loop.call_later(self.ttl_seconds, self._expire, explanation_id)
+        if self.unclaimed_seconds < self.ttl_seconds:
+            job.unclaimed = loop.call_later(self.unclaimed_seconds, self._abandon, explanation_id)
+        self.submitted += 1
+        return explanation_id
+
+    async def get(self, explanation_id: str, wait: float = 0):
+        """
+        Status of a job: {"status": "pending" | "done" | "error", ...}, or
+        None if the id is unknown or expired. Waits up to `wait` seconds for
+        a pending job to finish.
+        """
+        job = self._jobs.get(explanation_id)
+        if job is None:
+            return None
+        if job.unclaimed is not None:
+            job.unclaimed.cancel()
+            job.unclaimed = None
+
+        if wait and not job.task.done():
+            # shield: a client giving up must not cancel the job itself
+            try:
+                await asyncio.wait_for(asyncio.shield(job.task), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            except Exception:
+                pass  # reported below from the task itself
+
+        task = job.task
+        out = {"id": explanation_id, "expires_in": round(max(job.expires_at - time.monotonic(), 0), 1)}
+        if not task.done():
+            return {**out, "status": "pending"}
+        if task.cancelled():
+            return {**out, "status": "error", "error": "Explanation was cancelled"}
+        if task.exception() is not None:
+            return {**out, "status": "error", "error": str(task.exception())}
+        return {**out, "status": "done", "explanation": task.result()}
+
+    def pending(self):
+        return sum(1 for job in self._jobs.values() if not job.task.done())
+
+    def close(self):
+        """Cancel every job (called on shutdown)."""
+        for explanation_id in list(self._jobs):
+            self._drop(explanation_id)
+
+    def stats(self):
+        return {
+            "stored": len(self._jobs),
+            "pending": self.pending(),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "abandoned": self.abandoned,
+            "cancelled": self.cancelled,
+        }
+
+    async def _run(self, make_coro):
+        async with self._workers:
+            return await make_coro()
+
+    def _expire(self, explanation_id):
+        if explanation_id in self._jobs:
+            self.expired += 1
+            self._drop(explanation_id)
+
+    def _abandon(self, explanation_id):
+        # Never polled: a finished explanation stays until the TTL, an
+        # unfinished one isn't worth finishing
+        job = self._jobs.get(explanation_id)
+        if job is not None and not job.task.done():
+            self.abandoned += 1
+            self._drop(explanation_id)
+
+    def _drop(self, explanation_id):
+        job = self._jobs.pop(explanation_id)
+        job.expiry.cancel()
+        if job.unclaimed is not None:
+            job.unclaimed.cancel()
+        if not job.task.done():
+            # Nobody collected it in time: stop spending LLM time on it
+            job.task.cancel()
+            self.cancelled += 1
+
+
+def _mark_retrieved(task):
+    # Exceptions are reported through get(); don't log "never retrieved"
+    if not task.cancelled():
+        task.exception()
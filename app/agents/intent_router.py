@@ -0,0 +1,271 @@
+import math
+import re
+from collections import Counter
+from app.agents.plan_cache import SLOT_VALUES, extract_slots
+from app.database.db_executor import ALL_GROUPS
+from app.mcp.tools import AGGREGATE_TOOLS
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Example phrasings per tool. They are indexed by their extract_slots() shape,
+# so one phrasing covers every department / status / priority value.
+INTENT_EXAMPLES = {
+    "get_employees_by_department": [
+        "employees in AI",
+        "show employees in the Backend department",
+        "who works in Frontend",
+        "list all DevOps employees",
+        "people in the AI team",
+        "members of the Backend team",
+        "staff in the Frontend department",
+        "who is on the DevOps team",
+        "AI department employees",
+        "get employees by department Backend",
+        "which employees belong to Frontend",
+        "find engineers working in DevOps",
+        "everyone in the AI department",
+    ],
+    "get_projects_by_status": [
+        "projects in progress",
+        "show completed projects",
+        "list projects in planning",
+        "which projects are completed",
+        "projects with status In Progress",
+        "what projects are still in planning",
+        "get projects by status Completed",
+        "ongoing projects that are in progress",
+        "find all finished projects that are completed",
+        "projects currently in progress",
+        "projects in the planning phase",
+        "which projects are completed right now",
+    ],
+    "get_issues_by_priority": [
+        "critical issues",
+        "show high priority issues",
+        "list low priority issues",
+        "which issues are critical",
+        "issues with priority Medium",
+        "get issues by priority High",
+        "open bugs with critical priority",
+        "find all medium priority tickets",
+        "what are the high priority issues",
+        "tickets marked low priority",
+    ],
+    "get_department_stats": [
+        "average salary by department",
+        "average salary per department",
+        "average salary in each department",
+        "how many employees are there",
+        "how many employees in each department",
+        "headcount per department",
+        "total salary of the AI department",
+        "average salary in Backend",
+        "number of employees in Frontend",
+        "how many people work in DevOps",
+    ],
+    "get_project_stats": [
+        "total budget of all projects",
+        "total budget of projects in progress",
+        "average project budget by status",
+        "how many projects are completed",
+        "number of projects per status",
+        "count projects in planning",
+    ],
+    "get_issue_stats": [
+        "open issues per priority",
+        "how many issues per priority",
+        "number of critical issues",
+        "count high priority issues by status",
+        "how many low priority tickets are open",
+        "issue counts by priority and status",
+    ],
+    # Questions the fixed tools can't answer. A query that lands here is
+    # left to the LLM, which can write SQL for it.
+    "run_sql_query": [
+        "employees with salary above 90000",
+        "who earns more than 100000",
+        "highest paid employees",
+        "projects with budget over 200000",
+        "count issues per project",
+        "employees hired after 2022",
+        "issues assigned to Bob Smith",
+        "which employee leads the most projects",
+        "projects ending this year",
+        "inactive employees",
+        "issues due next week",
+        "employees in AI with critical issues",
+        "projects with the most open issues",
+    ],
+}
+
+# Negated filters ("employees not in AI") look like a tool match but need SQL
+_NEGATION_RE = re.compile(r"\b(?:not|except|without|excluding|other|outside|besides)\b")
+# So do aggregates ("how many projects are completed"), unless they matched
+# one of the stats tools
+_AGGREGATE_RE = re.compile(r"\b(?:how many|count|number of|average|avg|total|sum|most|least|top)\b")
+
+# The table each tool reads and the words naming its rows. A query that also
+# names another table ("issues assigned to employees in Backend") relates
+# the two, which only SQL can do
+_TOOL_TABLE = {
+    "get_employees_by_department": "employees",
+    "get_department_stats": "employees",
+    "get_projects_by_status": "projects",
+    "get_project_stats": "projects",
+    "get_issues_by_priority": "issues",
+    "get_issue_stats": "issues",
+}
+_TABLE_WORDS = {
+    "employees": re.compile(r"\b(?:employees?|people|staff|engineers?|members?|salar(?:y|ies)|headcount)\b"),
+    "projects": re.compile(r"\b(?:projects?|budgets?)\b"),
+    "issues": re.compile(r"\b(?:issues?|tickets?|bugs?)\b"),
+}
+
+NGRAM_SIZES = (3, 4, 5)
+
+
+def _ngrams(text: str) -> Counter:
+    padded = f" {text} "
+    grams = Counter()
+    for n in NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            grams[padded[i:i + n]] += 1
+    return grams
+
+
+class IntentRouter:
+    """
+    Nearest-neighbour intent classifier that answers simple queries without
+    the LLM.
+
+    Queries and examples are reduced to their extract_slots() shape and
+    compared as TF-IDF weighted character n-gram vectors (cosine similarity).
+    A plan is only returned for a fixed tool whose argument was found among
+    the query's slots (a stats tool without one covers every group), whose
+    best example scores at least `threshold` and whose examples use every
+    word of the query. Everything else (no slot, numbers, negations, values
+    for several tools, rows of another table, words the tool can't act on)
+    is left to the LLM.
+    """
+
+    def __init__(self, tools_schema: dict, threshold: float, examples: dict = None):
+        self.threshold = threshold
+        self.routed = 0
+        self.deferred = 0
+
+        # Tools whose single argument is one of the slot kinds
+        self._slot_for = {
+            tool: spec["args"][0]
+            for tool, spec in tools_schema.items()
+            if len(spec.get("args", [])) == 1 and spec["args"][0] in SLOT_VALUES
+        }
+
+        docs, labels = [], []
+        # Words each tool's examples use, see _explained()
+        self._vocab = {}
+        for tool, phrases in (examples or INTENT_EXAMPLES).items():
+            if tool not in tools_schema:
+                continue
+            for phrase in phrases:
+                shape = extract_slots(phrase)[0]
+                docs.append(_ngrams(shape))
+                labels.append(tool)
+                self._vocab.setdefault(tool, set()).update(shape.split())
+
+        self._labels = labels
+        counts = Counter(gram for doc in docs for gram in doc)
+        self._idf = {
+            gram: math.log((1 + len(docs)) / (1 + count)) + 1
+            for gram, count in counts.items()
+        }
+        # Inverted index: n-gram -> [(example index, weight)]
+        self._postings = {}
+        for i, doc in enumerate(docs):
+            for gram, weight in self._vector(doc).items():
+                self._postings.setdefault(gram, []).append((i, weight))
+
+    def classify(self, query: str):
+        """Returns (tool, score, slots) for the closest example."""
+        shape, slots = extract_slots(query)
+        vector = self._vector(_ngrams(shape))
+
+        scores = Counter()
+        for gram, weight in vector.items():
+            for i, example_weight in self._postings.get(gram, ()):
+                scores[i] += weight * example_weight
+        if not scores:
+            return None, 0.0, slots
+
+        best, score = scores.most_common(1)[0]
+        return self._labels[best], score, slots
+
+    def route(self, query: str):
+        """A plan for the query if the match is confident, else None."""
+        tool, score, slots = self.classify(query)
+        plan = self._plan(query, tool, score, slots)
+        if plan is None:
+            self.deferred += 1
+            return None
+
+        self.routed += 1
+        logger.info(f"Intent router: {tool} (score {score:.2f}) with params: {plan['parameters']}")
+        return plan
+
+    def stats(self):
+        total = self.routed + self.deferred
+        return {
+            "threshold": self.threshold,
+            "routed": self.routed,
+            "deferred": self.deferred,
+            "routed_rate": round(self.routed / total, 3) if total else 0.0,
+        }
+
+    def _plan(self, query, tool, score, slots):
+        arg = self._slot_for.get(tool)
+        if arg is None or score < self.threshold:
+            return None
+        aggregate = tool in AGGREGATE_TOOLS
+        # A stats tool without a group covers every group
+        if arg not in slots and not aggregate:
+            return None
+        # Anything the tool's examples don't say ("... led by Alice", "...
+        # hired this year") is a condition the tool would silently drop
+        if not self._explained(tool, query):
+            return None
+        if _NEGATION_RE.search(query.lower()) or (not aggregate and _AGGREGATE_RE.search(query.lower())):
+            return None
+        # Numbers or values meant for another tool need SQL the fixed tools can't express
+        for kind in slots:
+            if kind != arg:
+                return None
+        table = _TOOL_TABLE.get(tool)
+        for other, words in _TABLE_WORDS.items():
+            if other != table and words.search(query.lower()):
+                return None
+
+        return {
+            "tool": tool,
+            # A stats question naming no group is about all of them
+            "parameters": {arg: slots.get(arg, ALL_GROUPS)},
+            "reasoning": f"Intent router match (score {score:.2f})."
+        }
+
+    def _explained(self, tool, query):
+        """
+        Whether every word of the query's shape appears in the tool's
+        examples. The tool only takes its one slot, so any other word may be
+        a filter it can't apply: such questions are left to the LLM.
+        """
+        vocab = self._vocab.get(tool, set())
+        return all(len(word) < 2 or word in vocab for word in extract_slots(query)[0].split())
+
+    def _vector(self, grams):
+        # N-grams never seen in the examples get the highest idf, so unfamiliar
+        # wording lowers the similarity instead of being ignored
+        unseen_idf = math.log(1 + len(self._labels)) + 1
+        vector = {gram: tf * self._idf.get(gram, unseen_idf) for gram, tf in grams.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        if not norm:
+            return {}
+        return {gram: w / norm for gram, w in vector.items()}
@@ -1,11 +1,22 @@
+import asyncio
 import json
+import threading
+from contextlib import contextmanager
+import httpx
 import requests
 import re
+import time
+from requests.adapters import HTTPAdapter
 from app.utils.logger import get_logger
+from app.utils.metrics import LLM_ERRORS, LLM_SECONDS, LLM_TOKENS
+from app.utils.singleflight import SingleFlight
 from app.core.config import settings
 
 logger = get_logger(__name__)
 
+# Identical prompts in flight at the same time share one generation
+_generate_flight = SingleFlight("llm_generate")
+
 class LLMProvider:
     """
     Unified interface for different LLM backends (Mock, Ollama, OpenAI).
@@ -19,9 +30,45 @@ class LLMProvider:
         self.ollama_url = settings.OLLAMA_URL
         self.ollama_timeout = settings.OLLAMA_TIMEOUT_SECONDS
         self.openai_key = settings.OPENAI_API_KEY
+        # Short read timeout so we fail fast and use fallback logic if the API is slow/broken
+        self.openai_timeout = settings.OPENAI_TIMEOUT_SECONDS
+        self.connect_timeout = settings.LLM_CONNECT_TIMEOUT_SECONDS
+        self.pool_size = settings.LLM_POOL_SIZE
+
+        # Long-lived keep-alive clients, created on first use
+        self._lock = threading.Lock()
+        self._session = None
+        self._openai_client = None
+        self._async_state = None
+        self._sync_limit = threading.BoundedSemaphore(self._max_concurrency())
+
+        # Prompt evaluation reported by Ollama; a low tokens/call ratio means
+        # the shared prompt prefix is being served from the KV cache
+        self.prompt_eval = {"calls": 0, "tokens": 0, "ms": 0.0}
     
     def generate(self, prompt: str) -> str:
         """Dispatch query to the configured provider."""
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return self._generate(prompt)
+        key = (self.provider, self.model, prompt)
+        return _generate_flight.do_sync(key, lambda: self._generate(prompt))
+
+    async def generate_async(self, prompt: str) -> str:
+        """Non-blocking variant of generate() for the async API path."""
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return await self._generate_async(prompt)
+        key = (self.provider, self.model, prompt)
+        return await _generate_flight.do(key, lambda: self._generate_async(prompt))
+
+    def _generate(self, prompt: str) -> str:
+        with self._observe():
+            return self._dispatch(prompt)
+
+    async def _generate_async(self, prompt: str) -> str:
+        with self._observe():
+            return await self._dispatch_async(prompt)
+
+    def _dispatch(self, prompt: str) -> str:
         if self.provider == "mock":
             return self._mock_response(prompt)
         elif self.provider == "ollama":
@@ -31,6 +78,189 @@ class LLMProvider:
         else:
             raise ValueError(f"Unknown LLM provider: {self.provider}")
 
+    async def _dispatch_async(self, prompt: str) -> str:
+        if self.provider == "mock":
+            return self._mock_response(prompt)
+        elif self.provider == "ollama":
+            return await self._call_ollama_async(prompt)
+        elif self.provider == "openai":
+            return await self._call_openai_async(prompt)
+        else:
+            raise ValueError(f"Unknown LLM provider: {self.provider}")
+
+    async def stream_async(self, prompt: str):
+        """Yield the generation in chunks as the backend produces them."""
+        with self._observe():
+            async for chunk in self._dispatch_stream(prompt):
+                yield chunk
+
+    async def _dispatch_stream(self, prompt: str):
+        if self.provider == "mock":
+            for word in self._mock_response(prompt).split(" "):
+                yield word + " "
+        elif self.provider == "ollama":
+            async for chunk in self._stream_ollama(prompt):
+                yield chunk
+        elif self.provider == "openai":
+            async for chunk in self._stream_openai(prompt):
+                yield chunk
+        else:
+            raise ValueError(f"Unknown LLM provider: {self.provider}")
+
+    @contextmanager
+    def _observe(self):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            LLM_ERRORS.labels(self.provider, self.model).inc()
+            raise
+        finally:
+            LLM_SECONDS.labels(self.provider, self.model).observe(time.perf_counter() - start)
+
+    def _record_tokens(self, prompt_tokens, completion_tokens):
+        if prompt_tokens:
+            LLM_TOKENS.labels(self.provider, self.model, "prompt").inc(prompt_tokens)
+        if completion_tokens:
+            LLM_TOKENS.labels(self.provider, self.model, "completion").inc(completion_tokens)
+
+    # --- Pooled Clients ---
+
+    def _max_concurrency(self):
+        if self.provider == "openai":
+            return settings.OPENAI_MAX_CONCURRENCY
+        return settings.OLLAMA_MAX_CONCURRENCY
+
+    def _http_session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def _openai(self):
+        with self._lock:
+            if self._openai_client is None:
+                from openai import OpenAI
+                self._openai_client = OpenAI(
+                    api_key=self.openai_key,
+                    timeout=httpx.Timeout(self.openai_timeout, connect=self.connect_timeout),
+                    http_client=httpx.Client(limits=self._httpx_limits())
+                )
+            return self._openai_client
+
+    def _async_clients(self):
+        """
+        Async clients and the concurrency semaphore for the running event loop.
+        They can't be shared across loops, so a new loop (e.g. a second
+        asyncio.run() in a script) gets a fresh set, closed along with its
+        loop (see _close_with_loop).
+        """
+        loop = asyncio.get_running_loop()
+        state = self._async_state
+        if state is None or state["loop"] is not loop:
+            if state is not None:
+                self._retire_async_state(state)
+            state = self._async_state = {
+                "loop": loop,
+                "http": httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.ollama_timeout, connect=self.connect_timeout),
+                    limits=self._httpx_limits()
+                ),
+                "openai": None,
+                "limit": asyncio.Semaphore(self._max_concurrency()),
+                "closed": False,
+            }
+            state["closer"] = self._close_with_loop(state)
+            asyncio.ensure_future(state["closer"].asend(None))
+        if self.provider == "openai" and state["openai"] is None:
+            from openai import AsyncOpenAI
+            state["openai"] = AsyncOpenAI(
+                api_key=self.openai_key,
+                timeout=httpx.Timeout(self.openai_timeout, connect=self.connect_timeout),
+                http_client=httpx.AsyncClient(limits=self._httpx_limits())
+            )
+        return state
+
+    async def _close_with_loop(self, state):
+        # Parked at the yield for the life of the loop. asyncio.run() (any
+        # loop.shutdown_asyncgens()) closes pending async generators before
+        # the loop closes, which runs the finally on the clients' own loop.
+        try:
+            yield
+        finally:
+            await self._aclose_async_state(state)
+
+    def _retire_async_state(self, state):
+        """
+        Clients of a loop other than the running one. A loop that ended
+        through asyncio.run() has closed them already; one still running in
+        another thread closes them there.
+        """
+        old_loop = state["loop"]
+        if not state["closed"] and old_loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._aclose_async_state(state), old_loop)
+
+    @staticmethod
+    async def _aclose_async_state(state):
+        if state["closed"]:
+            return
+        state["closed"] = True
+        await state["http"].aclose()
+        if state["openai"] is not None:
+            await state["openai"].close()
+
+    async def warm_up_async(self):
+        """
+        Pay the first call's one-off costs up front: SDK import, client pools
+        and, for Ollama, loading the model with a one-token generation.
+        """
+        if self.provider == "mock":
+            return
+        clients = self._async_clients()
+        if self.provider == "ollama":
+            logger.info(f"Ollama ({self.model}): Loading model...")
+            payload = {**self._ollama_payload("Hi", stream=False), "options": {"num_predict": 1}}
+            async with clients["limit"]:
+                res = await clients["http"].post(self.ollama_url, json=payload)
+            res.raise_for_status()
+
+    def _httpx_limits(self):
+        return httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+
+    def stats(self):
+        calls = self.prompt_eval["calls"]
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "prompt_eval_calls": calls,
+            "prompt_eval_avg_tokens": round(self.prompt_eval["tokens"] / calls, 1) if calls else None,
+            "prompt_eval_avg_ms": round(self.prompt_eval["ms"] / calls, 1) if calls else None,
+        }
+
+    def close(self):
+        """Close the sync clients. Safe to call more than once."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._openai_client is not None:
+                self._openai_client.close()
+                self._openai_client = None
+
+    async def aclose(self):
+        """Close every client, including the async ones (FastAPI shutdown)."""
+        self.close()
+        state, self._async_state = self._async_state, None
+        if state is not None and state["loop"] is asyncio.get_running_loop():
+            await state["closer"].aclose()
+            await self._aclose_async_state(state)  # if the closer never started
+        elif state is not None:
+            self._retire_async_state(state)
+
     def _mock_response(self, prompt: str) -> str:
         """
         Simulates an LLM for testing without running a real model.
@@ -48,6 +278,11 @@ class LLMProvider:
             id_count = len(re.findall(r'"id":', prompt_lower))
             name_count = len(re.findall(r'"name":', prompt_lower))
             count = max(id_count, name_count)
+            # Large results are summarized, so trust the stated total over the visible rows
+            # (one "Total rows" per step for multi-step plans)
+            totals = re.findall(r'total rows: (\d+)', prompt_lower)
+            if totals:
+                count = sum(map(int, totals))
             
             if count == 0 and ("[]" in prompt or "empty" in prompt_lower or "null" in prompt_lower):
                 return "No records found matching your query."
@@ -69,8 +304,42 @@ class LLMProvider:
         else:
             user_query_part = prompt_lower 
 
-        response = {}
+        # Compound questions ("critical issues and the AI team") get one step per part
+        parts = [p for p in re.split(r"\band\b|,", user_query_part) if p.strip()]
+        step_plans = [p for p in map(self._mock_plan, parts) if p] if len(parts) > 1 else []
+        unique = list({json.dumps(p, sort_keys=True): p for p in step_plans}.values())
+        if len(unique) > 1:
+            steps = [{"id": f"step{i}", **p} for i, p in enumerate(unique, 1)]
+            return json.dumps({"steps": steps})
+
+        response = self._mock_plan(user_query_part)
+        if response:
+            return json.dumps(response)
         
+        logger.warning(f"Mock LLM couldn't match prompt: {prompt[:50]}...")
+        return json.dumps({"error": "Mock LLM didn't understand query"})
+
+    def _mock_plan(self, user_query_part: str) -> dict:
+        """Keyword-matched single-tool plan for the mock planner ({} if nothing matches)."""
+        response = {}
+
+        # --- Aggregates: counts / averages / totals come from the stats tools ---
+        if re.search(r"\b(?:how many|count|number of|average|avg|total|per)\b", user_query_part) \
+                and not re.search(r"\d", user_query_part):
+            if "issue" in user_query_part:
+                priority = next((p for p in ["Critical", "High", "Medium", "Low"] if p.lower() in user_query_part), "all")
+                response = {"tool": "get_issue_stats", "parameters": {"priority": priority}}
+            elif "project" in user_query_part or "budget" in user_query_part:
+                status = next((s for s in ["In Progress", "Completed", "Planning"]
+                               if re.search(s.lower().replace(" ", "[ -]"), user_query_part)), "all")
+                response = {"tool": "get_project_stats", "parameters": {"status": status}}
+            elif "employee" in user_query_part or "salary" in user_query_part or "department" in user_query_part:
+                dept = next((d for d in ["AI", "Backend", "Frontend", "DevOps"]
+                             if re.search(rf"\b{d.lower()}\b", user_query_part)), "all")
+                response = {"tool": "get_department_stats", "parameters": {"department": dept}}
+            if response:
+                return response
+
         # --- NEW: Handle Text-to-SQL Scenarios ---
         if "salary" in user_query_part:
             # Extract the actual number from the query (e.g. "more than 900000")
@@ -93,7 +362,7 @@ class LLMProvider:
             }
 
         # --- Standard Tools ---
-        elif "department" in user_query_part or "employees" in user_query_part:
+        elif "department" in user_query_part or "employees" in user_query_part or "team" in user_query_part:
             dept = "AI" 
             if "backend" in user_query_part: dept = "Backend"
             if "frontend" in user_query_part: dept = "Frontend"
@@ -112,28 +381,86 @@ class LLMProvider:
             if "medium" in user_query_part: priority = "Medium"
             if "low" in user_query_part: priority = "Low"
             response = {"tool": "get_issues_by_priority", "parameters": {"priority": priority}}
-        
-        if response:
-            return json.dumps(response)
-        
-        logger.warning(f"Mock LLM couldn't match prompt: {prompt[:50]}...")
-        return json.dumps({"error": "Mock LLM didn't understand query"})
+
+        return response
+
+    def _ollama_payload(self, prompt: str, stream: bool):
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "temperature": 0.1,
+            # Keep the model (and its prompt cache) loaded between requests
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE
+        }
+
+    def _record_prompt_eval(self, body: dict):
+        tokens = body.get("prompt_eval_count")
+        self._record_tokens(tokens, body.get("eval_count"))
+        if tokens is None:
+            return
+        ms = body.get("prompt_eval_duration", 0) / 1e6
+        with self._lock:
+            self.prompt_eval["calls"] += 1
+            self.prompt_eval["tokens"] += tokens
+            self.prompt_eval["ms"] += ms
+        logger.debug(f"Ollama prompt eval: {tokens} tokens in {ms:.1f} ms")
 
     def _call_ollama(self, prompt: str) -> str:
         try:
             logger.info(f"Ollama ({self.model}): Generating...")
-            res = requests.post(
-                self.ollama_url,
-                json={
-                    "model": self.model, 
-                    "prompt": prompt, 
-                    "stream": False, 
-                    "temperature": 0.1 
-                },
-                timeout=self.ollama_timeout
-            )
+            with self._sync_limit:
+                res = self._http_session().post(
+                    self.ollama_url,
+                    json=self._ollama_payload(prompt, stream=False),
+                    timeout=(self.connect_timeout, self.ollama_timeout)
+                )
+            res.raise_for_status()
+            body = res.json()
+            self._record_prompt_eval(body)
+            return body.get("response", "")
+        except Exception as e:
+            logger.error(f"Ollama failed: {e}")
+            raise
+
+    async def _call_ollama_async(self, prompt: str) -> str:
+        try:
+            logger.info(f"Ollama ({self.model}): Generating (async)...")
+            clients = self._async_clients()
+            async with clients["limit"]:
+                res = await clients["http"].post(
+                    self.ollama_url,
+                    json=self._ollama_payload(prompt, stream=False)
+                )
             res.raise_for_status()
-            return res.json().get("response", "")
+            body = res.json()
+            self._record_prompt_eval(body)
+            return body.get("response", "")
+        except Exception as e:
+            logger.error(f"Ollama failed: {e}")
+            raise
+
+    async def _stream_ollama(self, prompt: str):
+        try:
+            logger.info(f"Ollama ({self.model}): Streaming...")
+            clients = self._async_clients()
+            async with clients["limit"]:
+                async with clients["http"].stream(
+                    "POST",
+                    self.ollama_url,
+                    json=self._ollama_payload(prompt, stream=True)
+                ) as res:
+                    res.raise_for_status()
+                    # Ollama streams one JSON object per line
+                    async for line in res.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            self._record_prompt_eval(chunk)
+                            break
         except Exception as e:
             logger.error(f"Ollama failed: {e}")
             raise
@@ -143,17 +470,61 @@ class LLMProvider:
             raise ValueError("OpenAI API Key is missing in settings")
             
         try:
-            from openai import OpenAI
-            # Set a short timeout (5s) so we fail fast and use fallback logic if the API is slow/broken
-            client = OpenAI(api_key=self.openai_key, timeout=5.0)
+            client = self._openai()
             
             logger.info(f"OpenAI ({self.model}): Generating...")
-            res = client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
-            )
+            with self._sync_limit:
+                res = client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1
+                )
+            if res.usage:
+                self._record_tokens(res.usage.prompt_tokens, res.usage.completion_tokens)
             return res.choices[0].message.content
         except Exception as e:
             logger.error(f"OpenAI failed: {e}")
             raise
+
+    async def _call_openai_async(self, prompt: str) -> str:
+        if not self.openai_key:
+            raise ValueError("OpenAI API Key is missing in settings")
+
+        try:
+            clients = self._async_clients()
+
+            logger.info(f"OpenAI ({self.model}): Generating (async)...")
+            async with clients["limit"]:
+                res = await clients["openai"].chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1
+                )
+            if res.usage:
+                self._record_tokens(res.usage.prompt_tokens, res.usage.completion_tokens)
+            return res.choices[0].message.content
+        except Exception as e:
+            logger.error(f"OpenAI failed: {e}")
+            raise
+
+    async def _stream_openai(self, prompt: str):
+        if not self.openai_key:
+            raise ValueError("OpenAI API Key is missing in settings")
+
+        try:
+            clients = self._async_clients()
+
+            logger.info(f"OpenAI ({self.model}): Streaming...")
+            async with clients["limit"]:
+                stream = await clients["openai"].chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error(f"OpenAI failed: {e}")
+            raise
@@ -1,12 +1,25 @@
+import asyncio
+import json
+import time
 from app.agents.planner_agent import PlannerAgent
 from app.agents.executor_agent import ExecutorAgent
 from app.agents.reasoner_agent import ReasonerAgent
 from app.agents.llm_provider import LLMProvider
+from app.agents.plan_cache import extract_slots
+from app.agents.explanation_store import ExplanationStore
+from app.database.db_executor import QueryRejected
+from app.mcp.tools import UNTRUSTED_SQL_TOOLS
 from app.utils.logger import get_logger
+from app.utils.metrics import SPECULATION_SAVED_SECONDS, SPECULATIONS, timed_stage
+from app.utils.page_token import decode_page_token, encode_page_token
+from app.utils.singleflight import SingleFlight
 from app.core.config import settings
 
 logger = get_logger(__name__)
 
+# Identical questions arriving together (e.g. a dashboard refresh) share one pipeline run
+_query_flight = SingleFlight("process_query")
+
 class AgentOrchestrator:
     """
     Main controller:
@@ -23,31 +36,354 @@ class AgentOrchestrator:
         self.planner = PlannerAgent(self.llm)
         self.executor = ExecutorAgent()
         self.reasoner = ReasonerAgent(self.llm)
+
+        # Explanations for defer_explanation requests, fetched separately
+        self.explanations = ExplanationStore(
+            workers=settings.EXPLANATION_WORKERS,
+            max_pending=settings.EXPLANATION_MAX_PENDING,
+            ttl_seconds=settings.EXPLANATION_TTL_SECONDS,
+            unclaimed_seconds=settings.EXPLANATION_UNCLAIMED_SECONDS
+        )
         
         logger.info(f"Orchestrator ready (Provider: {self.llm.provider})")
 
     def process_query(self, user_query: str):
+        # Per-stage durations, returned as "timings" and exported to /metrics
+        timings = {}
+        with timed_stage("total", timings):
+            result = self._run_stages(user_query, timings)
+        result["timings"] = timings
+        return result
+
+    def _run_stages(self, user_query: str, timings: dict):
         # 1. PLANNING
-        plan = self.planner.plan(user_query)
+        with timed_stage("plan", timings):
+            plan = self.planner.plan(user_query)
         if "error" in plan:
             return self._error_response(user_query, plan["error"])
 
         # 2. EXECUTION
-        exec_result = self.executor.execute(plan)
+        with timed_stage("execute", timings):
+            exec_result = self.executor.execute(plan)
+        if "rejection" in exec_result:
+            # The SQL guard refused the query: one retry with a cheaper plan
+            logger.warning(f"Query rejected ({exec_result['rejection']['code']}), replanning")
+            with timed_stage("replan", timings):
+                plan = self.planner.plan(user_query, feedback=exec_result["rejection"])
+                if "error" in plan:
+                    return self._error_response(user_query, plan["error"])
+                exec_result = self.executor.execute(plan)
         if "error" in exec_result:
              return self._error_response(user_query, exec_result["error"])
 
         # 3. REASONING
         # We pass the raw data to the reasoner to get a human-friendly summary
         raw_data = exec_result.get("data", [])
-        explanation = self.reasoner.explain(user_query, raw_data)
+        with timed_stage("reason", timings):
+            explanation = self.reasoner.explain(user_query, raw_data)
+
+        return self._success_response(user_query, plan, raw_data, explanation)
+
+    async def process_query_async(self, user_query: str, defer_explanation: bool = False,
+                                  page_size: int = None):
+        """
+        Non-blocking version of process_query() used by the API.
+        LLM calls are awaited and tools run on the DB worker threads, so one
+        slow generation doesn't stall other requests on the same worker.
+        Concurrent calls with the same query share one run.
+
+        With defer_explanation the result comes back as soon as the data is
+        in, with an "explanation_id" to fetch the explanation from
+        self.explanations later.
+
+        With page_size only the first page of rows is returned (and
+        explained), plus a "next_page_token" for fetch_page_async().
+        """
+        run = lambda: self._run_query_async(user_query, defer_explanation, page_size)
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return await run()
+        return await _query_flight.do((user_query, defer_explanation, page_size), run)
+
+    async def fetch_page_async(self, page_token: str):
+        """
+        The page following the one `page_token` came with. The plan travels
+        in the token, so this is a single seek query: no planning and no
+        explanation. Raises ValueError if the token is invalid or expired.
+        """
+        state = decode_page_token(page_token)
+        timings = {}
+        with timed_stage("page", timings):
+            exec_result = await self.executor.execute_page_async(state["plan"], state["size"], state["after"])
+        if "error" in exec_result:
+            return self._error_response(state["query"], exec_result["error"])
+
+        response = self._success_response(state["query"], state["plan"], exec_result["data"], None)
+        self._add_page_token(response, state["plan"], state["size"], exec_result)
+        response["timings"] = timings
+        return response
+
+    async def _run_query_async(self, user_query: str, defer_explanation: bool = False, page_size: int = None):
+        timings = {}
+        with timed_stage("total", timings):
+            result = await self._run_stages_async(user_query, defer_explanation, timings, page_size)
+        result["timings"] = timings
+        return result
+
+    async def _run_stages_async(self, user_query: str, defer_explanation: bool, timings: dict,
+                                page_size: int = None):
+        with timed_stage("plan", timings):
+            plan, speculative = await self._plan_async(user_query, page_size)
+        if "error" in plan:
+            return self._error_response(user_query, plan["error"])
+
+        with timed_stage("execute", timings):
+            if speculative:
+                exec_result = await speculative
+            else:
+                exec_result = await self._execute_async(plan, page_size)
+        if "rejection" in exec_result:
+            with timed_stage("replan", timings):
+                plan, exec_result = await self._replan_async(user_query, exec_result, page_size)
+        if "error" in exec_result:
+            return self._error_response(user_query, exec_result["error"])
+
+        raw_data = exec_result.get("data", [])
+        if defer_explanation:
+            explanation_id = self.explanations.submit(
+                lambda: self.reasoner.explain_async(user_query, raw_data)
+            )
+            # A full queue falls back to answering inline
+            if explanation_id:
+                response = self._success_response(user_query, plan, raw_data, None)
+                response["explanation_id"] = explanation_id
+                self._add_page_token(response, plan, page_size, exec_result)
+                return response
+
+        with timed_stage("reason", timings):
+            explanation = await self.reasoner.explain_async(user_query, raw_data)
+
+        response = self._success_response(user_query, plan, raw_data, explanation)
+        self._add_page_token(response, plan, page_size, exec_result)
+        return response
+
+    async def _plan_async(self, user_query: str, page_size: int = None):
+        """
+        (plan, task): the plan, and the task already executing it if it was
+        guessed right (else None).
+
+        When the plan has to come from the LLM, the keyword fallback's guess
+        is executed meanwhile. If the LLM picks the same tool call, its result
+        is already on the way; otherwise it is cancelled and thrown away.
+        Only fixed tools are guessed: LLM-written SQL never matches verbatim.
+        """
+        if not settings.SPECULATIVE_EXECUTION_ENABLED:
+            return await self.planner.plan_async(user_query), None
+
+        # Router or cache: no LLM wait to hide
+        plan = self.planner.shortcut_plan(user_query)
+        if plan:
+            return plan, None
+
+        guess = self.planner.guess_plan(user_query)
+        if not guess or "steps" in guess or guess["tool"] in UNTRUSTED_SQL_TOOLS:
+            return await self.planner.plan_async(user_query, shortcut=False), None
+
+        started = time.perf_counter()
+        finished = []
+        speculative = asyncio.create_task(self._execute_async(guess, page_size))
+        speculative.add_done_callback(lambda _: finished.append(time.perf_counter()))
+        try:
+            plan = await self.planner.plan_async(user_query, shortcut=False)
+        except BaseException:
+            speculative.cancel()
+            raise
+
+        if _call_key(plan) != _call_key(guess):
+            # The DB thread finishes the query regardless; only its result is dropped
+            speculative.cancel()
+            SPECULATIONS.labels("miss").inc()
+            return plan, None
+
+        SPECULATIONS.labels("hit").inc()
+        SPECULATION_SAVED_SECONDS.observe((finished[0] if finished else time.perf_counter()) - started)
+        logger.debug("Speculative %s matched the plan", guess["tool"])
+        return plan, speculative
+
+    async def _execute_async(self, plan: dict, page_size: int = None):
+        if page_size:
+            return await self.executor.execute_page_async(plan, page_size)
+        return await self.executor.execute_async(plan)
 
+    def _add_page_token(self, response: dict, plan: dict, page_size: int, exec_result: dict):
+        if exec_result.get("next_after") is None:
+            return
+        response["next_page_token"] = encode_page_token({
+            "query": response["query"],
+            "plan": {"tool": plan["tool"], "parameters": plan.get("parameters")},
+            "size": page_size,
+            "after": exec_result["next_after"],
+        })
+
+    async def _replan_async(self, user_query: str, exec_result: dict, page_size: int = None):
+        """
+        The SQL guard refused the plan's query: ask the planner once more with
+        the rejection as feedback. Returns the new (plan, exec_result).
+        """
+        logger.warning(f"Query rejected ({exec_result['rejection']['code']}), replanning")
+        plan = await self.planner.plan_async(user_query, feedback=exec_result["rejection"])
+        if "error" in plan:
+            return plan, plan
+        return plan, await self._execute_async(plan, page_size)
+
+    async def stream_query(self, user_query: str):
+        """
+        Streaming version of process_query_async().
+        Yields events as each stage finishes: the plan, the rows in batches,
+        then the explanation token by token, and finally "done".
+        """
+        timings = {}
+        started = time.perf_counter()
+        feedback = None
+        # A query refused by the SQL guard gets one replan. The guard runs
+        # before the first row is fetched, so nothing has been sent yet.
+        for attempt in range(2):
+            with timed_stage("plan" if attempt == 0 else "replan", timings):
+                plan = await self.planner.plan_async(user_query, feedback=feedback)
+            if "error" in plan:
+                yield {"event": "error", "error": plan["error"]}
+                return
+            yield {"event": "plan", "query": user_query, "plan": plan}
+
+            if "steps" in plan:
+                # Multi-step plans run as a whole; rows go out per step
+                with timed_stage("execute", timings):
+                    exec_result = await self.executor.execute_async(plan)
+                if "rejection" in exec_result and not attempt:
+                    logger.warning(f"Query rejected ({exec_result['rejection']['code']}), replanning")
+                    feedback = exec_result["rejection"]
+                    continue
+                if "error" in exec_result:
+                    yield {"event": "error", **exec_result}
+                    return
+                rows = exec_result["data"]
+                for step_id, step_rows in rows.items():
+                    if isinstance(step_rows, list):
+                        yield {"event": "rows", "step": step_id, "rows": step_rows}
+                    else:
+                        yield {"event": "rows", "step": step_id, "rows": [], "error": step_rows["error"]}
+                break
+
+            stream = self.executor.stream(plan)
+            if isinstance(stream, dict):
+                yield {"event": "error", "error": stream["error"]}
+                return
+
+            # Rows go out as soon as each cursor batch arrives; the reasoner gets
+            # what was streamed, which the row/byte caps keep bounded
+            rows = []
+            try:
+                # Includes the time the client takes to read each batch
+                with timed_stage("execute", timings):
+                    async for batch in stream:
+                        rows.extend(batch)
+                        yield {"event": "rows", "rows": batch}
+                break
+            except QueryRejected as e:
+                if rows or attempt:
+                    yield {"event": "error", "error": str(e), "rejection": e.to_error()}
+                    return
+                logger.warning(f"Query rejected ({e.code}), replanning")
+                feedback = e.to_error()
+            except Exception as e:
+                logger.error(f"Tool execution failed: {e}")
+                yield {"event": "error", "error": f"Execution error: {str(e)}"}
+                return
+
+        with timed_stage("reason", timings):
+            async for token in self.reasoner.explain_stream(user_query, rows):
+                yield {"event": "explanation", "text": token}
+
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        yield {
+            "event": "done",
+            "status": "success",
+            "row_count": _row_count(rows),
+            "truncated": _truncated(rows) if isinstance(rows, dict) else stream.truncated,
+            "timings": timings
+        }
+
+    async def process_batch_async(self, queries: list):
+        """
+        Answer many queries at once. Equivalent questions are planned once,
+        identical (tool, parameters) calls hit the DB once, and the LLM stages
+        run concurrently under BATCH_CONCURRENCY. Each result is what
+        process_query_async() would return for that query.
+        """
+        limit = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+        unique_queries = list(dict.fromkeys(queries))
+
+        # 1. PLANNING - once per normalized question shape + slot values
+        def plan_key(q):
+            shape, slots = extract_slots(q)
+            return shape, tuple(sorted(slots.items()))
+
+        async def plan_one(q):
+            async with limit:
+                return await self.planner.plan_async(q)
+
+        query_keys = {q: plan_key(q) for q in unique_queries}
+        representatives = {}
+        for q, key in query_keys.items():
+            representatives.setdefault(key, q)
+        planned = await asyncio.gather(*(plan_one(q) for q in representatives.values()))
+        plans_by_key = dict(zip(representatives.keys(), planned))
+        plans = {q: plans_by_key[key] for q, key in query_keys.items()}
+
+        # 2. EXECUTION - once per distinct (tool, parameters), or set of steps
+        def call_key(plan):
+            call = {k: plan[k] for k in ("tool", "parameters", "steps") if k in plan}
+            return json.dumps(call, sort_keys=True, default=str)
+
+        calls = {}
+        for plan in plans.values():
+            if "error" not in plan:
+                calls.setdefault(call_key(plan), plan)
+        executed = await asyncio.gather(*(self.executor.execute_async(p) for p in calls.values()))
+        results_by_call = dict(zip(calls.keys(), executed))
+
+        # 3. REASONING - per query, since the explanation depends on the wording
+        async def finish(q):
+            plan = plans[q]
+            if "error" in plan:
+                return self._error_response(q, plan["error"])
+
+            exec_result = results_by_call[call_key(plan)]
+            if "rejection" in exec_result:
+                async with limit:
+                    plan, exec_result = await self._replan_async(q, exec_result)
+            if "error" in exec_result:
+                return self._error_response(q, exec_result["error"])
+
+            raw_data = exec_result.get("data", [])
+            async with limit:
+                explanation = await self.reasoner.explain_async(q, raw_data)
+            return self._success_response(q, plan, raw_data, explanation)
+
+        finished = await asyncio.gather(*(finish(q) for q in unique_queries))
+        by_query = dict(zip(unique_queries, finished))
+        logger.info(
+            f"Batch of {len(queries)}: {len(representatives)} plans, {len(calls)} tool calls"
+        )
+        return [by_query[q] for q in queries]
+
+    def _success_response(self, query, plan, raw_data, explanation):
         return {
-            "query": user_query,
+            "query": query,
             "status": "success",
             "plan": plan,
             "data": raw_data,
-            "row_count": len(raw_data) if isinstance(raw_data, list) else 1,
+            "row_count": _row_count(raw_data),
+            "truncated": _truncated(raw_data),
             "explanation": explanation
         }
 
@@ -58,3 +394,30 @@ class AgentOrchestrator:
             "status": "error",
             "error": error_msg
         }
+
+
+def _call_key(plan):
+    """
+    (tool, argument) of a single-tool plan, for comparing plans. The fixed
+    tools match their argument case-insensitively, so "ai" and "AI" are the
+    same call.
+    """
+    params = plan.get("parameters")
+    if isinstance(params, dict):
+        params = list(params.values())
+    if isinstance(params, list):
+        params = params[0] if params else None
+    return plan.get("tool"), str(params).strip().lower()
+
+def _row_count(data):
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        # Multi-step result: rows across all steps
+        return sum(len(rows) for rows in data.values() if isinstance(rows, list))
+    return 1
+
+def _truncated(data):
+    if isinstance(data, dict):
+        return any(getattr(rows, "truncated", False) for rows in data.values())
+    return getattr(data, "truncated", False)
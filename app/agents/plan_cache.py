@@ -0,0 +1,163 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Literal values the planner passes straight through to the tools.
+# Multi-word values first so "in progress" wins over shorter matches.
+SLOT_VALUES = {
+    "status": ["In Progress", "Completed", "Planning"],
+    "department": ["AI", "Backend", "Frontend", "DevOps"],
+    "priority": ["Critical", "High", "Medium", "Low"],
+}
+
+# Filler words that don't change which tool/parameters the planner picks.
+# Comparison words (more, less, than, not...) are deliberately kept.
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "for",
+    "to", "with", "by", "at", "from", "that", "this", "there", "where", "whose",
+    "me", "my", "our", "us", "i", "we", "you", "please", "can", "could", "would",
+    "show", "list", "find", "fetch", "get", "give", "display", "tell", "all",
+    "any", "what", "which", "who", "details", "do", "does", "have", "has",
+}
+
+_SLOT_PATTERNS = [
+    (kind, value, re.compile(r"\b" + re.escape(value.lower()) + r"\b"))
+    for kind, values in SLOT_VALUES.items()
+    for value in values
+]
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def extract_slots(query: str):
+    """
+    Normalize a query and pull out its literal slot values.
+    Returns (shape, slots): the shape has each literal replaced by a
+    placeholder, e.g. "employees <department> department".
+    """
+    text = query.lower()
+    text = re.sub(r"(?<=\d),(?=\d{3})", "", text)  # 90,000 -> 90000
+    text = re.sub(r"[^\w\s.]|(?<!\d)\.|\.(?!\d)", " ", text)
+
+    slots = {}
+    for kind, value, pattern in _SLOT_PATTERNS:
+        if kind not in slots and pattern.search(text):
+            slots[kind] = value
+            text = pattern.sub(f" <{kind}> ", text, count=1)
+
+    numbers = _NUMBER_RE.findall(text)
+    for i, num in enumerate(numbers):
+        slots[f"number{i}"] = num
+        text = _NUMBER_RE.sub(f" <number{i}> ", text, count=1)
+
+    tokens = [t for t in text.split() if t not in STOP_WORDS]
+    return " ".join(tokens), slots
+
+
+class PlanCache:
+    """
+    LRU + TTL cache of planner output, keyed on the normalized query shape.
+
+    Plans are stored as JSON templates with the slot values replaced by
+    markers, so "employees in AI" and "employees in Backend" share one entry.
+    If a slot value can't be found in the plan the entry is keyed on the
+    literal values instead, so a hit never changes the meaning of a plan.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._schema_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ensure_schema(self, schema_version: str):
+        """Drop every entry if the tool schema the plans were built against changed."""
+        with self._lock:
+            if schema_version != self._schema_version:
+                if self._entries:
+                    logger.info("Tool schema changed, clearing plan cache")
+                self._entries.clear()
+                self._schema_version = schema_version
+
+    def get(self, query: str):
+        shape, slots = extract_slots(query)
+        with self._lock:
+            for key in (self._templated_key(shape), self._literal_key(shape, slots)):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                template, expires_at = entry
+                if expires_at < time.monotonic():
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._fill(template, slots)
+            self.misses += 1
+            return None
+
+    def put(self, query: str, plan: dict):
+        shape, slots = extract_slots(query)
+        template = self._make_template(json.dumps(plan), slots)
+        key = self._templated_key(shape) if template else self._literal_key(shape, slots)
+        if template is None:
+            template = json.dumps(plan)
+
+        with self._lock:
+            self._entries[key] = (template, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    # --- Helpers ---
+
+    def _templated_key(self, shape):
+        return ("template", shape)
+
+    def _literal_key(self, shape, slots):
+        return ("literal", shape, tuple(sorted(slots.items())))
+
+    def _make_template(self, plan_json, slots):
+        """Swap slot values in the plan for markers; None if any value is missing."""
+        if not slots or len(set(v.lower() for v in slots.values())) != len(slots):
+            return None  # nothing to generalize, or ambiguous duplicates
+
+        for kind, value in slots.items():
+            if kind.startswith("number"):
+                pattern = re.compile(r"(?<![\d.])" + re.escape(value) + r"(?![\d.])")
+            else:
+                pattern = re.compile(r"\b" + re.escape(value) + r"\b", re.IGNORECASE)
+            plan_json, count = pattern.subn(f"<<slot:{kind}>>", plan_json)
+            # A number that shows up twice (e.g. also as a LIMIT) is ambiguous
+            if count == 0 or (kind.startswith("number") and count > 1):
+                return None
+        return plan_json
+
+    def _fill(self, template, slots):
+        for kind, value in slots.items():
+            template = template.replace(f"<<slot:{kind}>>", value)
+        return json.loads(template)
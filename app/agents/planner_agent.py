@@ -1,14 +1,23 @@
 import json
 import re
+import hashlib
 from app.agents.llm_provider import LLMProvider
+from app.agents.plan_cache import PlanCache
+from app.agents.intent_router import IntentRouter
 from app.utils.logger import get_logger
+from app.utils.metrics import PLAN_SOURCE, PLANNER_FALLBACKS, PLANNER_HALLUCINATIONS
+from app.core.config import settings
 
 logger = get_logger(__name__)
 
+# Questions about counts, averages or totals, answered by the *_stats tools
+_AGGREGATE_RE = re.compile(r"\b(?:how many|count|number of|average|avg|mean|total|sum|per)\b")
+
 class PlannerAgent:
     """
     Analyzes the user's query and selects the right tool.
-    Output: JSON with 'tool' and 'parameters'.
+    Output: JSON with 'tool' and 'parameters', or for compound questions
+    'steps': a list of tool calls (see ExecutorAgent).
     """
     
     def __init__(self, llm: LLMProvider):
@@ -28,6 +37,18 @@ class PlannerAgent:
                 "desc": "Find issues by priority (Critical, High, Medium, Low)",
                 "args": ["priority"]
             },
+            "get_department_stats": {
+                "desc": "Headcount and average/total salary per department, or 'all' for every department",
+                "args": ["department"]
+            },
+            "get_project_stats": {
+                "desc": "Number of projects and average/total budget per status, or 'all' for every status",
+                "args": ["status"]
+            },
+            "get_issue_stats": {
+                "desc": "Number of issues per priority and status (Open, In Progress...), or 'all' for every priority",
+                "args": ["priority"]
+            },
             "run_sql_query": {
                 "desc": "Execute a raw SQL SELECT query for complex data retrieval. Use this when no other tool fits.",
                 "args": ["query"]
@@ -40,43 +61,174 @@ class PlannerAgent:
         - employees(id, name, email, department, salary, hire_date, is_active)
         - projects(id, name, description, status, start_date, end_date, budget, lead_id)
         - issues(id, title, description, priority, status, assigned_to, project_id, created_date, due_date)
+        - department_stats(department, employee_count, active_count, salary_count, salary_sum)
+        - project_stats(status, project_count, budget_count, budget_sum)
+        - issue_stats(priority, status, issue_count)
         """
+
+        # The query-independent part of the planner prompt, built once
+        self.prompt_prefix = self._build_prompt_prefix()
+        self._schema_hash = self._schema_version()
+
+        # Answers simple single-tool queries without the LLM
+        self.router = None
+        if settings.INTENT_ROUTER_ENABLED:
+            self.router = IntentRouter(self.tools_schema, threshold=settings.INTENT_ROUTER_THRESHOLD)
+
+        # Cache of LLM plans for repeated question shapes
+        self.cache = None
+        if settings.PLAN_CACHE_ENABLED:
+            self.cache = PlanCache(
+                max_entries=settings.PLAN_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.PLAN_CACHE_TTL_SECONDS
+            )
     
-    def plan(self, query: str):
+    def plan(self, query: str, feedback: dict = None):
+        """
+        `feedback` is the structured rejection of a previous plan (see
+        QueryRejected.to_error()); it skips the cache and is shown to the LLM.
+        """
         logger.info(f"Planning for query: '{query}'")
+
+        cached = None if feedback else self.shortcut_plan(query)
+        if cached:
+            return cached
         
-        prompt = self._build_prompt(query)
+        prompt = self._build_prompt(query, feedback)
         
         try:
             raw_response = self.llm.generate(prompt)
-            plan = self._parse_response(raw_response)
-            
-            # Basic validation
-            if plan.get("tool") not in self.tools_schema:
-                logger.warning(f"LLM hallucinated tool: {plan.get('tool')}")
-                return self._fallback_logic(query)
-                
-            logger.info(f"Selected tool: {plan['tool']} with params: {plan.get('parameters')}")
-            return plan
+            return self._accept_plan(query, raw_response)
 
         except Exception as e:
             logger.error(f"Planning failed: {e}")
-            return self._fallback_logic(query)
+            return self._fallback(query, "llm_error")
+
+    async def plan_async(self, query: str, feedback: dict = None, shortcut: bool = True):
+        """
+        Same as plan(), but awaits the LLM instead of blocking the event loop.
+        shortcut=False goes straight to the LLM, for callers that already
+        tried shortcut_plan().
+        """
+        logger.info(f"Planning for query: '{query}'")
+
+        cached = None if feedback or not shortcut else self.shortcut_plan(query)
+        if cached:
+            return cached
+
+        prompt = self._build_prompt(query, feedback)
 
-    def _build_prompt(self, query):
+        try:
+            raw_response = await self.llm.generate_async(prompt)
+            return self._accept_plan(query, raw_response)
+
+        except Exception as e:
+            logger.error(f"Planning failed: {e}")
+            return self._fallback(query, "llm_error")
+
+    def _accept_plan(self, query, raw_response):
+        plan = self._parse_response(raw_response)
+
+        # Basic validation
+        tools = self._plan_tools(plan)
+        unknown = [tool for tool in tools if tool not in self.tools_schema]
+        if not tools or unknown:
+            logger.warning(f"LLM hallucinated tool: {unknown[0] if unknown else None}")
+            PLANNER_HALLUCINATIONS.inc()
+            return self._fallback(query, "hallucinated_tool")
+
+        # Params can be a whole SQL query: only at DEBUG
+        logger.info(f"Selected tool: {', '.join(tools)}")
+        logger.debug("Tool params: %s", plan.get("steps", plan.get("parameters")))
+        PLAN_SOURCE.labels("llm").inc()
+        if self.cache:
+            self.cache.put(query, plan)
+        return plan
+
+    def _plan_tools(self, plan):
+        if "steps" not in plan:
+            return [plan.get("tool")]
+        steps = plan["steps"]
+        if not isinstance(steps, list):
+            return []
+        return [step.get("tool") if isinstance(step, dict) else None for step in steps]
+
+    def shortcut_plan(self, query):
+        """A plan that doesn't need the LLM: intent router first, then the plan cache."""
+        plan = self._routed_plan(query)
+        if plan:
+            PLAN_SOURCE.labels("router").inc()
+            return plan
+        plan = self._cached_plan(query)
+        if plan:
+            PLAN_SOURCE.labels("cache").inc()
+        return plan
+
+    def guess_plan(self, query):
+        """
+        The keyword fallback's plan for `query`, or None. Not counted as a
+        fallback: it is a cheap guess at what the LLM will pick.
+        """
+        plan = self._fallback_logic(query)
+        return None if "error" in plan else plan
+
+    def _fallback(self, query, reason):
+        PLANNER_FALLBACKS.labels(reason).inc()
+        PLAN_SOURCE.labels("fallback").inc()
+        return self._fallback_logic(query)
+
+    def _routed_plan(self, query):
+        if not self.router:
+            return None
+        return self.router.route(query)
+
+    def _cached_plan(self, query):
+        if not self.cache:
+            return None
+
+        # Plans built against an older tool list are no longer valid
+        self.cache.ensure_schema(self._schema_hash)
+        plan = self.cache.get(query)
+        if plan:
+            logger.info(f"Plan cache hit: {', '.join(self._plan_tools(plan))}")
+        return plan
+
+    def _schema_version(self):
+        schema = json.dumps([self.tools_schema, self.db_schema], sort_keys=True)
+        return hashlib.sha1(schema.encode()).hexdigest()
+
+    def _build_prompt(self, query, feedback=None):
+        # Everything that doesn't depend on the query comes first, byte for
+        # byte the same each time, so the LLM server can reuse its KV cache
+        # for it (Ollama keeps it while the model stays loaded)
+        rejection = ""
+        if feedback:
+            rejection = (
+                f"Your previous plan was rejected by the database guard:\n"
+                f"{json.dumps(feedback, default=str)}\n"
+                f"Return a cheaper plan (more selective filters, aggregates or a LIMIT).\n\n"
+            )
+        return f"{self.prompt_prefix}{rejection}User Query: \"{query}\"\n"
+
+    def _build_prompt_prefix(self):
         schema_str = json.dumps(self.tools_schema, indent=2)
         return (
             f"You are a smart routing agent. Your goal is to pick the best tool to answer the user's question.\n"
             f"If the question is simple, use a specific tool (e.g. get_employees_by_department).\n"
+            f"For counts, averages or totals per department, project status or issue priority, use the *_stats tools.\n"
             f"If the question is complex or about fields like 'salary' or 'budget' that are not covered by specific tools, use 'run_sql_query' and generate a valid SQL SELECT statement.\n\n"
             f"Available Tools:\n{schema_str}\n\n"
             f"{self.db_schema}\n\n"
-            f"User Query: \"{query}\"\n\n"
             f"Constraints:\n"
             f"- For 'run_sql_query', the 'query' parameter MUST be a valid SQL SELECT Statement.\n"
             f"- Do NOT use DROP, DELETE, or INSERT.\n\n"
             f"Return purely JSON in this format:\n"
-            f'{{"tool": "TOOL_NAME", "parameters": {{"ARG_NAME": "VALUE"}}, "reasoning": "..."}}'
+            f'{{"tool": "TOOL_NAME", "parameters": {{"ARG_NAME": "VALUE"}}, "reasoning": "..."}}\n\n'
+            f"If the question asks for several unrelated things, return one step per tool call instead "
+            f"(at most {settings.PLAN_MAX_STEPS}). Steps run in parallel and can't use each other's "
+            f"results: if one part needs another's answer, write a single 'run_sql_query' instead:\n"
+            f'{{"steps": [{{"id": "STEP_ID", "tool": "TOOL_NAME", "parameters": {{"ARG_NAME": "VALUE"}}}}], '
+            f'"reasoning": "..."}}\n\n'
         )
 
     def _parse_response(self, text):
@@ -88,17 +240,35 @@ class PlannerAgent:
 
     def _fallback_logic(self, query):
         """Simple keyword matching if LLM fails."""
+        # "high priority issues and the AI team": one step per part
+        parts = [p for p in re.split(r"\band\b|,", query) if p.strip()]
+        if len(parts) > 1:
+            step_plans = [p for p in map(self._fallback_single, parts) if "error" not in p]
+            unique = list({json.dumps(p, sort_keys=True): p for p in step_plans}.values())
+            if len(unique) > 1:
+                return {
+                    "steps": [
+                        {"id": f"step{i}", "tool": p["tool"], "parameters": p["parameters"]}
+                        for i, p in enumerate(unique[:settings.PLAN_MAX_STEPS], 1)
+                    ],
+                    "reasoning": "Fallback heuristic used."
+                }
+        return self._fallback_single(query)
+
+    def _fallback_single(self, query):
         q = query.lower()
         plan = {}
         
         # Heuristics
-        if "salary" in q or "budget" in q:
+        if _AGGREGATE_RE.search(q) and not re.search(r"\d", q):
+            plan = self._fallback_aggregate(q)
+
+        elif "salary" in q or "budget" in q:
             # Fallback for complex queries -> try to generate SQL if possible, or just fail safely
             # Since this is a simple fallback, we might not want to guess SQL.
             # But we can try a simple one.
             if "salary" in q:
                  # Try to extract a number for salary threshold
-                 import re
                  match = re.search(r'(\d[\d,]+)', q)
                  if match:
                      amount = match.group(1).replace(',', '')
@@ -109,7 +279,7 @@ class PlannerAgent:
             elif "budget" in q:
                  plan = {"tool": "run_sql_query", "parameters": {"query": "SELECT * FROM projects ORDER BY budget DESC"}}
         
-        elif "department" in q or "employees" in q:
+        elif "department" in q or "employees" in q or "team" in q:
             plan = {"tool": "get_employees_by_department", "parameters": {"department": "AI"}}
             for d in ["backend", "frontend", "devops"]:
                 if d in q: plan["parameters"]["department"] = d.capitalize()
@@ -125,3 +295,19 @@ class PlannerAgent:
             
         plan["reasoning"] = "Fallback heuristic used."
         return plan
+
+    def _fallback_aggregate(self, q):
+        # A value narrows the stats to one group, otherwise every group
+        def pick(values):
+            for value in values:
+                if re.search(r"\b" + value.lower().replace(" ", "[ -]") + r"\b", q):
+                    return value
+            return "all"
+
+        if "issue" in q or "ticket" in q or "bug" in q:
+            return {"tool": "get_issue_stats", "parameters": {"priority": pick(["Critical", "High", "Medium", "Low"])}}
+        if "project" in q or "budget" in q:
+            return {"tool": "get_project_stats", "parameters": {"status": pick(["In Progress", "Completed", "Planning"])}}
+        if "employee" in q or "salary" in q or "department" in q or "headcount" in q or "team" in q:
+            return {"tool": "get_department_stats", "parameters": {"department": pick(["AI", "Backend", "Frontend", "DevOps"])}}
+        return {}
@@ -1,6 +1,7 @@
-import json
 from app.agents.llm_provider import LLMProvider
+from app.agents.data_summary import compact_result
 from app.utils.logger import get_logger
+from app.core.config import settings
 
 logger = get_logger(__name__)
 
@@ -19,18 +20,75 @@ class ReasonerAgent:
         if not data:
             return "I couldn't find any data matching your request."
 
-        # Convert data to string for the prompt
-        data_str = json.dumps(data, indent=2, default=str)
-        
-        prompt = (
-            f"User Question: \"{query}\"\n\n"
-            f"Database Result:\n{data_str}\n\n"
-            f"Please summarize this data for the user. Highlight key insights.\n"
-            f"Keep it concise (3-4 sentences)."
-        )
+        prompt = self._build_prompt(query, data)
 
         try:
             return self.llm.generate(prompt)
         except Exception as e:
             logger.error(f"Reasoning failed: {e}")
-            return "Here is the raw data: " + str(data)
+            return "Here is the raw data: " + self._render_data(data)
+
+    async def explain_async(self, query: str, data):
+        """Same as explain(), but awaits the LLM instead of blocking the event loop."""
+        logger.info("Generating explanation...")
+
+        if not data:
+            return "I couldn't find any data matching your request."
+
+        prompt = self._build_prompt(query, data)
+
+        try:
+            return await self.llm.generate_async(prompt)
+        except Exception as e:
+            logger.error(f"Reasoning failed: {e}")
+            return "Here is the raw data: " + self._render_data(data)
+
+    async def explain_stream(self, query: str, data):
+        """Yield the explanation token by token as the LLM generates it."""
+        logger.info("Streaming explanation...")
+
+        if not data:
+            yield "I couldn't find any data matching your request."
+            return
+
+        prompt = self._build_prompt(query, data)
+
+        started = False
+        try:
+            async for chunk in self.llm.stream_async(prompt):
+                started = True
+                yield chunk
+        except Exception as e:
+            logger.error(f"Reasoning failed: {e}")
+            # Half an explanation is still useful; only fall back if nothing came through
+            if not started:
+                yield "Here is the raw data: " + self._render_data(data)
+
+    def _build_prompt(self, query, data):
+        data_str = self._render_data(data)
+
+        # Fixed instructions first so consecutive prompts share a cacheable prefix
+        return (
+            f"Please summarize this data for the user. Highlight key insights.\n"
+            f"Keep it concise (3-4 sentences).\n\n"
+            f"User Question: \"{query}\"\n\n"
+            f"Database Result:\n{data_str}\n"
+        )
+
+    def _render_data(self, data):
+        # Large results are replaced by column stats + a sample so the prompt
+        # (and LLM latency) stays roughly constant in the result size
+        if isinstance(data, dict) and data and "error" not in data:
+            # Multi-step plan: {step id: rows}, the budget shared between steps
+            budget = settings.REASONER_TOKEN_BUDGET // len(data)
+            data_str = "".join(
+                f"Step '{step_id}':\n{compact_result(rows, budget, settings.REASONER_MAX_SAMPLE_ROWS)}\n"
+                for step_id, rows in data.items()
+            )
+        else:
+            data_str = compact_result(
+                data,
+                token_budget=settings.REASONER_TOKEN_BUDGET,
+                max_sample_rows=settings.REASONER_MAX_SAMPLE_ROWS
+            )
+        return data_str
@@ -0,0 +1,157 @@
+import csv
+import io
+
+import orjson
+from fastapi.responses import Response
+
+# End-of-stream marker of the Arrow IPC streaming format
+_ARROW_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+
+def to_columnar(rows):
+    """
+    [{"a": 1, "b": 2}, ...] -> {"columns": ["a", "b"], "rows": [[1, 2], ...]}
+    Column names are sent once instead of once per row. A multi-step result
+    ({step id: rows}) is converted step by step.
+    """
+    if isinstance(rows, dict):
+        return {step: to_columnar(r) if isinstance(r, list) else r for step, r in rows.items()}
+    if not rows:
+        return {"columns": [], "rows": []}
+    columns = list(rows[0].keys())
+    return {"columns": columns, "rows": [list(row.values()) for row in rows]}
+
+
+def _json_default(value):
+    # orjson handles dates, datetimes and UUIDs natively. The rest, mainly
+    # Decimal from NUMERIC columns, become strings as pydantic renders them
+    return str(value)
+
+
+def dump_json(payload) -> bytes:
+    # OPT_UTC_Z: UTC datetimes end in "Z", as pydantic writes them
+    return orjson.dumps(payload, default=_json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+class FastJSONResponse(Response):
+    """JSONResponse encoded with orjson."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dump_json(content)
+
+
+def validated(model, payload: dict, field: str = "data") -> dict:
+    """
+    `payload` as `model` would serialize it, except that `payload[field]`
+    (the rows) is passed through untouched. Validating and re-encoding every
+    row cell costs more than the query itself on large results; the small
+    envelope around them is still checked and filled with defaults.
+    """
+    envelope = model.model_validate({**payload, field: None}).model_dump(mode="json")
+    envelope[field] = payload.get(field)
+    return envelope
+
+
+async def csv_chunks(stream):
+    """Encode a RowStream as CSV, one chunk per cursor batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_sent = False
+
+    async for batch in stream:
+        if not header_sent:
+            writer.writerow(stream.columns)
+            header_sent = True
+        writer.writerows(row.values() for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if not header_sent and stream.columns:
+        writer.writerow(stream.columns)
+        yield buffer.getvalue()
+
+
+async def arrow_chunks(stream):
+    """
+    Encode a RowStream as an Arrow IPC stream, one record batch per cursor batch.
+    The schema comes from the cursor's column types (stream.description),
+    so every batch fits it whatever its values, e.g. a column that is null
+    throughout the first batch.
+    """
+    import pyarrow as pa
+
+    schema = converters = None
+    async for batch in stream:
+        if schema is None:
+            schema, converters = _arrow_schema(pa, stream.description)
+            yield schema.serialize().to_pybytes()
+        yield _record_batch(pa, schema, converters, batch).serialize().to_pybytes()
+
+    if schema is None:
+        schema, _ = _arrow_schema(pa, stream.description or ())
+        yield schema.serialize().to_pybytes()
+    yield _ARROW_EOS
+
+
+# Arrow types of Postgres type OIDs (cursor.description type_code)
+_ARROW_TYPES = {
+    16: "bool_", 20: "int64", 21: "int16", 23: "int32", 26: "int64",
+    700: "float32", 701: "float64", 1082: "date32",
+    19: "string", 25: "string", 1042: "string", 1043: "string",
+}
+_NUMERIC, _BYTEA, _TIME, _TIMESTAMP, _TIMESTAMPTZ = 1700, 17, 1083, 1114, 1184
+
+
+def _arrow_schema(pa, description):
+    """(schema, converters): one field and value converter (or None) per column."""
+    # Rows are dicts, so of repeated names only one column survives: the
+    # first one's position, the last one's values
+    columns = {}
+    for column in description:
+        columns[column[0]] = column
+
+    fields, converters = [], []
+    for name, column in columns.items():
+        type_code, precision, scale = column[1], column[4], column[5]
+        convert = None
+        if type_code in _ARROW_TYPES:
+            arrow_type = getattr(pa, _ARROW_TYPES[type_code])()
+        elif type_code == _NUMERIC and precision is not None and precision <= 38:
+            arrow_type = pa.decimal128(precision, scale)
+        elif type_code in (_TIMESTAMP, _TIMESTAMPTZ):
+            arrow_type = pa.timestamp("us", tz="UTC" if type_code == _TIMESTAMPTZ else None)
+        elif type_code == _TIME:
+            arrow_type = pa.time64("us")
+        elif type_code == _BYTEA:
+            arrow_type, convert = pa.binary(), _to_bytes
+        else:
+            # JSON, arrays, UUIDs, intervals... and NUMERIC without a declared
+            # precision, which can have any number of digits
+            arrow_type, convert = pa.string(), _to_text
+        fields.append(pa.field(name, arrow_type))
+        converters.append(convert)
+    return pa.schema(fields), converters
+
+
+def _record_batch(pa, schema, converters, rows):
+    arrays = []
+    for field, convert in zip(schema, converters):
+        values = [row.get(field.name) for row in rows]
+        if convert is not None:
+            values = [None if value is None else convert(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _to_bytes(value):
+    return bytes(value)
+
+
+def _to_text(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return dump_json(value).decode()
+    return str(value)
@@ -1,9 +1,27 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Dict, List, Literal, Annotated
 
 class QueryRequest(BaseModel):
     # Enforce some basic limits to prevent abuse
     query: str = Field(..., min_length=2, max_length=1000, description="The user's natural language question")
+    format: Literal["records", "columnar"] = Field(
+        "records",
+        description="'records': list of row objects. 'columnar': {\"columns\": [...], \"rows\": [[...]]}"
+    )
+    defer_explanation: bool = Field(
+        False,
+        description="Return plan and data right away; fetch the explanation from /query/{explanation_id}/explanation"
+    )
+    include_timings: bool = Field(False, description="Add per-stage durations (ms) to the response")
+    page_size: Optional[int] = Field(
+        None, ge=1, le=10000,
+        description="Return this many rows and a next_page_token for /query/page"
+    )
+
+class PageRequest(BaseModel):
+    page_token: str = Field(..., max_length=8192, description="next_page_token from the previous page")
+    format: Literal["records", "columnar"] = "records"
+    include_timings: bool = False
 
 class QueryResponse(BaseModel):
     query: str
@@ -11,5 +29,26 @@ class QueryResponse(BaseModel):
     plan: Optional[Dict[str, Any]] = None
     data: Optional[Any] = None
     row_count: Optional[int] = 0
+    truncated: Optional[bool] = False # True if SQL_MAX_ROWS / SQL_MAX_BYTES cut the result short
+    explanation: Optional[str] = None
+    explanation_id: Optional[str] = None # Set instead of explanation when it was deferred
+    error: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None # plan_ms, execute_ms, reason_ms, total_ms... (include_timings)
+    next_page_token: Optional[str] = None # Set when page_size was given and more rows follow
+
+class BatchQueryRequest(BaseModel):
+    queries: List[Annotated[str, Field(min_length=2, max_length=1000)]] = Field(
+        ..., min_length=1, max_length=50, description="Natural language questions, answered concurrently"
+    )
+    format: Literal["records", "columnar"] = "records"
+
+class BatchQueryResponse(BaseModel):
+    # One entry per query, in request order
+    results: List[QueryResponse]
+
+class ExplanationResponse(BaseModel):
+    id: str
+    status: Literal["pending", "done", "error"]
     explanation: Optional[str] = None
     error: Optional[str] = None
+    expires_in: float # Seconds until the explanation is dropped
@@ -1,9 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends, Header
-from app.api.models import QueryRequest, QueryResponse
+import asyncio
+import time
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi.responses import Response, StreamingResponse
+from app.api.models import (
+    QueryRequest, QueryResponse, BatchQueryRequest, BatchQueryResponse, ExplanationResponse, PageRequest
+)
+from app.api.formats import FastJSONResponse, to_columnar, csv_chunks, arrow_chunks, dump_json, validated
 from app.agents.orchestrator import AgentOrchestrator
+from app.agents.executor_agent import PagingNotSupported
+from app.database.db_executor import QueryRejected
 from app.core.config import settings
 from app.utils.logger import get_logger
-from typing import Optional
+from typing import Optional, Literal
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -18,6 +26,67 @@ def get_orchestrator():
         _agent_orchestrator = AgentOrchestrator()
     return _agent_orchestrator
 
+# Startup warm-up progress, reported by /ready
+_readiness = {"status": "pending", "steps": {}}
+
+async def warm_up():
+    """
+    Build everything the first request would otherwise build (started from
+    the app lifespan). Each step is timed; a failing step is recorded and the
+    rest still run, since traffic is better served cold than not at all.
+    """
+    if not settings.WARMUP_ENABLED:
+        _readiness["status"] = "ready"
+        return
+
+    from app.database.db_executor import warm_db_pool
+    _readiness["status"] = "warming"
+    steps = _readiness["steps"]
+
+    async def step(name, coro_fn):
+        start = time.perf_counter()
+        try:
+            await coro_fn()
+            steps[name] = {"ms": round((time.perf_counter() - start) * 1000, 1)}
+        except Exception as e:
+            logger.warning(f"Warm-up step '{name}' failed: {e}")
+            steps[name] = {"error": str(e)}
+
+    async def build_orchestrator():
+        get_orchestrator()
+
+    async def canned_query():
+        result = await get_orchestrator().process_query_async(settings.WARMUP_QUERY)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        # Tools report DB errors as a row ([{"error": ...}]), steps as {"error": ...}
+        data = result.get("data")
+        for rows in data.values() if isinstance(data, dict) else [data]:
+            if isinstance(rows, dict):
+                rows = [rows]
+            if isinstance(rows, list) and rows and isinstance(rows[0], dict) and "error" in rows[0]:
+                raise RuntimeError(rows[0]["error"])
+
+    try:
+        async with asyncio.timeout(settings.WARMUP_TIMEOUT_SECONDS):
+            await step("db_pool", lambda: asyncio.to_thread(warm_db_pool))
+            await step("orchestrator", build_orchestrator)
+            await step("llm", lambda: get_orchestrator().llm.warm_up_async())
+            await step("query", canned_query)
+    except TimeoutError:
+        logger.warning("Warm-up timed out, serving anyway")
+        steps["timeout"] = {"error": f"exceeded {settings.WARMUP_TIMEOUT_SECONDS:g}s"}
+    _readiness["status"] = "ready"
+    logger.info(f"Warm-up done: {steps}")
+
+async def shutdown_orchestrator():
+    """Close the orchestrator's long-lived LLM clients (called on app shutdown)."""
+    global _agent_orchestrator
+    if _agent_orchestrator:
+        _agent_orchestrator.explanations.close()
+        await _agent_orchestrator.llm.aclose()
+        _agent_orchestrator = None
+
 # Simple API Key check
 async def check_api_key(x_api_key: Optional[str] = Header(None)):
     if settings.API_KEY and x_api_key != settings.API_KEY:
@@ -36,25 +105,229 @@ async def run_query(
 
     try:
         # Pass the query to our agent pipeline
-        result = agent.process_query(req.query)
-        return result
-        
+        result = await agent.process_query_async(
+            req.query, defer_explanation=req.defer_explanation, page_size=req.page_size
+        )
+        if req.format == "columnar" and isinstance(result.get("data"), (list, dict)):
+            # Copy: coalesced callers share the same result dict
+            result = {**result, "data": to_columnar(result["data"])}
+        if not req.include_timings:
+            result = {**result, "timings": None}
+        return FastJSONResponse(validated(QueryResponse, result))
+
+    except PagingNotSupported as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Pipeline failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/query/page", response_model=QueryResponse)
+async def next_page(
+    req: PageRequest,
+    agent: AgentOrchestrator = Depends(get_orchestrator),
+    _ = Depends(check_api_key)
+):
+    """
+    Next page of a /query made with page_size, from its next_page_token.
+    The response carries the token for the page after, if there is one.
+    """
+    try:
+        result = await agent.fetch_page_async(req.page_token)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if req.format == "columnar" and isinstance(result.get("data"), list):
+        result["data"] = to_columnar(result["data"])
+    if not req.include_timings:
+        result["timings"] = None
+    return FastJSONResponse(validated(QueryResponse, result))
+
+@router.get("/query/{explanation_id}/explanation", response_model=ExplanationResponse)
+async def get_explanation(
+    explanation_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Seconds to wait for a pending explanation"),
+    agent: AgentOrchestrator = Depends(get_orchestrator),
+    _ = Depends(check_api_key)
+):
+    """
+    Explanation for a /query made with defer_explanation=true. 404 once it
+    has expired (EXPLANATION_TTL_SECONDS after the query), or if it was
+    still unfinished and not asked for within EXPLANATION_UNCLAIMED_SECONDS.
+    """
+    result = await agent.explanations.get(explanation_id, wait=wait)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired explanation id")
+    return result
+
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def run_query_batch(
+    req: BatchQueryRequest,
+    agent: AgentOrchestrator = Depends(get_orchestrator),
+    _ = Depends(check_api_key)
+):
+    """
+    Answer many questions in one call. Duplicate questions and identical tool
+    calls are only run once; results come back in request order.
+    """
+    logger.info(f"Received batch of {len(req.queries)} queries")
+
+    try:
+        results = await agent.process_batch_async(req.queries)
+        if req.format == "columnar":
+            results = [
+                {**r, "data": to_columnar(r["data"])} if isinstance(r.get("data"), (list, dict)) else r
+                for r in results
+            ]
+        return FastJSONResponse({"results": [validated(QueryResponse, r) for r in results]})
+
+    except Exception as e:
+        logger.error(f"Batch pipeline failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/query/stream")
+async def stream_query(
+    req: QueryRequest,
+    agent: AgentOrchestrator = Depends(get_orchestrator),
+    accept: Optional[str] = Header(None),
+    _ = Depends(check_api_key)
+):
+    """
+    Streaming variant of /query: emits the plan, then rows, then explanation
+    tokens as they are produced. NDJSON by default, Server-Sent Events when the
+    client sends `Accept: text/event-stream`.
+    """
+    logger.info(f"Received streaming query: {req.query}")
+    use_sse = bool(accept and "text/event-stream" in accept)
+
+    async def event_stream():
+        try:
+            async for event in agent.stream_query(req.query):
+                yield _encode_event(event, use_sse)
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error(f"Pipeline failed: {e}")
+            yield _encode_event({"event": "error", "error": str(e)}, use_sse)
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type)
+
+@router.post("/query/export")
+async def export_query(
+    req: QueryRequest,
+    format: Literal["csv", "arrow"] = Query("csv", description="csv or arrow (Arrow IPC stream)"),
+    agent: AgentOrchestrator = Depends(get_orchestrator),
+    _ = Depends(check_api_key)
+):
+    """
+    Runs the planned tool and streams the rows as CSV or Arrow straight from
+    the cursor. No explanation is generated. A query the guard rejects is a
+    422, a failing one a 500.
+    """
+    logger.info(f"Received export ({format}): {req.query}")
+
+    if format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Arrow export needs pyarrow (pip install pyarrow)")
+
+    plan = await agent.planner.plan_async(req.query)
+    if "error" in plan:
+        raise HTTPException(status_code=400, detail=plan["error"])
+
+    stream = agent.executor.stream(
+        plan,
+        max_rows=settings.EXPORT_MAX_ROWS,
+        max_bytes=settings.EXPORT_MAX_BYTES
+    )
+    if isinstance(stream, dict):
+        raise HTTPException(status_code=400, detail=stream["error"])
+
+    # Run the query before the 200 goes out, so a failure gets its own status
+    # instead of a truncated file
+    try:
+        await stream.prefetch()
+    except QueryRejected as e:
+        raise HTTPException(status_code=422, detail=e.to_error())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Export failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Database Error: {e}")
+
+    if format == "arrow":
+        body, media_type, ext = arrow_chunks(stream), "application/vnd.apache.arrow.stream", "arrow"
+    else:
+        body, media_type, ext = csv_chunks(stream), "text/csv", "csv"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=export.{ext}"}
+    )
+
+def _encode_event(event: dict, use_sse: bool) -> str:
+    # Same encoding as the non-streaming responses
+    payload = dump_json(event).decode()
+    if use_sse:
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@router.get("/stats")
+async def get_stats(
+    agent: AgentOrchestrator = Depends(get_orchestrator),
+    _ = Depends(check_api_key)
+):
+    """Cache, request-coalescing and LLM counters for the running worker."""
+    from app.database.db_executor import get_result_cache, db_pool_stats
+    from app.utils.singleflight import singleflight_stats
+    from app.utils.logger import logging_stats
+    result_cache = get_result_cache()
+    return {
+        "llm": agent.llm.stats(),
+        "db_pool": db_pool_stats(),
+        "intent_router": agent.planner.router.stats() if agent.planner.router else None,
+        "plan_cache": agent.planner.cache.stats() if agent.planner.cache else None,
+        "result_cache": result_cache.stats() if result_cache else None,
+        "singleflight": singleflight_stats(),
+        "explanations": agent.explanations.stats(),
+        "logging": logging_stats(),
+    }
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: stage and LLM latency, tokens, pool usage, planner fallbacks."""
+    from app.utils.metrics import render_metrics
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@router.get("/live")
+async def liveness():
+    """The process is up and serving; says nothing about dependencies."""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness(response: Response):
+    """503 until the startup warm-up has finished, so load balancers hold traffic."""
+    if _readiness["status"] != "ready":
+        response.status_code = 503
+    return _readiness
+
 @router.get("/health")
 async def health_check():
     """Simple health check that also pings the DB."""
     status = {"api": "online", "db": "unknown"}
     
     try:
-        from app.database.db_executor import get_db_connection
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
-                status["db"] = "connected"
+        from app.database.db_executor import run_db_task
+        await run_db_task(_ping_db)
+        status["db"] = "connected"
     except Exception as e:
         status["db"] = f"unreachable: {e}"
         
     return status
+
+def _ping_db():
+    from app.database.db_executor import get_db_connection
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
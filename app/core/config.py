@@ -7,6 +7,15 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     LOG_LEVEL: str = "INFO"
     ALLOWED_ORIGINS: str = "http://localhost:3000,http://localhost:8000"
+
+    # --- Logging ---
+    # Records are written by a background thread; past LOG_QUEUE_SIZE pending
+    # records new ones are dropped rather than blocking requests
+    LOG_QUEUE_SIZE: int = 10000
+    # Per-logger limits for records below WARNING (a logger and its children),
+    # e.g. "app.mcp.tools=0.1" keeps 10%, "app.api.routes=50" allows 50/second
+    LOG_SAMPLING: str = ""
+    LOG_RATE_LIMITS: str = ""
     
     # --- Security ---
     # Optional API key for simple auth
@@ -18,6 +27,41 @@ class Settings(BaseSettings):
     DB_USER: str = "postgres"
     DB_PASSWORD: str = "postgres"
     DB_NAME: str = "mcp_db"
+    DB_POOL_MIN_CONN: int = 1
+    DB_POOL_MAX_CONN: int = 20
+    # Connection budget shared by all gunicorn workers: when set, each
+    # worker's pool gets DB_POOL_TOTAL_MAX_CONN // WEB_CONCURRENCY connections
+    # instead of DB_POOL_MAX_CONN
+    DB_POOL_TOTAL_MAX_CONN: Optional[int] = None
+    WEB_CONCURRENCY: int = 1
+    # Opened at startup so the first requests don't pay for connecting
+    DB_POOL_WARM_CONN: int = 4
+    # How long a request waits for a free connection before failing
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    # Connections idle at least this long are pinged on checkout (0 = always)
+    DB_POOL_VALIDATE_AFTER_SECONDS: float = 30.0
+
+    # Results are read through server-side cursors in batches and cut off
+    # (flagged as truncated) past these caps
+    SQL_FETCH_BATCH_SIZE: int = 500
+    SQL_MAX_ROWS: int = 10000
+    SQL_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # Guard for LLM-generated SQL (run_sql_query): EXPLAIN thresholds and a
+    # per-query timeout, all inside a read-only transaction
+    SQL_GUARD_MAX_COST: float = 1_000_000
+    SQL_GUARD_MAX_ROWS: int = 1_000_000
+    SQL_STATEMENT_TIMEOUT_MS: int = 5000
+
+    # Signs /query page tokens (they carry the plan to run). Every worker must
+    # use the same one: required when WEB_CONCURRENCY > 1. Unset with a single
+    # worker, a random key is used and tokens don't survive a restart
+    PAGE_TOKEN_SECRET: Optional[str] = None
+    PAGE_TOKEN_TTL_SECONDS: int = 3600
+
+    # /query/export streams straight to the client, so it can go much further
+    EXPORT_MAX_ROWS: int = 1_000_000
+    EXPORT_MAX_BYTES: int = 1024 * 1024 * 1024
 
     # --- LLM Provider ---
     # Options: 'mock', 'ollama', 'openai'
@@ -27,7 +71,68 @@ class Settings(BaseSettings):
     # Provider-specific settings
     OLLAMA_URL: str = "http://localhost:11434/api/generate"
     OLLAMA_TIMEOUT_SECONDS: int = 180
+    # How long Ollama keeps the model loaded after a request ("30m", "-1" = forever)
+    OLLAMA_KEEP_ALIVE: str = "30m"
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_TIMEOUT_SECONDS: float = 5.0
+
+    # Pooled keep-alive HTTP clients (one pool per backend)
+    LLM_POOL_SIZE: int = 10
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    # Max generations in flight per backend; extra calls wait their turn
+    OLLAMA_MAX_CONCURRENCY: int = 4
+    OPENAI_MAX_CONCURRENCY: int = 16
+
+    # Approx. tokens of result data put into the reasoner prompt
+    REASONER_TOKEN_BUDGET: int = 1500
+    REASONER_MAX_SAMPLE_ROWS: int = 20
+
+    # Share one execution between identical concurrent queries, prompts and SQL
+    SINGLE_FLIGHT_ENABLED: bool = True
+
+    # Max concurrent LLM calls (planning / reasoning) per batch request
+    BATCH_CONCURRENCY: int = 8
+
+    # Max tool calls in one multi-step plan
+    PLAN_MAX_STEPS: int = 5
+
+    # While the planner LLM runs, execute the keyword fallback's guess; kept
+    # if the LLM picks the same tool call, cancelled otherwise
+    SPECULATIVE_EXECUTION_ENABLED: bool = True
+
+    # --- Deferred Explanations ---
+    # defer_explanation=true requests get their explanation generated in the
+    # background; unfetched ones are dropped (and cancelled) after the TTL.
+    # Jobs nobody has polled within EXPLANATION_UNCLAIMED_SECONDS are
+    # cancelled early if still queued or running.
+    EXPLANATION_WORKERS: int = 4
+    EXPLANATION_MAX_PENDING: int = 100
+    EXPLANATION_TTL_SECONDS: int = 300
+    EXPLANATION_UNCLAIMED_SECONDS: int = 30
+
+    # --- Warm-up ---
+    # Run at startup before /ready reports ready: DB pool, orchestrator, LLM
+    # model load and one canned query through the whole pipeline
+    WARMUP_ENABLED: bool = True
+    WARMUP_QUERY: str = "Which employees earn more than 100000?"
+    WARMUP_TIMEOUT_SECONDS: float = 300.0
+
+    # --- Intent Router ---
+    # Simple single-tool queries matched with at least this cosine similarity
+    # are planned locally, without the LLM
+    INTENT_ROUTER_ENABLED: bool = True
+    INTENT_ROUTER_THRESHOLD: float = 0.5
+
+    # --- Plan Cache ---
+    # Skips the planner LLM call for repeated question shapes
+    PLAN_CACHE_ENABLED: bool = True
+    PLAN_CACHE_MAX_ENTRIES: int = 512
+    PLAN_CACHE_TTL_SECONDS: int = 3600
+
+    # --- Result Cache ---
+    # Needs datas_insert/table_versions.sql; bounded by estimated bytes held
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
 
     class Config:
         env_file = ".env"
@@ -1,97 +1,619 @@
+import asyncio
+import contextvars
+import time
+import uuid
 import psycopg2
-from psycopg2 import pool
+from psycopg2.extensions import connection as PGConnection
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from app.core.config import settings
+from app.database.pool import BlockingConnectionPool
+from app.database.result_cache import ResultCache, estimate_rows_bytes, normalize_sql, referenced_tables
 from app.utils.logger import get_logger
+from app.utils.metrics import DB_POOL_IN_USE, DB_POOL_MAX, DB_POOL_WAIT_SECONDS, DB_TASK_QUEUE_SECONDS
+from app.utils.singleflight import SingleFlight
 
 logger = get_logger(__name__)
 
-# Global connection pool - initializes on first use
+# Global connection pool - initializes on first use (or in warm_db_pool at startup)
 _db_pool = None
 
+class PooledConnection(PGConnection):
+    """psycopg2 connection that remembers which named statements it has PREPAREd."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+def pool_size() -> int:
+    """
+    Connections per process. With DB_POOL_TOTAL_MAX_CONN set, that budget is
+    split across the gunicorn workers (WEB_CONCURRENCY) so that all of them
+    together stay within it.
+    """
+    if settings.DB_POOL_TOTAL_MAX_CONN:
+        return max(1, settings.DB_POOL_TOTAL_MAX_CONN // max(1, settings.WEB_CONCURRENCY))
+    return settings.DB_POOL_MAX_CONN
+
+def _connect():
+    return psycopg2.connect(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        dbname=settings.DB_NAME,
+        connection_factory=PooledConnection
+    )
+
 def get_db_pool():
     global _db_pool
     if _db_pool is None:
         try:
             logger.info("Initializing DB connection pool...")
-            _db_pool = psycopg2.pool.ThreadedConnectionPool(
-                minconn=1,
-                maxconn=20, # Should be enough for this POC
-                host=settings.DB_HOST,
-                port=settings.DB_PORT,
-                user=settings.DB_USER,
-                password=settings.DB_PASSWORD,
-                dbname=settings.DB_NAME
+            db_pool = BlockingConnectionPool(
+                _connect,
+                maxconn=pool_size(),
+                timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+                validate_after=settings.DB_POOL_VALIDATE_AFTER_SECONDS
             )
+            db_pool.warm(settings.DB_POOL_MIN_CONN)
+            _db_pool = db_pool
+            DB_POOL_MAX.set(db_pool.maxconn)
         except Exception as e:
             logger.error(f"DB Connection failed: {e}")
             raise ConnectionError(f"Could not connect to database: {e}")
             
     return _db_pool
 
+def warm_db_pool():
+    """Open DB_POOL_WARM_CONN connections ahead of the first requests (app startup)."""
+    opened = get_db_pool().warm(settings.DB_POOL_WARM_CONN)
+    logger.info(f"DB pool warmed: {opened} new connections ({_db_pool.maxconn} max)")
+
+def db_pool_stats():
+    return _db_pool.stats() if _db_pool is not None else None
+
 @contextmanager
 def get_db_connection():
     pool = get_db_pool()
+    start = time.perf_counter()
     conn = pool.getconn()
+    DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+    DB_POOL_IN_USE.inc()
     try:
         yield conn
     finally:
         pool.putconn(conn)
+        DB_POOL_IN_USE.dec()
+
+# --- Async Access ---
+# psycopg2 is blocking, so the async API runs DB work on a dedicated thread pool
+# sized to the connection pool. Awaiting callers queue here instead of
+# blocking the event loop or exhausting the connection pool.
+_db_threads = None
+
+def _get_db_threads():
+    global _db_threads
+    if _db_threads is None:
+        _db_threads = ThreadPoolExecutor(
+            max_workers=pool_size(),
+            thread_name_prefix="db"
+        )
+    return _db_threads
+
+async def run_db_task(func, *args, **kwargs):
+    """Run a blocking DB function (e.g. an MCP tool) without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    queued = time.perf_counter()
+
+    # run_in_executor doesn't carry context over; copy it so the request id
+    # reaches the worker thread's log records
+    context = contextvars.copy_context()
+
+    def run():
+        DB_TASK_QUEUE_SECONDS.observe(time.perf_counter() - queued)
+        return context.run(func, *args, **kwargs)
+
+    return await loop.run_in_executor(_get_db_threads(), run)
+
+def shutdown_db():
+    """Release the worker threads and close every pooled connection."""
+    global _db_pool, _db_threads
+    if _db_threads is not None:
+        _db_threads.shutdown(wait=True)
+        _db_threads = None
+    if _db_pool is not None:
+        _db_pool.closeall()
+        _db_pool = None
+
+# --- Result Cache ---
+# Reads are cached per (normalized SQL, params) and invalidated through the
+# per-table version counters installed by datas_insert/table_versions.sql.
+_result_cache = None
+_table_versions_available = True
+
+def get_result_cache():
+    global _result_cache
+    if _result_cache is None and settings.RESULT_CACHE_ENABLED:
+        _result_cache = ResultCache(max_bytes=settings.RESULT_CACHE_MAX_BYTES)
+    return _result_cache
+
+def _read_table_versions(conn, tables):
+    """
+    Current version of each table, or None if any of them isn't tracked.
+    Read before the query itself, so a write landing in between can only make
+    the cached entry look older than it is - never newer.
+    """
+    global _table_versions_available
+    if not _table_versions_available:
+        return None
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT table_name, version FROM table_versions WHERE table_name = ANY(%s)",
+                (sorted(tables),)
+            )
+            versions = dict(cursor.fetchall())
+    except psycopg2.Error as e:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass  # broken connection: the query itself will report it
+        if isinstance(e, psycopg2.errors.UndefinedTable):
+            _table_versions_available = False
+            logger.warning(f"Result cache disabled, table_versions unavailable: {e}")
+        else:
+            # Disconnect, lock timeout...: skip the cache for this query only
+            logger.warning(f"Couldn't read table versions, not caching this query: {e}")
+        return None
+
+    return versions if len(versions) == len(tables) else None
+
+# Identical (SQL, params) running at the same time share one DB round trip
+_sql_flight = SingleFlight("execute_raw_sql")
 
 # --- Raw SQL Execution (Text-to-SQL Support) ---
 
-def execute_raw_sql(query: str, params: tuple = None):
+class ResultSet(list):
+    """Rows returned by execute_raw_sql. `truncated` is set when a row/byte cap cut it short."""
+    truncated = False
+    # execute_page(): key of the last row when more pages follow
+    next_after = None
+
+class QueryRejected(Exception):
+    """
+    Raised when the guard refuses (or cancels) an untrusted query.
+    to_error() is the structured error handed back to the planner.
+    """
+
+    def __init__(self, message: str, code: str, **details):
+        super().__init__(message)
+        self.code = code
+        self.details = details
+
+    def to_error(self):
+        return {"error": str(self), "code": self.code, **self.details}
+
+class Rejection(list):
+    """
+    What execute_raw_sql returns for a query the guard refused:
+    [QueryRejected.to_error()], typed so it can't be mistaken for a row
+    that happens to have "error" and "code" columns.
+    """
+
+    @property
+    def error(self):
+        return self[0]
+
+def guard_untrusted_sql(conn, query: str, params: tuple = None, max_rows: int = None):
+    """
+    Cost guard for LLM-generated SQL, run on `conn` before the query itself.
+    Makes the transaction read-only with a statement_timeout, wraps the query
+    in a row-capping LIMIT, then EXPLAINs it and rejects it if the estimated
+    cost (or, for a query with its own LIMIT, row count) is over the
+    configured thresholds.
+    Returns the rewritten query.
+    """
+    max_rows = max_rows if max_rows is not None else settings.SQL_MAX_ROWS
+    query = query.strip().rstrip(";")
+    # Wrapped rather than appended: a trailing "-- comment" or a LIMIT in a
+    # subquery can't defeat it. One extra row so truncation can be detected.
+    query = f"SELECT * FROM (\n{query}\n) AS _q LIMIT {max_rows + 1}"
+
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL transaction_read_only = on")
+        cursor.execute("SET LOCAL statement_timeout = %s", (settings.SQL_STATEMENT_TIMEOUT_MS,))
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+        plan = cursor.fetchone()[0][0]["Plan"]
+
+    cost, rows = plan["Total Cost"], plan["Plan Rows"]
+    # The query's own top-level LIMIT, if any, is the node under ours
+    inner = plan["Plans"][0] if plan.get("Plans") else plan
+    while inner["Node Type"] == "Subquery Scan" and inner.get("Plans"):
+        inner = inner["Plans"][0]
+    has_limit = inner["Node Type"] == "Limit"
+    if has_limit:
+        rows = inner["Plan Rows"]
+    if cost > settings.SQL_GUARD_MAX_COST:
+        logger.warning(f"Rejected query (estimated cost {cost}): {query}")
+        raise QueryRejected(
+            f"Query rejected: estimated cost {cost:g} exceeds the limit of {settings.SQL_GUARD_MAX_COST:g}",
+            code="query_too_expensive",
+            query=query,
+            estimated_cost=cost,
+            estimated_rows=rows,
+            hint="Add selective WHERE filters, avoid cross joins and large sorts, or aggregate instead of listing rows."
+        )
+    # With no LIMIT of its own the result is already capped by ours
+    if has_limit and rows > settings.SQL_GUARD_MAX_ROWS:
+        logger.warning(f"Rejected query (estimated rows {rows}): {query}")
+        raise QueryRejected(
+            f"Query rejected: estimated {rows} rows exceeds the limit of {settings.SQL_GUARD_MAX_ROWS}",
+            code="result_too_large",
+            query=query,
+            estimated_cost=cost,
+            estimated_rows=rows,
+            hint="Use a smaller LIMIT or aggregate the rows."
+        )
+    return query
+
+class RowStream:
+    """
+    Iterates a SELECT in batches through a server-side (named) cursor, so
+    only one batch is held in memory at a time. Stops early once max_rows or
+    max_bytes is reached and sets `truncated`.
+
+    Sync:  for batch in RowStream(sql, params): ...
+    Async: async for batch in RowStream(sql, params): ...
+
+    `columns` and `description` (the cursor's, for column types) are set
+    once the query has run.
+    """
+
+    def __init__(self, query: str, params: tuple = None, batch_size: int = None,
+                 max_rows: int = None, max_bytes: int = None, conn=None,
+                 untrusted: bool = False):
+        self.query = query
+        self.params = params
+        # LLM-generated SQL goes through guard_untrusted_sql() first
+        self.untrusted = untrusted
+        self.batch_size = batch_size or settings.SQL_FETCH_BATCH_SIZE
+        self.max_rows = max_rows if max_rows is not None else settings.SQL_MAX_ROWS
+        self.max_bytes = max_bytes if max_bytes is not None else settings.SQL_MAX_BYTES
+        self._conn = conn
+        self.columns = []
+        self.description = None
+        self.row_count = 0
+        self.truncated = False
+        self._prefetched = None
+
+    def __iter__(self):
+        if not _is_select(self.query):
+            logger.warning(f"Blocked unsafe query: {self.query}")
+            raise ValueError("Security Alert: Only SELECT queries are allowed.")
+
+        if self._conn is not None:
+            yield from self._batches(self._conn)
+        else:
+            with get_db_connection() as conn:
+                yield from self._batches(conn)
+
+    def __aiter__(self):
+        if self._prefetched is not None:
+            batches, self._prefetched = self._prefetched, None
+            return batches
+        return self._fetch_async()
+
+    async def prefetch(self):
+        """
+        Run the query and fetch the first batch now, so a guard rejection or
+        SQL error is raised here rather than partway through `async for`
+        (e.g. after a response's headers are sent). Iterating then starts
+        with that batch.
+        """
+        batches = self._fetch_async()
+        try:
+            first = await batches.__anext__()
+        except StopAsyncIteration:
+            first = None
+        self._prefetched = _prepend(first, batches)
+
+    async def _fetch_async(self):
+        # Each batch is fetched on the DB worker threads
+        batches = iter(self)
+        try:
+            while True:
+                batch = await run_db_task(next, batches, None)
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            await run_db_task(batches.close)
+
+    def _batches(self, conn):
+        query = self.query
+        if self.untrusted:
+            query = guard_untrusted_sql(conn, query, self.params, self.max_rows)
+
+        logger.debug("Executing SQL: %s | Params: %s", query, self.params)
+        with conn.cursor(name=f"mcp_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = self.batch_size
+            cursor.execute(query, self.params)
+
+            total_bytes = 0
+            while True:
+                try:
+                    rows = cursor.fetchmany(self.batch_size)
+                except psycopg2.errors.QueryCanceled as e:
+                    if not self.untrusted:
+                        raise
+                    raise QueryRejected(
+                        f"Query cancelled: ran longer than {settings.SQL_STATEMENT_TIMEOUT_MS} ms",
+                        code="statement_timeout",
+                        query=query,
+                        hint="Make the query cheaper: filter earlier, avoid cross joins, or aggregate."
+                    ) from e
+                if not self.columns and cursor.description:
+                    self.columns = [desc[0] for desc in cursor.description]
+                    self.description = cursor.description
+                if not rows:
+                    break
+
+                batch = []
+                for row in rows:
+                    record = dict(zip(self.columns, row))
+                    total_bytes += estimate_rows_bytes([record])
+                    if self.row_count >= self.max_rows or total_bytes > self.max_bytes:
+                        self.truncated = True
+                        break
+                    batch.append(record)
+                    self.row_count += 1
+
+                if batch:
+                    yield batch
+                if self.truncated:
+                    logger.warning(f"Result truncated at {self.row_count} rows")
+                    break
+
+        logger.debug("Query returned %d rows", self.row_count)
+
+async def _prepend(first, batches):
+    if first is not None:
+        yield first
+    async for batch in batches:
+        yield batch
+
+def _is_select(query: str) -> bool:
+    return query.strip().lower().startswith("select")
+
+def execute_raw_sql(query: str, params: tuple = None, untrusted: bool = False):
     """
     Executes a raw SQL query generated by the LLM.
     SAFETY: Strictly restricts execution to SELECT statements only.
     Supports parameterized queries to prevent SQL injection.
+    Results are capped by SQL_MAX_ROWS / SQL_MAX_BYTES (see ResultSet.truncated).
+    With untrusted=True the query also goes through guard_untrusted_sql(); a
+    rejection comes back as a Rejection ([QueryRejected.to_error()]).
     """
-    clean_query = query.strip().lower()
-    
     # Strictly forbid anything that isn't a SELECT
-    if not clean_query.startswith("select"):
+    if not _is_select(query):
         logger.warning(f"Blocked unsafe query: {query}")
         return [{"error": "Security Alert: Only SELECT queries are allowed."}]
-        
+
+    return _execute_select(query, params, untrusted=untrusted)
+
+def execute_prepared(name: str, params: tuple):
+    """
+    Runs one of the fixed PREPARED_STATEMENTS. Same result (and caching) as
+    execute_raw_sql() on its SQL, but Postgres parses and plans it only once
+    per pooled connection.
+    """
+    return _execute_select(PREPARED_STATEMENTS[name], params, statement=name)
+
+def _execute_select(query: str, params: tuple = None, statement: str = None, untrusted: bool = False):
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return _run_select(query, params, statement, untrusted)
+    key = (normalize_sql(query), repr(params), untrusted)
+    return _sql_flight.do_sync(key, lambda: _run_select(query, params, statement, untrusted))
+
+def _run_select(query: str, params: tuple = None, statement: str = None, untrusted: bool = False):
+    cache = get_result_cache()
+    tables = referenced_tables(query) if cache else None
+    cache_key = (normalize_sql(query), tuple(params) if params else None)
+
     try:
         with get_db_connection() as conn:
-            with conn.cursor() as cursor:
-                logger.info(f"Executing SQL: {query} | Params: {params}")
-                cursor.execute(query, params)
-                
-                # Fetch column names to return structured data
-                if cursor.description:
-                    columns = [desc[0] for desc in cursor.description]
-                    rows = cursor.fetchall()
-                    
-                    results = []
-                    for row in rows:
-                        results.append(dict(zip(columns, row)))
-                    
-                    logger.info(f"Query returned {len(rows)} rows")
-                    return results
-                else:
-                    return []
+            versions = _read_table_versions(conn, tables) if tables else None
+            if versions is not None:
+                cached = cache.get(cache_key, versions)
+                if cached is not None:
+                    logger.debug("Result cache hit (%d rows)", len(cached))
+                    return ResultSet(cached)
+
+            if statement:
+                results = _run_prepared(conn, statement, params)
+            else:
+                stream = RowStream(query, params, conn=conn, untrusted=untrusted)
+                results = ResultSet()
+                for batch in stream:
+                    results.extend(batch)
+                results.truncated = stream.truncated
+
+            # A truncated result isn't the answer to the query, so don't reuse it
+            if versions is not None and not results.truncated:
+                cache.put(cache_key, versions, results)
+            return results
+    except QueryRejected as e:
+        return Rejection([e.to_error()])
     except Exception as e:
         logger.error(f"SQL Execution Error: {e}")
         return [{"error": f"Database Error: {str(e)}"}]
 
+def _run_prepared(conn, name: str, params: tuple):
+    """EXECUTE a registered statement, PREPAREing it first on this connection if needed."""
+    max_rows, max_bytes = settings.SQL_MAX_ROWS, settings.SQL_MAX_BYTES
+    with conn.cursor() as cursor:
+        if name not in conn.prepared:
+            cursor.execute(f"PREPARE {name} AS {_prepared_text(PREPARED_STATEMENTS[name])}")
+            conn.prepared.add(name)
+
+        # The trailing LIMIT parameter enforces the row cap in the database;
+        # one extra row tells us whether the result was cut short
+        placeholders = ", ".join(["%s"] * (len(params) + 1))
+        logger.debug("Executing prepared statement: %s | Params: %s", name, params)
+        cursor.execute(f"EXECUTE {name} ({placeholders})", (*params, max_rows + 1))
+        columns = [desc[0] for desc in cursor.description]
+        rows = cursor.fetchall()
+
+    results = ResultSet()
+    total_bytes = 0
+    for row in rows:
+        record = dict(zip(columns, row))
+        total_bytes += estimate_rows_bytes([record])
+        if len(results) >= max_rows or total_bytes > max_bytes:
+            results.truncated = True
+            logger.warning(f"Result truncated at {len(results)} rows")
+            break
+        results.append(record)
+
+    logger.debug("Query returned %d rows", len(results))
+    return results
+
+def _prepared_text(query: str) -> str:
+    # %s placeholders -> $1..$n, plus a final LIMIT parameter for the row cap
+    parts = query.split("%s")
+    text = parts[0]
+    for i, part in enumerate(parts[1:], start=1):
+        text += f"${i}" + part
+    return f"{text} LIMIT ${len(parts)}"
+
+# --- Keyset Pagination ---
+# Pages are read in order of this column with "WHERE id > <last id>" rather
+# than OFFSET, so a deep page costs the same as the first one (given an index
+# that ends in id, see datas_insert/tool_indexes.sql). The seek is only right
+# when the column is unique in the result, e.g. a single table's primary key.
+PAGE_KEY = "id"
+
+def _paged_subquery(query: str, params: tuple):
+    # Wrapped on lines of its own by the callers, so a trailing comment can't
+    # swallow the paging clauses
+    query = query.strip().rstrip(";")
+    if params is None:
+        # The query is about to get parameters: keep its literal % signs
+        query = query.replace("%", "%%")
+    return query
+
+def page_sql(query: str, params: tuple, page_size: int, after=None):
+    """(sql, params) for one page of `query`: rows past `after`, plus one to tell if more follow."""
+    query = _paged_subquery(query, params)
+    seek = f"WHERE {PAGE_KEY} > %s " if after is not None else ""
+    sql = f"SELECT * FROM (\n{query}\n) AS page {seek}ORDER BY {PAGE_KEY} LIMIT %s"
+    return sql, (*(params or ()), *(() if after is None else (after,)), page_size + 1)
+
+def execute_page(query: str, params: tuple = None, page_size: int = 100, after=None):
+    """
+    One page of a SELECT without ORDER BY whose result has PAGE_KEY as a
+    unique column, ordered by it and starting after the key `after` (None for
+    the first page). Returns a ResultSet whose `next_after` is the key to pass
+    for the next page (None on the last one), or an error list like
+    execute_raw_sql().
+    """
+    sql, sql_params = page_sql(query, params, page_size, after)
+    rows = _execute_select(sql, sql_params)
+    if not isinstance(rows, ResultSet):
+        return rows  # error
+
+    # A page cut short by the row/byte caps just ends early: the next one
+    # carries on from its last row
+    page = ResultSet(rows[:page_size])
+    if page and (len(rows) > page_size or rows.truncated):
+        page.next_after = page[-1][PAGE_KEY]
+    return page
+
+def execute_offset_page(query: str, params: tuple = None, page_size: int = 100, offset: int = 0,
+                        untrusted: bool = False):
+    """
+    One page of any SELECT by position, for results with no unique key to
+    seek on (LLM-written SQL, aggregates): `page_size` rows from `offset`,
+    in the query's own order - stable across pages only if it has an ORDER
+    BY. SQL_MAX_ROWS caps the result as a whole, not each page. Returns a
+    ResultSet whose `next_after` is the offset of the next page (None on the
+    last one), or an error list like execute_raw_sql().
+    """
+    size = min(page_size, settings.SQL_MAX_ROWS - offset)
+    if size <= 0:
+        page = ResultSet()
+        page.truncated = True
+        return page
+
+    sql = f"SELECT * FROM (\n{_paged_subquery(query, params)}\n) AS page OFFSET %s LIMIT %s"
+    rows = _execute_select(sql, (*(params or ()), offset, size + 1), untrusted=untrusted)
+    if not isinstance(rows, ResultSet):
+        return rows  # error
+
+    page = ResultSet(rows[:size])
+    if len(rows) > size or rows.truncated:
+        if offset + len(page) < settings.SQL_MAX_ROWS and page:
+            page.next_after = offset + len(page)
+        else:
+            page.truncated = True
+    return page
+
+async def execute_raw_sql_async(query: str, params: tuple = None, untrusted: bool = False):
+    """Async wrapper around execute_raw_sql()."""
+    return await run_db_task(execute_raw_sql, query, params, untrusted)
+
 # --- Legacy Helper Functions (kept for backward compatibility) ---
 
+EMPLOYEES_BY_DEPARTMENT_SQL = "SELECT id, name, email, department, salary FROM employees WHERE LOWER(department) = LOWER(%s)"
+PROJECTS_BY_STATUS_SQL = "SELECT id, name, description, status, start_date, end_date, budget FROM projects WHERE LOWER(status) = LOWER(%s)"
+ISSUES_BY_PRIORITY_SQL = "SELECT id, title, description, priority, status, assigned_to FROM issues WHERE LOWER(priority) = LOWER(%s)"
+
+# Aggregates, read from the trigger-maintained summary tables in
+# datas_insert/aggregates.sql (one row per group, so constant time). The
+# argument picks one group, or every group when it is ALL_GROUPS.
+ALL_GROUPS = "all"
+DEPARTMENT_STATS_SQL = (
+    "SELECT department, employee_count, active_count, ROUND(salary_sum / NULLIF(salary_count, 0), 2) AS avg_salary, "
+    "salary_sum AS total_salary FROM department_stats "
+    "WHERE LOWER(%s) = 'all' OR LOWER(department) = LOWER(%s) ORDER BY department"
+)
+PROJECT_STATS_SQL = (
+    "SELECT status, project_count, ROUND(budget_sum / NULLIF(budget_count, 0), 2) AS avg_budget, "
+    "budget_sum AS total_budget FROM project_stats "
+    "WHERE LOWER(%s) = 'all' OR LOWER(status) = LOWER(%s) ORDER BY status"
+)
+ISSUE_STATS_SQL = (
+    "SELECT priority, status, issue_count FROM issue_stats "
+    "WHERE LOWER(%s) = 'all' OR LOWER(priority) = LOWER(%s) ORDER BY priority, status"
+)
+
+# Statements the fixed tools run through execute_prepared(). The LOWER(column)
+# predicates are served by the expression indexes in datas_insert/tool_indexes.sql.
+PREPARED_STATEMENTS = {
+    "employees_by_department": EMPLOYEES_BY_DEPARTMENT_SQL,
+    "projects_by_status": PROJECTS_BY_STATUS_SQL,
+    "issues_by_priority": ISSUES_BY_PRIORITY_SQL,
+    "department_stats": DEPARTMENT_STATS_SQL,
+    "project_stats": PROJECT_STATS_SQL,
+    "issue_stats": ISSUE_STATS_SQL,
+}
+
 def fetch_employees_by_department(department):
-    return execute_raw_sql(
-        "SELECT id, name, email, department, salary FROM employees WHERE LOWER(department) = LOWER(%s)",
-        (department,)
-    )
+    return execute_prepared("employees_by_department", (department,))
 
 def fetch_projects_by_status(status):
-    return execute_raw_sql(
-        "SELECT id, name, description, status, start_date, end_date, budget FROM projects WHERE LOWER(status) = LOWER(%s)",
-        (status,)
-    )
+    return execute_prepared("projects_by_status", (status,))
 
 def fetch_issues_by_priority(priority):
-    return execute_raw_sql(
-        "SELECT id, title, description, priority, status, assigned_to FROM issues WHERE LOWER(priority) = LOWER(%s)",
-        (priority,)
-    )
+    return execute_prepared("issues_by_priority", (priority,))
+
+def fetch_department_stats(department=ALL_GROUPS):
+    return execute_prepared("department_stats", (department, department))
+
+def fetch_project_stats(status=ALL_GROUPS):
+    return execute_prepared("project_stats", (status, status))
+
+def fetch_issue_stats(priority=ALL_GROUPS):
+    return execute_prepared("issue_stats", (priority, priority))
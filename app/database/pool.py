@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import deque
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PoolTimeout(PoolError):
+    """No connection became free within the acquire timeout."""
+
+
+class BlockingConnectionPool:
+    """
+    Thread-safe connection pool that queues callers instead of failing.
+
+    Unlike psycopg2's ThreadedConnectionPool, which raises as soon as
+    `maxconn` connections are out and closes returned connections beyond
+    `minconn`, this one keeps up to `maxconn` connections open and makes
+    getconn() wait (up to `timeout` seconds) for one to come back. A
+    connection idle for `validate_after` seconds or more is pinged on
+    checkout and replaced if it's dead, e.g. after a Postgres restart.
+    """
+
+    def __init__(self, connect, maxconn: int, timeout: float, validate_after: float):
+        self._connect = connect
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.validate_after = validate_after
+        self._idle = deque()  # (conn, last returned at), most recent on the right
+        self._size = 0  # open connections, idle or checked out
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.replaced = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def warm(self, count: int):
+        """Open connections until `count` (at most maxconn) are idle in the pool."""
+        with self._cond:
+            count = max(0, min(count - len(self._idle), self.maxconn - self._size))
+            self._size += count
+        opened = []
+        try:
+            for _ in range(count):
+                opened.append(self._connect())
+        finally:
+            with self._cond:
+                self._size -= count - len(opened)
+                self._idle.extend((conn, time.monotonic()) for conn in opened)
+                self._cond.notify(len(opened))
+        return len(opened)
+
+    def getconn(self, timeout: float = None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            conn, last_used = self._acquire(deadline, timeout)
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+            elif not self._usable(conn, last_used):
+                with self._cond:
+                    self.replaced += 1
+                logger.warning("Discarding broken pooled connection")
+                self._discard(conn)
+                continue
+
+            elapsed = time.monotonic() - start
+            with self._cond:
+                self.checkouts += 1
+                self.total_wait += elapsed
+                self.max_wait = max(self.max_wait, elapsed)
+                if elapsed > 0.001:
+                    self.waits += 1
+            return conn
+
+    def putconn(self, conn, close: bool = False):
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True  # server connection lost
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+
+        if close or conn.closed or self._closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max": self.maxconn,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "replaced": self.replaced,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+            }
+
+    def _acquire(self, deadline, timeout):
+        """(idle conn, last used) or (None, None) with a slot reserved for a new one."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.maxconn:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection free within {timeout:g}s ({self.maxconn} in use)"
+                    )
+                self._cond.wait(remaining)
+
+    def _usable(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.validate_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        finally:
+            self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
@@ -0,0 +1,162 @@
+import re
+import sys
+import threading
+from collections import OrderedDict
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Targets of FROM / JOIN, up to the next clause keyword
+_FROM_RE = re.compile(
+    r"\b(?:from|join)\s+(.+?)"
+    r"(?=\b(?:select|from|where|group|order|limit|offset|having|union|intersect|except|"
+    r"join|on|using|inner|left|right|full|cross|natural|window|fetch|for)\b|\)|;|$)",
+    re.IGNORECASE | re.DOTALL
+)
+
+# "..., (subquery) alias, other_table" - the table after a closed subquery
+_AFTER_SUBQUERY_RE = re.compile(r"\)\s*(?:as\s+)?\w*\s*,\s*([\w.\"]+)", re.IGNORECASE)
+
+# A parenthesized FROM item that is a subquery rather than a join
+_SUBQUERY_RE = re.compile(r"\(\s*(?:select|with|values)\b", re.IGNORECASE)
+
+# Results that depend on more than table contents must never be cached.
+# age(x) counts from today; age(x, y) doesn't, but isn't worth telling apart.
+_VOLATILE_RE = re.compile(
+    r"\b(?:now|random|clock_timestamp|statement_timestamp|timeofday|current_date|"
+    r"current_time|current_timestamp|localtime|localtimestamp|nextval|txid_current)\b"
+    r"|\bage\s*\(",
+    re.IGNORECASE
+)
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace and drop a trailing semicolon."""
+    return " ".join(query.split()).rstrip(";").strip()
+
+
+def referenced_tables(query: str):
+    """
+    Best-effort list of the tables a SELECT reads from.
+    Returns None when the query can't be safely tied to a set of tables
+    (no tables at all, parenthesized joins, or volatile functions such as
+    now()).
+    """
+    if _VOLATILE_RE.search(query):
+        return None
+
+    names = []
+    for match in _FROM_RE.finditer(query):
+        offset = match.start(1)
+        for item in match.group(1).split(","):
+            words = item.split()
+            if words and words[0].startswith("("):
+                # Subqueries are matched on their own. Anything else in
+                # parentheses (e.g. a join) may hide tables: don't cache.
+                if not _SUBQUERY_RE.match(query, offset + item.index("(")):
+                    return None
+            elif words:
+                names.append(words[0])
+            offset += len(item) + 1
+
+    # Anything after the first FROM that looks like a table following a
+    # subquery. May over-match (e.g. ORDER BY lower(x), y), which only means
+    # the result isn't cached.
+    first_from = re.search(r"\bfrom\b", query, re.IGNORECASE)
+    if first_from:
+        names += _AFTER_SUBQUERY_RE.findall(query, first_from.end())
+
+    tables = set()
+    for name in names:
+        name = name.strip('"').lower()
+        if name.startswith("public."):
+            name = name[len("public."):]
+        tables.add(name)
+    return tables or None
+
+
+def estimate_rows_bytes(rows) -> int:
+    """Rough in-memory size of a list of row dicts."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row.values():
+            size += sys.getsizeof(value)
+    return size
+
+
+class ResultCache:
+    """
+    Byte-bounded LRU cache of query results.
+
+    Each entry remembers the version of every table it read (see
+    datas_insert/table_versions.sql). A lookup only hits if all of those
+    versions are unchanged, so a committed write invalidates it immediately.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key, versions: dict):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            entry_versions, rows, size = entry
+            if entry_versions != versions:
+                # A table changed since this result was read
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(rows)
+
+    def put(self, key, versions: dict, rows: list):
+        size = estimate_rows_bytes(rows)
+        if size > self.max_bytes:
+            return  # Too big to be worth holding
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (versions, list(rows), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
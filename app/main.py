@@ -1,9 +1,13 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.routes import router as api_router
-from app.utils.logger import get_logger
+from app.api.routes import router as api_router, shutdown_orchestrator, warm_up
+from app.database.db_executor import shutdown_db
+from app.api.middleware import RequestIdMiddleware
+from app.utils.logger import get_logger, shutdown_logging
+from app.utils.page_token import check_page_token_secret
 
 logger = get_logger(__name__)
 
@@ -11,11 +15,22 @@ logger = get_logger(__name__)
 async def lifespan(app: FastAPI):
     # Startup logic
     logger.info(f"Booting up {settings.APP_NAME}...")
+    # In the background so /live answers while warming; /ready waits for it
+    warmup = asyncio.create_task(warm_up())
     yield
     # Shutdown logic
     logger.info("Gracefully shutting down...")
+    warmup.cancel()
+    with suppress(asyncio.CancelledError):
+        await warmup
+    await shutdown_orchestrator()
+    shutdown_db()
+    shutdown_logging()
 
 def create_app() -> FastAPI:
+    # Fail the worker's boot rather than 400 on most /query/page calls
+    check_page_token_secret()
+
     app = FastAPI(
         title=settings.APP_NAME,
         description="MCP Agent API - POC",
@@ -35,7 +50,10 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["GET", "POST"], # We only really need these
         allow_headers=["*"],
+        expose_headers=["X-Request-ID"],
     )
+    # Added last so it wraps everything, CORS included
+    app.add_middleware(RequestIdMiddleware)
 
     app.include_router(api_router, prefix="/api/v1")
 
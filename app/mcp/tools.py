@@ -2,7 +2,16 @@ from app.database.db_executor import (
     execute_raw_sql,
     fetch_employees_by_department,
     fetch_projects_by_status,
-    fetch_issues_by_priority
+    fetch_issues_by_priority,
+    fetch_department_stats,
+    fetch_project_stats,
+    fetch_issue_stats,
+    EMPLOYEES_BY_DEPARTMENT_SQL,
+    PROJECTS_BY_STATUS_SQL,
+    ISSUES_BY_PRIORITY_SQL,
+    DEPARTMENT_STATS_SQL,
+    PROJECT_STATS_SQL,
+    ISSUE_STATS_SQL
 )
 from app.utils.logger import get_logger
 
@@ -16,24 +25,40 @@ def run_sql_query(query: str):
     Use this tool when the user asks a complex question that requires joining tables or specific filtering not covered by other tools.
     The query MUST be a valid SQL SELECT statement.
     """
-    logger.info(f"Tool: Run SQL Query")
-    return execute_raw_sql(query)
+    logger.debug("Tool: Run SQL Query")
+    # LLM-written SQL: EXPLAIN cost check, auto-LIMIT, read-only + timeout
+    return execute_raw_sql(query, untrusted=True)
 
 def get_employees_by_department(department: str):
     """Fetch employees in a specific department (e.g. AI, Backend, Frontend)."""
-    logger.info(f"Tool: Get employees (dept={department})")
+    logger.debug("Tool: Get employees (dept=%s)", department)
     return fetch_employees_by_department(department)
 
 def get_projects_by_status(status: str):
     """Fetch projects by status (e.g. In Progress, Completed, Planning)."""
-    logger.info(f"Tool: Get projects (status={status})")
+    logger.debug("Tool: Get projects (status=%s)", status)
     return fetch_projects_by_status(status)
 
 def get_issues_by_priority(priority: str):
     """Fetch issues by priority (High, Medium, Low, Critical)."""
-    logger.info(f"Tool: Get issues (priority={priority})")
+    logger.debug("Tool: Get issues (priority=%s)", priority)
     return fetch_issues_by_priority(priority)
 
+def get_department_stats(department: str):
+    """Headcount, active headcount, average and total salary per department ('all' for every department)."""
+    logger.debug("Tool: Department stats (dept=%s)", department)
+    return fetch_department_stats(department)
+
+def get_project_stats(status: str):
+    """Project count, average and total budget per status ('all' for every status)."""
+    logger.debug("Tool: Project stats (status=%s)", status)
+    return fetch_project_stats(status)
+
+def get_issue_stats(priority: str):
+    """Issue count per priority and status, e.g. open issues per priority ('all' for every priority)."""
+    logger.debug("Tool: Issue stats (priority=%s)", priority)
+    return fetch_issue_stats(priority)
+
 # Expose tools to the agent
 # The keys here match what the Planner agent sees
 TOOLS = {
@@ -41,4 +66,29 @@ TOOLS = {
     "get_employees_by_department": get_employees_by_department,
     "get_projects_by_status": get_projects_by_status,
     "get_issues_by_priority": get_issues_by_priority,
+    "get_department_stats": get_department_stats,
+    "get_project_stats": get_project_stats,
+    "get_issue_stats": get_issue_stats,
+}
+
+# Tools answering aggregate questions from the summary tables
+AGGREGATE_TOOLS = {"get_department_stats", "get_project_stats", "get_issue_stats"}
+
+# Tools whose SQL comes from the LLM and must go through the cost guard
+UNTRUSTED_SQL_TOOLS = {"run_sql_query"}
+
+# Tools returning one row per table row with its primary key as "id", which
+# can be paged by keyset (see db_executor.execute_page)
+PAGED_TOOLS = {"get_employees_by_department", "get_projects_by_status", "get_issues_by_priority"}
+
+# The (sql, params) behind each tool, for callers that stream rows through
+# a RowStream instead of receiving a finished list
+TOOL_SQL = {
+    "run_sql_query": lambda query: (query, None),
+    "get_employees_by_department": lambda department: (EMPLOYEES_BY_DEPARTMENT_SQL, (department,)),
+    "get_projects_by_status": lambda status: (PROJECTS_BY_STATUS_SQL, (status,)),
+    "get_issues_by_priority": lambda priority: (ISSUES_BY_PRIORITY_SQL, (priority,)),
+    "get_department_stats": lambda department: (DEPARTMENT_STATS_SQL, (department, department)),
+    "get_project_stats": lambda status: (PROJECT_STATS_SQL, (status, status)),
+    "get_issue_stats": lambda priority: (ISSUE_STATS_SQL, (priority, priority)),
 }
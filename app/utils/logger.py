@@ -1,25 +1,180 @@
+import atexit
+import contextvars
 import logging
+import queue
+import random
 import sys
-import json
+import threading
+import time
 from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
 from app.core.config import settings
 
+# Set per HTTP request by RequestIdMiddleware; attached to every record
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+
 class JsonFormatter(logging.Formatter):
     """
     Simple JSON formatter for production logs.
-    Example: {"timestamp": "...", "level": "INFO", "message": "..."}
+    Example: {"timestamp": "...", "level": "INFO", "message": "...", "request_id": "..."}
     """
     def format(self, record):
         log_obj = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
             "level": record.levelname,
             "message": record.getMessage(),
+            "logger": record.name,
             "module": record.module,
             "line": record.lineno,
         }
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            log_obj["request_id"] = request_id
         if record.exc_info:
             log_obj["exception"] = self.formatException(record.exc_info)
-        return json.dumps(log_obj)
+        return orjson.dumps(log_obj, default=str).decode()
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    Hands records to a QueueListener thread that formats and writes them, so
+    the caller never waits on stdout. The queue is bounded: when the writer
+    falls behind, new records are dropped (and counted) instead of blocking.
+    After stop(), records are written synchronously to `target`.
+    """
+
+    def __init__(self, log_queue, target: logging.Handler):
+        super().__init__(log_queue)
+        self.target = target
+        self.dropped = 0
+        self.direct = False
+
+    def prepare(self, record):
+        # On the caller's thread: render the message while its args are still
+        # what they were, and pick up the request id from the context.
+        # Formatting to JSON is left to the writer thread.
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.request_id = request_id_var.get() or "-"
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        if self.direct:
+            record.request_id = request_id_var.get() or "-"
+            self.target.handle(record)
+        else:
+            super().emit(record)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a `rate` fraction of records below WARNING."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most `per_second` records below WARNING (token bucket)."""
+
+    def __init__(self, per_second: float):
+        super().__init__()
+        self.per_second = per_second
+        self._tokens = per_second
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.per_second, self._tokens + (now - self._updated) * self.per_second)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.suppressed += 1
+            return False
+
+
+def _parse_limits(spec: str):
+    """'app.mcp.tools=0.1,app.api=50' -> {'app.mcp.tools': 0.1, 'app.api': 50.0}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        limits[name.strip()] = float(value)
+    return limits
+
+
+def _limit_for(name: str, limits: dict):
+    # Most specific configured logger name that is `name` or one of its parents
+    matches = [key for key in limits if name == key or name.startswith(key + ".")]
+    return limits[max(matches, key=len)] if matches else None
+
+
+def make_formatter():
+    if settings.DEBUG:
+        # Readable format for development
+        return logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(request_id)s | %(message)s")
+    # Structured JSON for prod
+    return JsonFormatter()
+
+
+# One queue and writer thread for the whole process, created on first use
+_queue_handler = None
+_listener = None
+_rate_filters = []
+_setup_lock = threading.Lock()
+
+
+def _get_queue_handler():
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _queue_handler is None:
+            output = logging.StreamHandler(sys.stdout)
+            output.setFormatter(make_formatter())
+            log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+            _queue_handler = AsyncQueueHandler(log_queue, output)
+            _listener = QueueListener(log_queue, output)
+            _listener.start()
+            atexit.register(shutdown_logging)
+    return _queue_handler
+
+
+def shutdown_logging():
+    """Write out every queued record and stop the writer thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            # Switch first so nothing lands in the queue after it's drained
+            _queue_handler.direct = True
+            _listener.stop()
+            _listener = None
+
+
+def logging_stats():
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "rate_limited": sum(f.suppressed for f in _rate_filters),
+    }
+
 
 def get_logger(name: str):
     logger = logging.getLogger(name)
@@ -27,18 +182,15 @@ def get_logger(name: str):
 
     # Avoid adding duplicate handlers if get_logger is called multiple times
     if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-
-        if settings.DEBUG:
-            # Readable format for development
-            formatter = logging.Formatter(
-                "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
-            )
-        else:
-            # Structured JSON for prod
-            formatter = JsonFormatter()
+        logger.addHandler(_get_queue_handler())
 
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        rate = _limit_for(name, _parse_limits(settings.LOG_SAMPLING))
+        if rate is not None:
+            logger.addFilter(SamplingFilter(rate))
+        per_second = _limit_for(name, _parse_limits(settings.LOG_RATE_LIMITS))
+        if per_second is not None:
+            rate_filter = RateLimitFilter(per_second)
+            _rate_filters.append(rate_filter)
+            logger.addFilter(rate_filter)
 
     return logger
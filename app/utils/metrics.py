@@ -0,0 +1,95 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+# Pipeline stages run from milliseconds (cached plan, indexed lookup) to
+# minutes (a local model on CPU)
+_STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+STAGE_SECONDS = Histogram(
+    "mcp_stage_seconds", "Time spent in each orchestrator stage",
+    ["stage"], buckets=_STAGE_BUCKETS
+)
+
+LLM_SECONDS = Histogram(
+    "mcp_llm_request_seconds", "LLM call latency",
+    ["provider", "model"], buckets=_STAGE_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "mcp_llm_tokens_total", "Tokens reported by the LLM backend",
+    ["provider", "model", "kind"]  # kind: prompt / completion
+)
+LLM_ERRORS = Counter(
+    "mcp_llm_errors_total", "Failed LLM calls",
+    ["provider", "model"]
+)
+
+DB_POOL_WAIT_SECONDS = Histogram(
+    "mcp_db_pool_wait_seconds", "Time to check a connection out of the pool",
+    buckets=_WAIT_BUCKETS
+)
+DB_TASK_QUEUE_SECONDS = Histogram(
+    "mcp_db_task_queue_seconds", "Time async callers wait for a DB worker thread",
+    buckets=_WAIT_BUCKETS
+)
+# livesum: under gunicorn (PROMETHEUS_MULTIPROC_DIR set) the workers' values add up
+DB_POOL_IN_USE = Gauge(
+    "mcp_db_pool_connections_in_use", "Connections currently checked out", multiprocess_mode="livesum"
+)
+DB_POOL_MAX = Gauge(
+    "mcp_db_pool_connections_max", "Connection pool size (per process)", multiprocess_mode="livesum"
+)
+
+PLANNER_FALLBACKS = Counter(
+    "mcp_planner_fallback_total", "Plans produced by the keyword fallback instead of the LLM",
+    ["reason"]  # llm_error / hallucinated_tool
+)
+PLANNER_HALLUCINATIONS = Counter(
+    "mcp_planner_hallucinated_tool_total", "LLM plans naming a tool that doesn't exist"
+)
+PLAN_SOURCE = Counter(
+    "mcp_plan_source_total", "Where each plan came from",
+    ["source"]  # router / cache / llm / fallback
+)
+
+SPECULATIONS = Counter(
+    "mcp_speculative_execution_total", "Tool calls executed while the planner LLM was running",
+    ["outcome"]  # hit (LLM picked the same call) / miss (cancelled)
+)
+SPECULATION_SAVED_SECONDS = Histogram(
+    "mcp_speculative_execution_saved_seconds", "Execution time already done when a matching plan arrived",
+    buckets=_STAGE_BUCKETS
+)
+
+
+@contextmanager
+def timed_stage(stage: str, timings: dict = None):
+    """
+    Observe the duration of the block in STAGE_SECONDS, and record it in
+    `timings` as "<stage>_ms" when given (the per-request timings block).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        if timings is not None:
+            timings[f"{stage}_ms"] = round(elapsed * 1000, 2)
+
+
+def render_metrics():
+    """
+    (body, content type) for the /metrics endpoint. With several gunicorn
+    workers, PROMETHEUS_MULTIPROC_DIR must be set so every worker's samples
+    are aggregated rather than only those of the worker that got the scrape.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
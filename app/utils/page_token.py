@@ -0,0 +1,68 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_secret = None
+
+
+def check_page_token_secret():
+    """
+    Called at startup. A token is usually fetched from a different worker
+    than the one that issued it, so with several workers they must all sign
+    with the same configured key.
+    """
+    if settings.WEB_CONCURRENCY > 1 and not settings.PAGE_TOKEN_SECRET:
+        raise RuntimeError(
+            f"PAGE_TOKEN_SECRET must be set when running {settings.WEB_CONCURRENCY} workers (WEB_CONCURRENCY)"
+        )
+
+
+def _key() -> bytes:
+    global _secret
+    if _secret is None:
+        if settings.PAGE_TOKEN_SECRET:
+            _secret = settings.PAGE_TOKEN_SECRET.encode()
+        else:
+            # Single worker only (see check_page_token_secret)
+            _secret = os.urandom(32)
+            logger.warning("PAGE_TOKEN_SECRET not set: page tokens won't survive a restart")
+    return _secret
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def encode_page_token(state: dict) -> str:
+    """
+    Opaque continuation token for `state` (the plan and where the last page
+    ended). Signed, because the plan it carries is executed as-is.
+    """
+    state = {**state, "exp": int(time.time() + settings.PAGE_TOKEN_TTL_SECONDS)}
+    payload = _b64(json.dumps(state, separators=(",", ":"), default=str).encode())
+    signature = _b64(hmac.new(_key(), payload.encode(), hashlib.sha256).digest())
+    return f"{payload}.{signature}"
+
+
+def decode_page_token(token: str) -> dict:
+    """The state given to encode_page_token(). ValueError if invalid, tampered with or expired."""
+    payload, _, signature = token.partition(".")
+    expected = _b64(hmac.new(_key(), payload.encode(), hashlib.sha256).digest())
+    if not signature or not hmac.compare_digest(signature, expected):
+        raise ValueError("Invalid page token")
+
+    state = json.loads(_unb64(payload))
+    if state.pop("exp", 0) < time.time():
+        raise ValueError("Page token expired, run the query again")
+    return state
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+# Every SingleFlight created, by name, for the stats endpoint
+_registry = {}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the
+    work, everyone who arrives while it is in flight waits for and receives
+    the same result (or exception). Nothing is cached once the call finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._tasks = {}
+        self._sync_calls = {}
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    async def do(self, key, fn):
+        """Await fn() (a coroutine function), sharing it with concurrent callers."""
+        task = self._tasks.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        # shield: one caller disconnecting must not cancel the others' work
+        return await asyncio.shield(task)
+
+    def do_sync(self, key, fn):
+        """Thread-safe blocking variant of do() for plain functions."""
+        with self._lock:
+            call = self._sync_calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._sync_calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._sync_calls[key]
+            call.done.set()
+
+    def stats(self):
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every waiter went away
+
+
+def singleflight_stats():
+    return {name: flight.stats() for name, flight in _registry.items()}
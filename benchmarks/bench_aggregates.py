@@ -0,0 +1,149 @@
+"""
+Aggregate questions: GROUP BY over the base tables vs the summary tables.
+
+For each of --sizes, builds employees/projects/issues in a scratch schema
+(dropped at the end), installs datas_insert/aggregates.sql there and times
+the SQL the LLM would write for three aggregate questions against the
+stats tool statements that read the summary tables. The base-table queries
+grow with the table; the summary reads don't. Also reports what the
+triggers add to a 1000-row INSERT.
+
+    python -m benchmarks.bench_aggregates --sizes 10000 100000 1000000
+"""
+import argparse
+import statistics
+import time
+
+from app.database.db_executor import (
+    DEPARTMENT_STATS_SQL,
+    ISSUE_STATS_SQL,
+    PROJECT_STATS_SQL,
+    get_db_connection,
+    shutdown_db,
+)
+
+SCHEMA = "mcp_bench"
+
+SETUP = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA};
+
+CREATE TABLE employees (
+    id SERIAL PRIMARY KEY, name TEXT, email TEXT, department VARCHAR(50) NOT NULL,
+    salary DECIMAL(10, 2), hire_date DATE, is_active BOOLEAN DEFAULT TRUE
+);
+CREATE TABLE projects (
+    id SERIAL PRIMARY KEY, name TEXT, description TEXT, status VARCHAR(20),
+    start_date DATE, end_date DATE, budget DECIMAL(12, 2), lead_id INTEGER
+);
+CREATE TABLE issues (
+    id SERIAL PRIMARY KEY, title TEXT, description TEXT, priority VARCHAR(20), status VARCHAR(20),
+    assigned_to INTEGER, project_id INTEGER, created_date DATE, due_date DATE
+);
+
+INSERT INTO employees (name, email, department, salary, hire_date, is_active)
+SELECT 'Employee ' || g, 'e' || g || '@company.com',
+       (ARRAY['AI', 'Backend', 'Frontend', 'DevOps'])[g % 4 + 1],
+       80000 + g % 20000, DATE '2020-01-01' + g % 1500, g % 10 <> 0
+FROM generate_series(1, {{rows}}) g;
+
+INSERT INTO projects (name, description, status, start_date, end_date, budget, lead_id)
+SELECT 'Project ' || g, 'Description ' || g,
+       (ARRAY['In Progress', 'Completed', 'Planning'])[g % 3 + 1],
+       DATE '2023-01-01', DATE '2024-01-01', 100000 + g % 50000, g % 1000 + 1
+FROM generate_series(1, {{rows}}) g;
+
+INSERT INTO issues (title, description, priority, status, assigned_to, project_id, created_date, due_date)
+SELECT 'Issue ' || g, 'Description ' || g,
+       (ARRAY['Critical', 'High', 'Medium', 'Low'])[g % 4 + 1],
+       (ARRAY['Open', 'In Progress', 'Closed'])[g % 3 + 1],
+       g % 1000 + 1, g % 1000 + 1, DATE '2024-01-01', DATE '2024-02-01'
+FROM generate_series(1, {{rows}}) g;
+
+ANALYZE employees;
+ANALYZE projects;
+ANALYZE issues;
+"""
+
+AGGREGATES_FILE = "datas_insert/aggregates.sql"
+
+# (question, SQL over the base tables, stats statement, its parameters)
+QUESTIONS = [
+    (
+        "average salary per department",
+        "SELECT department, COUNT(*), AVG(salary), SUM(salary) FROM employees GROUP BY department",
+        DEPARTMENT_STATS_SQL, ("all", "all"),
+    ),
+    (
+        "total budget of in-progress projects",
+        "SELECT COUNT(*), SUM(budget) FROM projects WHERE status = 'In Progress'",
+        PROJECT_STATS_SQL, ("In Progress", "In Progress"),
+    ),
+    (
+        "open issues per priority",
+        "SELECT priority, COUNT(*) FROM issues WHERE status = 'Open' GROUP BY priority",
+        ISSUE_STATS_SQL, ("all", "all"),
+    ),
+]
+
+INSERT_BATCH = """
+INSERT INTO employees (name, email, department, salary)
+SELECT 'New ' || g, 'new' || g || '@company.com', 'AI', 90000 FROM generate_series(1, 1000) g
+"""
+
+
+def timed(cursor, sql, params=None, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def timed_insert(cursor, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(INSERT_BATCH)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(AGGREGATES_FILE) as f:
+        aggregates_sql = f.read()
+
+    print(f"{'rows':>10}  {'question':<38}{'base (ms)':>10}{'summary (ms)':>14}")
+    with get_db_connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                for rows in args.sizes:
+                    cursor.execute(SETUP.replace("{rows}", str(rows)))
+                    plain_insert = timed_insert(cursor, args.repeat)
+                    cursor.execute(aggregates_sql)
+                    triggered_insert = timed_insert(cursor, args.repeat)
+
+                    for question, base_sql, stats_sql, params in QUESTIONS:
+                        base_ms = timed(cursor, base_sql, repeat=args.repeat)
+                        stats_ms = timed(cursor, stats_sql, params, args.repeat)
+                        print(f"{rows:>10,}  {question:<38}{base_ms:>10.2f}{stats_ms:>14.2f}")
+                    print(f"{'':>10}  {'1000-row INSERT without/with triggers':<38}"
+                          f"{plain_insert:>10.2f}{triggered_insert:>14.2f}")
+        finally:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.autocommit = False
+    shutdown_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Concurrent-request throughput of the query pipeline on a single event loop.
+
+Compares the old behaviour (sync process_query called from the async route)
+with process_query_async and with one process_batch_async call, using a fake
+Ollama server for the LLM and the Postgres configured in .env for the tools.
+
+    python -m benchmarks.bench_async_pipeline --requests 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_ollama import start_fake_ollama
+from app.agents.orchestrator import AgentOrchestrator
+from app.core.config import settings
+from app.database.db_executor import shutdown_db
+
+QUERIES = [
+    "Show employees in the AI department",
+    "Which projects are completed?",
+    "List high priority issues",
+    "Employees in Backend",
+]
+
+
+async def run_sync_style(agent, queries):
+    # What the route used to do: a blocking call inside an async handler
+    async def handle(q):
+        return agent.process_query(q)
+    return await asyncio.gather(*(handle(q) for q in queries))
+
+
+async def run_async_style(agent, queries):
+    return await asyncio.gather(*(agent.process_query_async(q) for q in queries))
+
+
+async def run_batch(agent, queries):
+    return await agent.process_batch_async(queries)
+
+
+def measure(label, runner, agent, queries):
+    start = time.perf_counter()
+    results = asyncio.run(runner(agent, queries))
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results if r.get("status") != "success")
+    print(f"{label:<8} {len(queries)} requests in {elapsed:6.2f}s "
+          f"-> {len(queries) / elapsed:6.2f} req/s ({failed} failed)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM latency per call (s)")
+    args = parser.parse_args()
+
+    server, url = start_fake_ollama(args.latency)
+    settings.MCP_LLM_PROVIDER = "ollama"
+    settings.OLLAMA_URL = url
+    settings.PLAN_CACHE_ENABLED = False  # keep the runs independent of each other
+    settings.INTENT_ROUTER_ENABLED = False
+
+    agent = AgentOrchestrator()
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.requests)]
+
+    try:
+        before = measure("sync", run_sync_style, agent, queries)
+        after = measure("async", run_async_style, agent, queries)
+        batch = measure("batch", run_batch, agent, queries)
+        print(f"speedup: async {before / after:.1f}x, batch {before / batch:.1f}x")
+    finally:
+        server.shutdown()
+        shutdown_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Accuracy and latency of the intent router on a labelled query set.
+
+Each query is labelled with the plan the router should return, or None when
+it should be left to the LLM (SQL-only questions, negations, mixed filters).
+None of the queries are copies of the router's example phrasings.
+Reports, per threshold, how many queries were routed, how many of those
+were right, how many routable queries were missed, and the per-query latency.
+No database or LLM needed.
+
+    python -m benchmarks.bench_intent_router --thresholds 0.3 0.4 0.5 0.6 0.7
+"""
+import argparse
+import time
+
+from app.agents.intent_router import IntentRouter
+from app.agents.planner_agent import PlannerAgent
+
+
+def emp(dept):
+    return "get_employees_by_department", {"department": dept}
+
+
+def proj(status):
+    return "get_projects_by_status", {"status": status}
+
+
+def iss(priority):
+    return "get_issues_by_priority", {"priority": priority}
+
+
+def dept_stats(dept="all"):
+    return "get_department_stats", {"department": dept}
+
+
+def proj_stats(status="all"):
+    return "get_project_stats", {"status": status}
+
+
+def iss_stats(priority="all"):
+    return "get_issue_stats", {"priority": priority}
+
+
+LABELLED = [
+    ("Show me the employees in the AI department", emp("AI")),
+    ("who is working in backend?", emp("Backend")),
+    ("list everyone on the frontend team", emp("Frontend")),
+    ("DevOps staff please", emp("DevOps")),
+    ("employees of department Backend", emp("Backend")),
+    ("give me all AI engineers", emp("AI")),
+    ("which people are in Frontend", emp("Frontend")),
+    ("team members in devops", emp("DevOps")),
+    ("what projects are in progress right now", proj("In Progress")),
+    ("show me completed projects", proj("Completed")),
+    ("projects still in the planning phase", proj("Planning")),
+    ("list the projects with status completed", proj("Completed")),
+    ("which projects are currently planning", proj("Planning")),
+    ("in progress projects", proj("In Progress")),
+    ("any critical issues?", iss("Critical")),
+    ("show me the high priority bugs", iss("High")),
+    ("issues that are low priority", iss("Low")),
+    ("list medium issues", iss("Medium")),
+    ("what tickets are critical", iss("Critical")),
+    ("priority high issues", iss("High")),
+    ("average salary in the AI department", dept_stats("AI")),
+    ("what's the average salary for each department", dept_stats()),
+    ("how many projects are completed", proj_stats("Completed")),
+    ("total budget of in-progress projects", proj_stats("In Progress")),
+    ("how many open issues per priority", iss_stats()),
+    # Left to the LLM
+    ("employees with a salary above 95,000", None),
+    ("total budget of projects led by Alice", None),
+    ("how many employees joined this year", None),
+    ("projects with a budget over 150000", None),
+    ("employees not in Backend", None),
+    ("issues other than low priority", None),
+    ("AI employees assigned to critical issues", None),
+    ("issues assigned to employees in Backend", None),
+    ("projects led by people in DevOps", None),
+    ("employees working on completed projects", None),
+    ("projects in progress led by Alice", None),
+    ("employees in AI hired this year", None),
+    ("AI employees named John", None),
+    ("high priority issues created yesterday", None),
+    ("average salary in AI of inactive people", None),
+    ("number of open critical issues assigned this week", None),
+    ("top 3 employees in Frontend by salary", None),
+    ("who was hired in 2023", None),
+    ("which project has the most issues", None),
+    ("count critical issues per project", None),
+    ("what is the weather today", None),
+]
+
+
+def evaluate(router, labelled):
+    routed = correct = wrong = missed = 0
+    timings = []
+    for query, expected in labelled:
+        start = time.perf_counter()
+        plan = router.route(query)
+        timings.append(time.perf_counter() - start)
+
+        if plan is None:
+            missed += expected is not None
+            continue
+        routed += 1
+        if expected and (plan["tool"], plan["parameters"]) == expected:
+            correct += 1
+        else:
+            wrong += 1
+            print(f"  wrong: {query!r} -> {plan['tool']} {plan['parameters']} (expected {expected})")
+
+    timings.sort()
+    return {
+        "routed": routed,
+        "correct": correct,
+        "wrong": wrong,
+        "missed": missed,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p95_us": timings[int(len(timings) * 0.95)] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.4, 0.5, 0.6, 0.7])
+    args = parser.parse_args()
+
+    tools_schema = PlannerAgent(llm=None).tools_schema
+    routable = sum(expected is not None for _, expected in LABELLED)
+    print(f"{len(LABELLED)} labelled queries, {routable} routable")
+    print(f"{'threshold':>10}{'routed':>8}{'correct':>9}{'wrong':>7}{'missed':>8}{'p50 us':>9}{'p95 us':>9}")
+
+    for threshold in args.thresholds:
+        start = time.perf_counter()
+        router = IntentRouter(tools_schema, threshold=threshold)
+        build_ms = (time.perf_counter() - start) * 1000
+        r = evaluate(router, LABELLED)
+        print(
+            f"{threshold:>10.2f}{r['routed']:>8}{r['correct']:>9}{r['wrong']:>7}{r['missed']:>8}"
+            f"{r['p50_us']:>9.0f}{r['p95_us']:>9.0f}   (index built in {build_ms:.1f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-call overhead of the LLM HTTP clients.
+
+Sends sequential generations to a zero-latency fake Ollama server, once with
+a fresh client per call (the old behaviour) and once through LLMProvider's
+pooled keep-alive clients, so the difference is pure connection/client setup.
+
+    python -m benchmarks.bench_llm_client --calls 200
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+import requests
+
+from benchmarks.fake_ollama import start_fake_ollama
+from app.agents.llm_provider import LLMProvider
+from app.core.config import settings
+
+PROMPT = 'User Query: "high priority issues"'
+
+
+def per_call_sync(url, calls):
+    for _ in range(calls):
+        requests.post(url, json={"model": "fake", "prompt": PROMPT, "stream": False}, timeout=30).json()
+
+
+async def per_call_async(url, calls):
+    for _ in range(calls):
+        async with httpx.AsyncClient(timeout=30) as client:
+            (await client.post(url, json={"model": "fake", "prompt": PROMPT, "stream": False})).json()
+
+
+def pooled_sync(llm, calls):
+    for _ in range(calls):
+        llm.generate(PROMPT)
+
+
+async def pooled_async(llm, calls):
+    for _ in range(calls):
+        await llm.generate_async(PROMPT)
+    await llm.aclose()
+
+
+def report(label, calls, fn):
+    start = time.perf_counter()
+    fn()
+    per_call = (time.perf_counter() - start) / calls * 1000
+    print(f"{label:<22} {per_call:7.2f} ms/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server, url = start_fake_ollama(latency=0)
+    settings.OLLAMA_URL = url
+    llm = LLMProvider(provider="ollama", model="fake")
+
+    try:
+        report("sync  per-call client", args.calls, lambda: per_call_sync(url, args.calls))
+        report("sync  pooled", args.calls, lambda: pooled_sync(llm, args.calls))
+        report("async per-call client", args.calls, lambda: asyncio.run(per_call_async(url, args.calls)))
+        report("async pooled", args.calls, lambda: asyncio.run(pooled_async(llm, args.calls)))
+    finally:
+        llm.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
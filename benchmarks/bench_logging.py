@@ -0,0 +1,125 @@
+"""
+Logging overhead per request: the old synchronous pipeline vs the queue one.
+
+Replays the records one /query used to log (tool call, SQL text and params,
+row counts...) through
+  - sync:  StreamHandler + json.dumps formatter on the calling thread (before)
+  - queue: AsyncQueueHandler + orjson, written by a QueueListener thread (now)
+into a sink that takes --write-latency per write, to mimic a stdout pipe that
+is backing up. Reports the time the request thread spends logging, plus how
+long the queue writer takes to catch up. --info-only drops the records that
+are now logged at DEBUG.
+
+    python -m benchmarks.bench_logging --requests 2000 --write-latency 0.00005
+"""
+import argparse
+import io
+import json
+import logging
+import queue
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueListener
+
+from app.utils.logger import AsyncQueueHandler, JsonFormatter, request_id_var
+
+SQL = "SELECT id, name, description, status, start_date, end_date, budget FROM projects WHERE LOWER(status) = LOWER(%s)"
+
+# (level, message, args) as logged by one /query before the SQL lines moved to DEBUG
+REQUEST = [
+    (logging.INFO, "Received query: %s", ("show me the completed projects",)),
+    (logging.INFO, "Planning for query: '%s'", ("show me the completed projects",)),
+    (logging.INFO, "Selected tool: %s with params: %s", ("get_projects_by_status", {"status": "Completed"})),
+    (logging.INFO, "Executing tool: %s", ("get_projects_by_status",)),
+    (logging.DEBUG, "Tool: Get projects (status=%s)", ("Completed",)),
+    (logging.DEBUG, "Executing SQL: %s | Params: %s", (SQL, ("Completed",))),
+    (logging.DEBUG, "Query returned %d rows", (12,)),
+    (logging.INFO, "Generating explanation...", ()),
+    (logging.INFO, "Ollama (%s): Generating (async)...", ("mistral",)),
+]
+
+
+class LegacyJsonFormatter(logging.Formatter):
+    """The formatter as it was: datetime.now() and json.dumps on the caller's thread."""
+    def format(self, record):
+        return json.dumps({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+        })
+
+
+class SlowSink(io.TextIOBase):
+    """A stream whose every write takes `latency` seconds."""
+    def __init__(self, latency):
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return len(text)
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def replay(logger, requests, info_only):
+    records = [r for r in REQUEST if not info_only or r[0] >= logging.INFO]
+    start = time.perf_counter()
+    for i in range(requests):
+        request_id_var.set(f"req-{i}")
+        for level, msg, args in records:
+            # Every record is logged at its old level (INFO) unless --info-only
+            logger.log(logging.INFO if not info_only else level, msg, *args)
+    return time.perf_counter() - start
+
+
+def run_sync(args):
+    handler = logging.StreamHandler(SlowSink(args.write_latency))
+    handler.setFormatter(LegacyJsonFormatter())
+    elapsed = replay(make_logger("sync", handler), args.requests, args.info_only)
+    return elapsed, 0.0
+
+
+def run_queue(args):
+    output = logging.StreamHandler(SlowSink(args.write_latency))
+    output.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(maxsize=args.queue_size)
+    handler = AsyncQueueHandler(log_queue, output)
+    listener = QueueListener(log_queue, output)
+    listener.start()
+
+    elapsed = replay(make_logger("queue", handler), args.requests, args.info_only)
+    drain_start = time.perf_counter()
+    listener.stop()  # waits for the writer to empty the queue
+    if handler.dropped:
+        print(f"  (queue full: dropped {handler.dropped} records)")
+    return elapsed, time.perf_counter() - drain_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--write-latency", type=float, default=0.0, help="seconds per write to the sink")
+    parser.add_argument("--queue-size", type=int, default=100_000)
+    parser.add_argument("--info-only", action="store_true", help="skip the records now logged at DEBUG")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, write latency {args.write_latency * 1e6:.0f} us")
+    print(f"{'pipeline':<8} {'per request (us)':>18} {'writer catch-up (s)':>21}")
+    for name, run in (("sync", run_sync), ("queue", run_queue)):
+        elapsed, drain = run(args)
+        print(f"{name:<8} {elapsed / args.requests * 1e6:>18.1f} {drain:>21.2f}")
+
+
+if __name__ == "__main__":
+    main()
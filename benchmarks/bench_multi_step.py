@@ -0,0 +1,59 @@
+"""
+Latency of multi-step plans: steps one after another vs concurrently.
+
+Each step is a run_sql_query that sleeps --step-seconds in Postgres (plus a
+little jitter so no two are identical), standing in for a slow tool. Plans
+of 1..--max-steps independent steps are run with the sync executor (one
+step at a time, as a client issuing one request per question would) and
+with execute_async(), which runs the steps concurrently on the DB threads.
+Needs the database from .env.
+
+    python -m benchmarks.bench_multi_step --max-steps 5 --step-seconds 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from app.agents.executor_agent import ExecutorAgent
+from app.database.db_executor import shutdown_db
+
+
+def make_plan(steps: int, seconds: float):
+    return {"steps": [
+        {
+            "id": f"s{i}",
+            "tool": "run_sql_query",
+            "parameters": {"query": f"SELECT pg_sleep({seconds + i / 1000}) AS slept, {i} AS step"},
+        }
+        for i in range(steps)
+    ]}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    assert "error" not in result, result
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-steps", type=int, default=5)
+    parser.add_argument("--step-seconds", type=float, default=0.2)
+    args = parser.parse_args()
+
+    executor = ExecutorAgent()
+    executor.execute(make_plan(1, 0))  # open the pool
+
+    print(f"{'steps':>5} {'sequential (s)':>15} {'concurrent (s)':>15}")
+    try:
+        for steps in range(1, args.max_steps + 1):
+            sequential = timed(lambda: executor.execute(make_plan(steps, args.step_seconds)))
+            concurrent = timed(lambda: asyncio.run(executor.execute_async(make_plan(steps, args.step_seconds))))
+            print(f"{steps:>5} {sequential:>15.3f} {concurrent:>15.3f}")
+    finally:
+        shutdown_db()
+
+
+if __name__ == "__main__":
+    main()
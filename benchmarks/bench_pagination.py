@@ -0,0 +1,99 @@
+"""
+Latency of deep pages: OFFSET vs keyset (WHERE id > last ORDER BY id).
+
+Builds an employees table of --rows rows in a scratch schema (dropped at the
+end) with the indexes from datas_insert/tool_indexes.sql, then fetches a
+--page-size page of the get_employees_by_department lookup at increasing
+depths both ways. OFFSET reads and throws away every row before the page, so
+it slows down linearly with depth; keyset seeks straight to it.
+
+    python -m benchmarks.bench_pagination --rows 2000000 --page-size 100
+"""
+import argparse
+import statistics
+import time
+
+from app.database.db_executor import (
+    EMPLOYEES_BY_DEPARTMENT_SQL,
+    get_db_connection,
+    page_sql,
+    shutdown_db,
+)
+
+SCHEMA = "mcp_bench"
+
+# Half the rows in one department, so even deep pages stay inside it
+SETUP = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA};
+
+CREATE TABLE employees (
+    id SERIAL PRIMARY KEY, name TEXT, email TEXT, department TEXT,
+    salary DECIMAL(10, 2), hire_date DATE, is_active BOOLEAN
+);
+INSERT INTO employees (name, email, department, salary, hire_date, is_active)
+SELECT 'Employee ' || g, 'e' || g || '@company.com',
+       CASE WHEN g % 2 = 0 THEN 'Engineering' ELSE 'Dept' || (g % 500) END,
+       80000 + g % 20000, DATE '2020-01-01' + g % 1500, TRUE
+FROM generate_series(1, {{rows}}) g;
+CREATE INDEX ON employees (LOWER(department), id);
+ANALYZE employees;
+"""
+
+DEPARTMENT = "Engineering"
+
+
+def timed(cursor, sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with get_db_connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                start = time.perf_counter()
+                cursor.execute(SETUP.replace("{rows}", str(args.rows)))
+                print(f"Seeded {args.rows:,} rows in {time.perf_counter() - start:.1f}s\n")
+
+                offset_sql = f"{EMPLOYEES_BY_DEPARTMENT_SQL} ORDER BY id LIMIT %s OFFSET %s"
+                print(f"{'page':>8} {'offset row':>11} {'OFFSET (ms)':>12} {'keyset (ms)':>12}")
+                matching = args.rows // 2
+                depth = 1
+                while depth * args.page_size < matching:
+                    offset = (depth - 1) * args.page_size
+                    offset_ms, rows = timed(
+                        cursor, offset_sql, (DEPARTMENT, args.page_size, offset), args.repeat
+                    )
+                    # The id the previous page ended on, as a page token would carry it
+                    after = None
+                    if offset:
+                        cursor.execute(offset_sql, (DEPARTMENT, 1, offset - 1))
+                        after = cursor.fetchone()[0]
+                    sql, params = page_sql(EMPLOYEES_BY_DEPARTMENT_SQL, (DEPARTMENT,), args.page_size, after)
+                    keyset_ms, keyset_rows = timed(cursor, sql, params, args.repeat)
+                    assert keyset_rows[:args.page_size] == rows, "keyset page differs from OFFSET page"
+                    print(f"{depth:>8} {offset:>11,} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+                    depth *= 10
+        finally:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.autocommit = False
+    shutdown_db()
+
+
+if __name__ == "__main__":
+    main()
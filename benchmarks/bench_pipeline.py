@@ -0,0 +1,319 @@
+"""
+Per-stage latency and throughput of the plan / execute / reason pipeline.
+
+For every LLM backend (the mock provider, and the fake Ollama server with
+--latency) and every data size (a scratch database seeded with --sizes
+employees/issues rows), runs --requests queries --concurrency at a time,
+first through the orchestrator's stages directly and then through the HTTP
+API in-process. Reports p50/p95/p99 per stage, for the whole request and for
+the API round trip, plus throughput.
+
+Plan cache, intent router, result cache and single-flight are off unless
+--caches is given, so each request pays for every stage.
+
+Baselines are JSON files under benchmarks/baselines/:
+
+    python -m benchmarks.bench_pipeline --save main
+    python -m benchmarks.bench_pipeline --compare main --tolerance 15
+
+--compare exits with status 1 if any p50/p95 got slower than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+
+import httpx
+import psycopg2
+
+from app.core.config import settings
+from app.database.db_executor import shutdown_db
+from benchmarks.fake_ollama import start_fake_ollama
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+QUERIES = [
+    "Show employees in the AI department",
+    "Which projects are completed?",
+    "List high priority issues",
+    "Employees with salary above 95000",
+    "Employees in Backend",
+    "Projects with budget over 150000",
+]
+
+SEED = """
+CREATE TABLE employees (
+    id SERIAL PRIMARY KEY, name VARCHAR(100) NOT NULL, email VARCHAR(100) UNIQUE NOT NULL,
+    department VARCHAR(50) NOT NULL, salary DECIMAL(10, 2), hire_date DATE, is_active BOOLEAN DEFAULT TRUE
+);
+CREATE TABLE projects (
+    id SERIAL PRIMARY KEY, name VARCHAR(100) NOT NULL, description TEXT, status VARCHAR(20),
+    start_date DATE, end_date DATE, budget DECIMAL(12, 2), lead_id INTEGER REFERENCES employees(id)
+);
+CREATE TABLE issues (
+    id SERIAL PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT, priority VARCHAR(20),
+    status VARCHAR(20), assigned_to INTEGER REFERENCES employees(id),
+    project_id INTEGER REFERENCES projects(id), created_date DATE, due_date DATE
+);
+
+INSERT INTO employees (name, email, department, salary, hire_date, is_active)
+SELECT 'Employee ' || g, 'e' || g || '@company.com',
+       (ARRAY['AI', 'Backend', 'Frontend', 'DevOps'])[g %% 4 + 1],
+       80000 + g %% 20000, DATE '2020-01-01' + g %% 1500, g %% 10 <> 0
+FROM generate_series(1, %(rows)s) g;
+
+INSERT INTO projects (name, description, status, start_date, end_date, budget, lead_id)
+SELECT 'Project ' || g, 'Description ' || g,
+       (ARRAY['Completed', 'In Progress', 'Planning'])[g %% 3 + 1],
+       DATE '2023-01-01', DATE '2024-01-01', 100000 + g %% 100000, g
+FROM generate_series(1, GREATEST(%(rows)s / 10, 1)) g;
+
+INSERT INTO issues (title, description, priority, status, assigned_to, project_id, created_date, due_date)
+SELECT 'Issue ' || g, 'Description ' || g,
+       (ARRAY['Critical', 'High', 'Medium', 'Low'])[g %% 4 + 1],
+       'Open', g %% %(rows)s + 1, g %% GREATEST(%(rows)s / 10, 1) + 1, DATE '2024-01-01', DATE '2024-02-01'
+FROM generate_series(1, %(rows)s) g;
+
+ANALYZE;
+"""
+
+# Applied after seeding, like a real deployment (see docker-compose.yml)
+MIGRATIONS = ["datas_insert/table_versions.sql", "datas_insert/tool_indexes.sql"]
+
+
+def _admin_connection(dbname):
+    conn = psycopg2.connect(
+        host=settings.DB_HOST, port=settings.DB_PORT, user=settings.DB_USER,
+        password=settings.DB_PASSWORD, dbname=dbname
+    )
+    conn.autocommit = True
+    return conn
+
+
+def seed_database(rows):
+    """Create (or reuse) a scratch database with `rows` employees and issues."""
+    name = f"mcp_bench_{rows}"
+    admin = _admin_connection(settings.DB_NAME)
+    with admin.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+        exists = cur.fetchone() is not None
+        if not exists:
+            cur.execute(f"CREATE DATABASE {name}")
+    admin.close()
+
+    if not exists:
+        conn = _admin_connection(name)
+        with conn.cursor() as cur:
+            cur.execute(SEED, {"rows": rows})
+            for path in MIGRATIONS:
+                if os.path.exists(path):
+                    with open(path) as f:
+                        cur.execute(f.read())
+        conn.close()
+    return name
+
+
+def drop_database(name):
+    admin = _admin_connection(settings.DB_NAME)
+    with admin.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {name}")
+    admin.close()
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        "p50": round(pick(0.50), 2),
+        "p95": round(pick(0.95), 2),
+        "p99": round(pick(0.99), 2),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+    }
+
+
+async def run_stages(agent, queries, concurrency):
+    """The stages of AgentOrchestrator._run_query_async(), timed one by one."""
+    limit = asyncio.Semaphore(concurrency)
+    timings = {"plan": [], "execute": [], "reason": [], "total": []}
+    failed = 0
+
+    async def one(query):
+        nonlocal failed
+        async with limit:
+            t0 = time.perf_counter()
+            plan = await agent.planner.plan_async(query)
+            t1 = time.perf_counter()
+            result = await agent.executor.execute_async(plan) if "error" not in plan else plan
+            t2 = time.perf_counter()
+            if "error" in result:
+                failed += 1
+                return
+            await agent.reasoner.explain_async(query, result.get("data", []))
+            t3 = time.perf_counter()
+        timings["plan"].append(t1 - t0)
+        timings["execute"].append(t2 - t1)
+        timings["reason"].append(t3 - t2)
+        timings["total"].append(t3 - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    return timings, time.perf_counter() - start, failed
+
+
+async def run_api(queries, concurrency):
+    """Whole requests through the FastAPI app (validation, serialization...)."""
+    from app.main import app
+    limit = asyncio.Semaphore(concurrency)
+    timings, failed = [], 0
+    headers = {"X-API-Key": settings.API_KEY} if settings.API_KEY else {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one(query):
+            nonlocal failed
+            async with limit:
+                t0 = time.perf_counter()
+                res = await client.post("/api/v1/query", json={"query": query}, headers=headers)
+                timings.append(time.perf_counter() - t0)
+            if res.status_code != 200 or res.json().get("status") != "success":
+                failed += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in queries))
+        return timings, time.perf_counter() - start, failed
+
+
+def bench_case(queries, concurrency):
+    from app.api import routes
+    from app.agents.orchestrator import AgentOrchestrator
+
+    async def run():
+        agent = AgentOrchestrator()
+        routes._agent_orchestrator = agent  # the API uses the same instance
+        await run_stages(agent, queries[:concurrency], concurrency)  # warm-up
+        stages, stage_wall, stage_failed = await run_stages(agent, queries, concurrency)
+        api, api_wall, api_failed = await run_api(queries, concurrency)
+        await routes.shutdown_orchestrator()
+        return stages, stage_wall, stage_failed, api, api_wall, api_failed
+
+    stages, stage_wall, stage_failed, api, api_wall, api_failed = asyncio.run(run())
+    result = {stage: percentiles(samples) for stage, samples in stages.items() if samples}
+    result["api"] = percentiles(api)
+    result["throughput_rps"] = round(len(queries) / stage_wall, 2)
+    result["api_throughput_rps"] = round(len(queries) / api_wall, 2)
+    result["failed"] = stage_failed + api_failed
+    return result
+
+
+def print_results(results):
+    print(f"\n{'case':<22}{'stage':<9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for case, r in results.items():
+        for stage in ("plan", "execute", "reason", "total", "api"):
+            if stage in r:
+                s = r[stage]
+                print(f"{case:<22}{stage:<9}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['p99']:>10.2f}{s['mean']:>10.2f}")
+        print(f"{case:<22}{'req/s':<9}{r['throughput_rps']:>10.2f}  (api {r['api_throughput_rps']:.2f}, {r['failed']} failed)")
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against a baseline; returns the regressions found."""
+    regressions = []
+    print(f"\n{'case':<22}{'stage':<9}{'metric':<8}{'baseline':>10}{'now':>10}{'change':>9}")
+    for case, r in results.items():
+        base = baseline.get(case)
+        if base is None:
+            print(f"{case:<22}(not in baseline)")
+            continue
+        for stage in ("plan", "execute", "reason", "total", "api"):
+            if stage not in r or stage not in base:
+                continue
+            for metric in ("p50", "p95"):
+                old, new = base[stage][metric], r[stage][metric]
+                change = (new - old) / old * 100 if old else 0.0
+                flag = ""
+                # Sub-millisecond stages are too noisy for a relative threshold
+                if change > tolerance and new - old > 1.0:
+                    flag = "  REGRESSION"
+                    regressions.append((case, stage, metric, change))
+                print(f"{case:<22}{stage:<9}{metric:<8}{old:>10.2f}{new:>10.2f}{change:>8.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--providers", nargs="+", default=["mock", "ollama"], choices=["mock", "ollama"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Ollama latency per call (s)")
+    parser.add_argument("--caches", action="store_true", help="keep plan/result caches, router and single-flight on")
+    parser.add_argument("--keep-db", action="store_true", help="don't drop the scratch databases")
+    parser.add_argument("--save", metavar="NAME", help="save results as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="diff against benchmarks/baselines/NAME.json")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed slowdown in %% for --compare")
+    args = parser.parse_args()
+
+    if not args.caches:
+        settings.PLAN_CACHE_ENABLED = False
+        settings.RESULT_CACHE_ENABLED = False
+        settings.INTENT_ROUTER_ENABLED = False
+        settings.SINGLE_FLIGHT_ENABLED = False
+
+    server, url = start_fake_ollama(args.latency)
+    settings.OLLAMA_URL = url
+    original_db = settings.DB_NAME
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.requests)]
+
+    results = {}
+    try:
+        for rows in args.sizes:
+            settings.DB_NAME = original_db
+            db = seed_database(rows)
+            settings.DB_NAME = db
+            try:
+                for provider in args.providers:
+                    settings.MCP_LLM_PROVIDER = provider
+                    case = f"{provider}/{rows}"
+                    print(f"running {case}...", file=sys.stderr)
+                    results[case] = bench_case(queries, args.concurrency)
+            finally:
+                shutdown_db()
+                settings.DB_NAME = original_db
+                if not args.keep_db:
+                    drop_database(db)
+    finally:
+        server.shutdown()
+
+    print_results(results)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump({
+                "meta": {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "machine": platform.node(),
+                    "args": vars(args),
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\nsaved baseline {path}")
+
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.tolerance}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Prompt-eval cost of the planner prompt: query-in-the-middle (old layout,
+rebuilt every call) vs static prefix + query at the end.
+
+Sends the same sequence of planner prompts in each layout and reports the
+prompt tokens the server had to evaluate per request and the prompt-eval time,
+as reported by Ollama (prompt_eval_count / prompt_eval_duration). Also times
+building the prompt itself.
+
+By default it runs against the fake server, which models Ollama's prefix
+cache; pass --ollama-url (and --model) to measure a real Ollama instead.
+
+    python -m benchmarks.bench_prompt_prefix --requests 20
+    python -m benchmarks.bench_prompt_prefix --ollama-url http://localhost:11434/api/generate --model llama3.2
+"""
+import argparse
+import json
+import time
+
+from app.agents.llm_provider import LLMProvider
+from app.agents.planner_agent import PlannerAgent
+from app.core.config import settings
+from benchmarks.fake_ollama import start_fake_ollama
+
+QUERIES = [
+    "Which employees earn more than 95000?",
+    "Show completed projects",
+    "Critical issues",
+    "Employees in the Backend department",
+    "Projects with a budget above 150000",
+    "How many issues are assigned to each employee?",
+]
+
+
+def legacy_prompt(planner, query):
+    """The planner prompt as it was built before the static prefix."""
+    schema_str = json.dumps(planner.tools_schema, indent=2)
+    return (
+        f"You are a smart routing agent. Your goal is to pick the best tool to answer the user's question.\n"
+        f"If the question is simple, use a specific tool (e.g. get_employees_by_department).\n"
+        f"If the question is complex or about fields like 'salary' or 'budget' that are not covered by specific tools, use 'run_sql_query' and generate a valid SQL SELECT statement.\n\n"
+        f"Available Tools:\n{schema_str}\n\n"
+        f"{planner.db_schema}\n\n"
+        f"User Query: \"{query}\"\n\n"
+        f"Constraints:\n"
+        f"- For 'run_sql_query', the 'query' parameter MUST be a valid SQL SELECT Statement.\n"
+        f"- Do NOT use DROP, DELETE, or INSERT.\n\n"
+        f"Return purely JSON in this format:\n"
+        f'{{"tool": "TOOL_NAME", "parameters": {{"ARG_NAME": "VALUE"}}, "reasoning": "..."}}'
+    )
+
+
+def build_time_us(build, queries, repeat=2000):
+    start = time.perf_counter()
+    for i in range(repeat):
+        build(queries[i % len(queries)])
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(llm, prompts):
+    before = dict(llm.prompt_eval)
+    start = time.perf_counter()
+    for prompt in prompts:
+        llm.generate(prompt)
+    wall = time.perf_counter() - start
+    calls = llm.prompt_eval["calls"] - before["calls"]
+    tokens = llm.prompt_eval["tokens"] - before["tokens"]
+    ms = llm.prompt_eval["ms"] - before["ms"]
+    return tokens / calls, ms / calls, wall / len(prompts) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--ollama-url", default=None, help="real Ollama /api/generate URL")
+    parser.add_argument("--model", default=settings.MCP_LLM_MODEL)
+    parser.add_argument("--prompt-token-latency", type=float, default=0.002,
+                        help="fake server: seconds per evaluated prompt token")
+    args = parser.parse_args()
+
+    settings.SINGLE_FLIGHT_ENABLED = False
+    planner = PlannerAgent(llm=None)
+
+    print("prompt build time per call:")
+    print(f"  legacy (json.dumps each call): {build_time_us(lambda q: legacy_prompt(planner, q), QUERIES):.1f} us")
+    print(f"  static prefix:                 {build_time_us(planner._build_prompt, QUERIES):.1f} us")
+
+    url = args.ollama_url
+    if url is None:
+        _, url = start_fake_ollama(latency=0.0, prompt_token_latency=args.prompt_token_latency)
+
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.requests)]
+    cases = [
+        ("legacy layout, keep_alive 0", [legacy_prompt(planner, q) for q in queries], "0"),
+        ("legacy layout", [legacy_prompt(planner, q) for q in queries], settings.OLLAMA_KEEP_ALIVE),
+        ("static prefix, keep_alive 0", [planner._build_prompt(q) for q in queries], "0"),
+        ("static prefix", [planner._build_prompt(q) for q in queries], settings.OLLAMA_KEEP_ALIVE),
+    ]
+
+    print(f"\n{args.requests} planner requests against {url}")
+    print(f"{'case':<30}{'eval tokens':>13}{'eval ms':>10}{'req ms':>10}")
+    for label, prompts, keep_alive in cases:
+        settings.OLLAMA_KEEP_ALIVE = keep_alive
+        llm = LLMProvider(provider="ollama", model=args.model)
+        llm.ollama_url = url
+        llm.generate(prompts[-1])  # load the model / start from a warm state
+        tokens, eval_ms, request_ms = run(llm, prompts)
+        print(f"{label:<30}{tokens:>13.0f}{eval_ms:>10.1f}{request_ms:>10.1f}")
+        llm.close()
+
+
+if __name__ == "__main__":
+    main()
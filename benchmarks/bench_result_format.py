@@ -0,0 +1,126 @@
+"""
+Payload size and serialization time of the /query result formats.
+
+Serializes synthetic employee rows (Decimal salaries, dates - what psycopg2
+returns) for the default records format and the columnar format: through
+the steps FastAPI takes for response_model=QueryResponse ("pydantic"), and
+through the orjson path the routes use ("fast"). Plus the CSV and Arrow
+export encodings. No database needed.
+
+    python -m benchmarks.bench_result_format --rows 10000
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.formats import to_columnar, csv_chunks, arrow_chunks, dump_json, validated
+from app.api.models import QueryResponse
+
+DEPARTMENTS = ["AI", "Backend", "Frontend", "DevOps"]
+
+
+def make_rows(n):
+    start = date(2020, 1, 1)
+    return [
+        {
+            "id": i,
+            "name": f"Employee {i}",
+            "email": f"employee{i}@company.com",
+            "department": DEPARTMENTS[i % 4],
+            "salary": Decimal(80000 + (i * 37) % 20000) + Decimal("0.00"),
+            "hire_date": start + timedelta(days=i % 1500),
+        }
+        for i in range(n)
+    ]
+
+
+def fastapi_json(result):
+    # Roughly what FastAPI does for response_model=QueryResponse
+    model = QueryResponse.model_validate(result)
+    content = jsonable_encoder(model.model_dump(mode="json"))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_json(result):
+    # What the /query routes do
+    return dump_json(validated(QueryResponse, result))
+
+
+# cursor.description of the rows above: (name, type_code, ..., precision, scale, ...)
+DESCRIPTION = [
+    ("id", 23, None, 4, None, None, None),
+    ("name", 1043, None, 100, None, None, None),
+    ("email", 1043, None, 100, None, None, None),
+    ("department", 1043, None, 50, None, None, None),
+    ("salary", 1700, None, 10, 10, 2, None),
+    ("hire_date", 1082, None, 4, None, None, None),
+]
+
+
+class ListStream:
+    """Stands in for a RowStream, yielding pre-built batches."""
+
+    def __init__(self, rows, batch_size=500):
+        self.rows = rows
+        self.batch_size = batch_size
+        self.columns = list(rows[0].keys()) if rows else []
+        self.description = DESCRIPTION
+
+    async def __aiter__(self):
+        for i in range(0, len(self.rows), self.batch_size):
+            yield self.rows[i:i + self.batch_size]
+
+
+async def _collect(chunks):
+    out = []
+    async for chunk in chunks:
+        out.append(chunk.encode() if isinstance(chunk, str) else chunk)
+    return b"".join(out)
+
+
+def timed(fn, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    base = {"query": "bench", "status": "success", "plan": {}, "row_count": len(rows), "explanation": ""}
+
+    cases = {
+        "records (pydantic)": lambda: fastapi_json({**base, "data": rows}),
+        "records (fast)": lambda: fast_json({**base, "data": rows}),
+        "columnar (pydantic)": lambda: fastapi_json({**base, "data": to_columnar(rows)}),
+        "columnar (fast)": lambda: fast_json({**base, "data": to_columnar(rows)}),
+        "csv export": lambda: asyncio.run(_collect(csv_chunks(ListStream(rows)))),
+    }
+    try:
+        import pyarrow  # noqa: F401
+        cases["arrow export"] = lambda: asyncio.run(_collect(arrow_chunks(ListStream(rows))))
+    except ImportError:
+        print("(pyarrow not installed, skipping arrow)")
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    print(f"{'format':<21}{'bytes':>12}{'ms':>10}{'ms/10k rows':>13}")
+    for label, fn in cases.items():
+        seconds, payload = timed(fn, args.repeat)
+        per_10k = seconds * 1000 * 10000 / max(args.rows, 1)
+        print(f"{label:<21}{len(payload):>12,}{seconds * 1000:>10.1f}{per_10k:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
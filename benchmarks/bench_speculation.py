@@ -0,0 +1,106 @@
+"""
+Latency of plan + execute with and without speculative execution.
+
+Runs each query --repeat times through the orchestrator against a scratch
+database of --rows employees/issues (see bench_pipeline) and the fake Ollama
+server with --latency per call, so planning takes about as long as a small
+local model. Reports the median plan+execute time per query, speculation off
+vs on, and the hit/miss counts and saved time from the metrics.
+
+"Critical issues" is a deliberate miss: the keyword fallback guesses High
+priority, the planner picks Critical. Salary questions are planned as SQL
+and never speculated on.
+
+    python -m benchmarks.bench_speculation --rows 100000 --latency 0.3
+"""
+import argparse
+import asyncio
+import statistics
+
+from prometheus_client import REGISTRY
+
+from app.agents.orchestrator import AgentOrchestrator
+from app.core.config import settings
+from app.database.db_executor import shutdown_db
+from benchmarks.bench_pipeline import drop_database, seed_database
+from benchmarks.fake_ollama import start_fake_ollama
+
+QUERIES = [
+    "Show employees in the Backend department",
+    "Which projects are in progress?",
+    "List high priority issues",
+    "Show critical issues",
+    "Employees with salary above 95000",
+]
+
+
+def metric(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def plan_and_execute_ms(agent, query, repeat):
+    samples = []
+    for _ in range(repeat):
+        result = await agent.process_query_async(query, defer_explanation=True)
+        assert result["status"] == "success", result
+        samples.append(result["timings"]["plan_ms"] + result["timings"]["execute_ms"])
+    return statistics.median(samples)
+
+
+async def run(queries, repeat):
+    agent = AgentOrchestrator()
+    results = {}
+    try:
+        for enabled in (False, True):
+            settings.SPECULATIVE_EXECUTION_ENABLED = enabled
+            for query in queries:
+                results.setdefault(query, []).append(await plan_and_execute_ms(agent, query, repeat))
+    finally:
+        agent.explanations.close()
+        await agent.llm.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Ollama latency per call (s)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep-db", action="store_true", help="don't drop the scratch database")
+    args = parser.parse_args()
+
+    # Every request plans with the LLM and runs its query
+    settings.PLAN_CACHE_ENABLED = False
+    settings.RESULT_CACHE_ENABLED = False
+    settings.INTENT_ROUTER_ENABLED = False
+    settings.SINGLE_FLIGHT_ENABLED = False
+
+    server, url = start_fake_ollama(args.latency)
+    settings.MCP_LLM_PROVIDER = "ollama"
+    settings.OLLAMA_URL = url
+    original_db = settings.DB_NAME
+    db = seed_database(args.rows)
+    settings.DB_NAME = db
+    try:
+        results = asyncio.run(run(QUERIES, args.repeat))
+    finally:
+        shutdown_db()
+        server.shutdown()
+        settings.DB_NAME = original_db
+        if not args.keep_db:
+            drop_database(db)
+
+    print(f"plan + execute, median of {args.repeat}, LLM latency {args.latency}s, {args.rows:,} rows")
+    print(f"{'query':<44}{'off (ms)':>10}{'on (ms)':>10}")
+    for query, (off, on) in results.items():
+        print(f"{query:<44}{off:>10.1f}{on:>10.1f}")
+
+    hits = metric("mcp_speculative_execution_total", outcome="hit")
+    misses = metric("mcp_speculative_execution_total", outcome="miss")
+    saved = metric("mcp_speculative_execution_saved_seconds_sum")
+    print(f"\nspeculations: {hits:.0f} hits, {misses:.0f} misses, "
+          f"{saved * 1000 / max(hits, 1):.1f} ms saved per hit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Time-to-first-byte of /query vs /query/stream.
+
+Serves the real app with uvicorn, backed by a fake Ollama server that streams
+tokens, and the Postgres configured in .env.
+
+    python -m benchmarks.bench_streaming --latency 1.0 --token-latency 0.05
+"""
+import argparse
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_ollama import start_fake_ollama
+from app.core.config import settings
+
+QUERY = {"query": "Show employees in the AI department"}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api():
+    from app.main import app
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}/api/v1"
+
+
+def timed_request(client, url):
+    """Returns (time to first byte, total time, first line of the body)."""
+    start = time.perf_counter()
+    with client.stream("POST", url, json=QUERY) as res:
+        chunks = res.iter_bytes()
+        first = next(chunks)
+        ttfb = time.perf_counter() - start
+        for _ in chunks:
+            pass
+    return ttfb, time.perf_counter() - start, first.split(b"\n", 1)[0][:80]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=1.0, help="fake LLM latency before the first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.05, help="delay between streamed tokens (s)")
+    args = parser.parse_args()
+
+    ollama, url = start_fake_ollama(args.latency, token_latency=args.token_latency)
+    settings.MCP_LLM_PROVIDER = "ollama"
+    settings.OLLAMA_URL = url
+    settings.PLAN_CACHE_ENABLED = False  # every request should pay for planning
+    settings.INTENT_ROUTER_ENABLED = False
+    api, base = start_api()
+
+    try:
+        with httpx.Client(timeout=60) as client:
+            for label, path in (("/query", "/query"), ("/query/stream", "/query/stream")):
+                ttfb, total, first = timed_request(client, base + path)
+                print(f"{label:<14} ttfb={ttfb:6.2f}s total={total:6.2f}s first={first!r}")
+    finally:
+        api.should_exit = True
+        ollama.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Query plans of the fixed tool statements at scale, before and after the
+expression indexes from datas_insert/tool_indexes.sql.
+
+Builds employees/projects/issues tables in a scratch schema (dropped at the
+end), fills them with --rows rows each, then EXPLAIN ANALYZEs the registered
+prepared statements with and without the indexes.
+
+    python -m benchmarks.bench_tool_indexes --rows 1000000
+"""
+import argparse
+import time
+
+from app.database.db_executor import (
+    PREPARED_STATEMENTS,
+    _prepared_text,
+    get_db_connection,
+    shutdown_db,
+)
+
+SCHEMA = "mcp_bench"
+
+# Realistically skewed values: most lookups are for a small slice of the table
+SETUP = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA};
+
+CREATE TABLE employees (
+    id SERIAL PRIMARY KEY, name TEXT, email TEXT, department TEXT,
+    salary DECIMAL(10, 2), hire_date DATE, is_active BOOLEAN
+);
+CREATE TABLE projects (
+    id SERIAL PRIMARY KEY, name TEXT, description TEXT, status TEXT,
+    start_date DATE, end_date DATE, budget DECIMAL(12, 2), lead_id INTEGER
+);
+CREATE TABLE issues (
+    id SERIAL PRIMARY KEY, title TEXT, description TEXT, priority TEXT, status TEXT,
+    assigned_to INTEGER, project_id INTEGER, created_date DATE, due_date DATE
+);
+
+INSERT INTO employees (name, email, department, salary, hire_date, is_active)
+SELECT 'Employee ' || g, 'e' || g || '@company.com', 'Dept' || (g % 500),
+       80000 + g % 20000, DATE '2020-01-01' + g % 1500, TRUE
+FROM generate_series(1, {{rows}}) g;
+UPDATE employees SET department = 'AI' WHERE id % 1000 = 0;
+
+INSERT INTO projects (name, description, status, start_date, end_date, budget, lead_id)
+SELECT 'Project ' || g, 'Description ' || g,
+       CASE WHEN g % 100 = 0 THEN 'In Progress' WHEN g % 2 = 0 THEN 'Completed' ELSE 'Archived' END,
+       DATE '2023-01-01', DATE '2024-01-01', 100000 + g % 50000, g % 1000 + 1
+FROM generate_series(1, {{rows}}) g;
+
+INSERT INTO issues (title, description, priority, status, assigned_to, project_id, created_date, due_date)
+SELECT 'Issue ' || g, 'Description ' || g,
+       CASE WHEN g % 200 = 0 THEN 'Critical' WHEN g % 3 = 0 THEN 'Medium' ELSE 'Low' END,
+       'Open', g % 1000 + 1, g % 1000 + 1, DATE '2024-01-01', DATE '2024-02-01'
+FROM generate_series(1, {{rows}}) g;
+
+ANALYZE employees;
+ANALYZE projects;
+ANALYZE issues;
+"""
+
+INDEXES_FILE = "datas_insert/tool_indexes.sql"
+
+LOOKUPS = {
+    "employees_by_department": ("AI",),
+    "projects_by_status": ("In Progress",),
+    "issues_by_priority": ("Critical",),
+}
+
+
+def explain(cursor, name, params):
+    cursor.execute(f"PREPARE {name}_bench AS {_prepared_text(PREPARED_STATEMENTS[name])}")
+    placeholders = ", ".join(["%s"] * (len(params) + 1))
+    cursor.execute(
+        f"EXPLAIN (ANALYZE, FORMAT JSON) EXECUTE {name}_bench ({placeholders})",
+        (*params, 10001)
+    )
+    plan = cursor.fetchone()[0][0]
+    cursor.execute(f"DEALLOCATE {name}_bench")
+
+    node = plan["Plan"]
+    while node.get("Plans") and node["Node Type"] in ("Limit", "Gather"):
+        node = node["Plans"][0]
+    return node["Node Type"], plan["Execution Time"]
+
+
+def report(cursor, label):
+    print(label)
+    for name, params in LOOKUPS.items():
+        node, ms = explain(cursor, name, params)
+        print(f"  {name:<26} {node:<18} {ms:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with get_db_connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                start = time.perf_counter()
+                cursor.execute(SETUP.replace("{rows}", str(args.rows)))
+                print(f"Seeded {args.rows:,} rows per table in {time.perf_counter() - start:.1f}s\n")
+
+                report(cursor, "Without expression indexes:")
+                with open(INDEXES_FILE) as f:
+                    cursor.execute(f.read())
+                report(cursor, "With expression indexes:")
+        finally:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.autocommit = False
+    shutdown_db()
+
+
+if __name__ == "__main__":
+    main()
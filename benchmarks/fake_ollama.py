@@ -0,0 +1,129 @@
+"""
+Minimal stand-in for Ollama's /api/generate endpoint.
+
+Answers with the mock provider's responses after a configurable delay, so the
+HTTP path of LLMProvider can be exercised without a real model. With
+"stream": true the answer is sent as NDJSON chunks, one word per
+--token-latency, like Ollama does.
+
+Prompt evaluation is simulated too: each request costs --prompt-token-latency
+per prompt token (4 chars), except for the leading part it shares with the
+previous prompt, which Ollama serves from its KV cache while the model stays
+loaded (keep_alive "0" unloads it). prompt_eval_count / prompt_eval_duration are reported as Ollama does.
+
+Run standalone:
+    python -m benchmarks.fake_ollama --port 11434 --latency 0.5 --token-latency 0.05
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.agents.llm_provider import LLMProvider
+
+_mock = LLMProvider(provider="mock")
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive + chunked streaming
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    latency = 0.5
+    token_latency = 0.0
+    prompt_token_latency = 0.0
+    cache = None  # {"prompt": last prompt, "lock": Lock} shared by the server
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        prompt = body.get("prompt", "")
+
+        eval_tokens, eval_seconds = self._prompt_eval(prompt)
+        if body.get("keep_alive") in (0, "0"):
+            self.cache["prompt"] = ""  # model unloaded right after the request
+        time.sleep(self.latency + eval_seconds)
+        text = _mock._mock_response(prompt)
+        self.eval_stats = {
+            "prompt_eval_count": eval_tokens,
+            "prompt_eval_duration": int(eval_seconds * 1e9),
+        }
+
+        if body.get("stream", True):
+            self._stream(body, text)
+            return
+
+        payload = json.dumps({
+            "model": body.get("model", "fake"),
+            "response": text,
+            "done": True,
+            **self.eval_stats,
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            token = word if i == len(words) - 1 else word + " "
+            self._write_chunk({"model": body.get("model", "fake"), "response": token, "done": False})
+            time.sleep(self.token_latency)
+        self._write_chunk({"model": body.get("model", "fake"), "response": "", "done": True, **self.eval_stats})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _prompt_eval(self, prompt):
+        with self.cache["lock"]:
+            previous, self.cache["prompt"] = self.cache["prompt"], prompt
+        shared = 0
+        for a, b in zip(previous, prompt):
+            if a != b:
+                break
+            shared += 1
+        tokens = (len(prompt) - shared) // 4 + 1
+        return tokens, tokens * self.prompt_token_latency
+
+    def _write_chunk(self, obj):
+        line = json.dumps(obj).encode() + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+
+def start_fake_ollama(latency: float = 0.5, port: int = 0, token_latency: float = 0.0,
+                      prompt_token_latency: float = 0.0):
+    """Start the server on a daemon thread. Returns (server, generate_url)."""
+    handler = type("Handler", (FakeOllamaHandler,), {
+        "latency": latency,
+        "token_latency": token_latency,
+        "prompt_token_latency": prompt_token_latency,
+        "cache": {"prompt": "", "lock": threading.Lock()},
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_fake_ollama(args.latency, args.port, args.token_latency, args.prompt_token_latency)
+    print(f"Fake Ollama listening on {url} (latency={args.latency}s)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,198 @@
+-- Summary tables behind the aggregate tools (get_department_stats,
+-- get_project_stats, get_issue_stats).
+--
+-- Run after table_versions.sql:
+--   psql -U postgres -d mcp_db -f datas_insert/aggregates.sql
+--
+-- Note:
+-- - One row per group, kept current by statement-level triggers on the base
+--   tables: each write statement folds its transition tables (old/new rows,
+--   grouped) into the counts and sums, in the same transaction. Reading an
+--   aggregate costs the same whatever the size of the base table.
+-- - Only counts and sums are stored; averages are derived when read.
+--   (Min/max can't be maintained on DELETE without rescanning the group.)
+-- - Writers touching the same group serialize on its summary row.
+-- - NULL statuses/priorities are grouped under 'Unspecified'.
+-- - Safe to re-run: the summary tables are rebuilt from the base tables.
+
+CREATE TABLE IF NOT EXISTS department_stats (
+    department VARCHAR(50) PRIMARY KEY,
+    employee_count BIGINT NOT NULL DEFAULT 0,
+    active_count BIGINT NOT NULL DEFAULT 0,
+    salary_count BIGINT NOT NULL DEFAULT 0, -- employees with a salary, for the average
+    salary_sum NUMERIC NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS project_stats (
+    status VARCHAR(20) PRIMARY KEY,
+    project_count BIGINT NOT NULL DEFAULT 0,
+    budget_count BIGINT NOT NULL DEFAULT 0,
+    budget_sum NUMERIC NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS issue_stats (
+    priority VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    issue_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (priority, status)
+);
+
+-- sign = 1 adds the rows of a transition table, -1 removes them
+CREATE OR REPLACE FUNCTION apply_department_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO department_stats AS s
+        SELECT department, -COUNT(*), -COUNT(*) FILTER (WHERE is_active),
+               -COUNT(salary), -COALESCE(SUM(salary), 0)
+        FROM old_rows GROUP BY department
+        ON CONFLICT (department) DO UPDATE SET
+            employee_count = s.employee_count + EXCLUDED.employee_count,
+            active_count = s.active_count + EXCLUDED.active_count,
+            salary_count = s.salary_count + EXCLUDED.salary_count,
+            salary_sum = s.salary_sum + EXCLUDED.salary_sum;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO department_stats AS s
+        SELECT department, COUNT(*), COUNT(*) FILTER (WHERE is_active),
+               COUNT(salary), COALESCE(SUM(salary), 0)
+        FROM new_rows GROUP BY department
+        ON CONFLICT (department) DO UPDATE SET
+            employee_count = s.employee_count + EXCLUDED.employee_count,
+            active_count = s.active_count + EXCLUDED.active_count,
+            salary_count = s.salary_count + EXCLUDED.salary_count,
+            salary_sum = s.salary_sum + EXCLUDED.salary_sum;
+    END IF;
+    DELETE FROM department_stats WHERE employee_count = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION apply_project_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO project_stats AS s
+        SELECT COALESCE(status, 'Unspecified'), -COUNT(*), -COUNT(budget), -COALESCE(SUM(budget), 0)
+        FROM old_rows GROUP BY 1
+        ON CONFLICT (status) DO UPDATE SET
+            project_count = s.project_count + EXCLUDED.project_count,
+            budget_count = s.budget_count + EXCLUDED.budget_count,
+            budget_sum = s.budget_sum + EXCLUDED.budget_sum;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO project_stats AS s
+        SELECT COALESCE(status, 'Unspecified'), COUNT(*), COUNT(budget), COALESCE(SUM(budget), 0)
+        FROM new_rows GROUP BY 1
+        ON CONFLICT (status) DO UPDATE SET
+            project_count = s.project_count + EXCLUDED.project_count,
+            budget_count = s.budget_count + EXCLUDED.budget_count,
+            budget_sum = s.budget_sum + EXCLUDED.budget_sum;
+    END IF;
+    DELETE FROM project_stats WHERE project_count = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION apply_issue_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO issue_stats AS s
+        SELECT COALESCE(priority, 'Unspecified'), COALESCE(status, 'Unspecified'), -COUNT(*)
+        FROM old_rows GROUP BY 1, 2
+        ON CONFLICT (priority, status) DO UPDATE SET issue_count = s.issue_count + EXCLUDED.issue_count;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO issue_stats AS s
+        SELECT COALESCE(priority, 'Unspecified'), COALESCE(status, 'Unspecified'), COUNT(*)
+        FROM new_rows GROUP BY 1, 2
+        ON CONFLICT (priority, status) DO UPDATE SET issue_count = s.issue_count + EXCLUDED.issue_count;
+    END IF;
+    DELETE FROM issue_stats WHERE issue_count = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TRUNCATE has no transition tables: empty the summary as well
+CREATE OR REPLACE FUNCTION clear_stats() RETURNS trigger AS $$
+BEGIN
+    EXECUTE format('TRUNCATE %I', TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+BEGIN;
+
+-- No writes between the rebuild and the triggers taking over
+LOCK TABLE employees, projects, issues IN SHARE ROW EXCLUSIVE MODE;
+
+-- A trigger can only have transition tables for one event, hence three each
+DO $$
+DECLARE
+    t TEXT;
+    stats TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['employees', 'projects', 'issues'] LOOP
+        stats := CASE t WHEN 'employees' THEN 'department_stats'
+                        WHEN 'projects' THEN 'project_stats'
+                        ELSE 'issue_stats' END;
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_stats_insert', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_stats_update', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_stats_delete', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_stats_truncate', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+            t || '_stats_insert', t, 'apply_' || stats
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER UPDATE ON %I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+            t || '_stats_update', t, 'apply_' || stats
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+            t || '_stats_delete', t, 'apply_' || stats
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER TRUNCATE ON %I FOR EACH STATEMENT EXECUTE FUNCTION clear_stats(%L)',
+            t || '_stats_truncate', t, stats
+        );
+    END LOOP;
+END;
+$$;
+
+TRUNCATE department_stats, project_stats, issue_stats;
+
+INSERT INTO department_stats
+SELECT department, COUNT(*), COUNT(*) FILTER (WHERE is_active), COUNT(salary), COALESCE(SUM(salary), 0)
+FROM employees GROUP BY department;
+
+INSERT INTO project_stats
+SELECT COALESCE(status, 'Unspecified'), COUNT(*), COUNT(budget), COALESCE(SUM(budget), 0)
+FROM projects GROUP BY 1;
+
+INSERT INTO issue_stats
+SELECT COALESCE(priority, 'Unspecified'), COALESCE(status, 'Unspecified'), COUNT(*)
+FROM issues GROUP BY 1, 2;
+
+-- The summaries are cached like any table (see table_versions.sql)
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    IF to_regclass('table_versions') IS NULL THEN
+        RETURN;
+    END IF;
+    FOREACH t IN ARRAY ARRAY['department_stats', 'project_stats', 'issue_stats'] LOOP
+        INSERT INTO table_versions (table_name) VALUES (t) ON CONFLICT DO NOTHING;
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_version', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()',
+            t || '_version', t
+        );
+    END LOOP;
+END;
+$$;
+
+COMMIT;
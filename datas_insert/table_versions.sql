@@ -0,0 +1,41 @@
+-- Table version counters for the API's result cache.
+--
+-- Run after sample_data.sql:
+--   psql -U postgres -d mcp_db -f datas_insert/table_versions.sql
+--
+-- Note:
+-- - Every write to a tracked table bumps its version in the same transaction,
+--   so cached results are invalidated the moment the write commits.
+-- - A NOTIFY on 'table_changed' is also sent for anything that wants to listen.
+-- - Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1;
+    PERFORM pg_notify('table_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level triggers: one bump per write statement, not per row
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['employees', 'projects', 'issues'] LOOP
+        INSERT INTO table_versions (table_name) VALUES (t) ON CONFLICT DO NOTHING;
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_version', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()',
+            t || '_version', t
+        );
+    END LOOP;
+END;
+$$;
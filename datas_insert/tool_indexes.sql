@@ -0,0 +1,24 @@
+-- Expression indexes for the fixed MCP tools.
+--
+-- Run after sample_data.sql:
+--   psql -U postgres -d mcp_db -f datas_insert/tool_indexes.sql
+--
+-- Note:
+-- - The tools filter with LOWER(column) = LOWER($1) (case-insensitive match),
+--   which a plain index on the column can't serve. These index LOWER(column)
+--   itself, so the prepared statements can use an index scan.
+-- - id is the second key so a paged lookup (WHERE ... AND id > $last
+--   ORDER BY id LIMIT n) is a single index range scan at any depth.
+-- - Safe to re-run; replaces the earlier single-column indexes.
+
+DROP INDEX IF EXISTS idx_employees_lower_department;
+DROP INDEX IF EXISTS idx_projects_lower_status;
+DROP INDEX IF EXISTS idx_issues_lower_priority;
+
+CREATE INDEX IF NOT EXISTS idx_employees_lower_department_id ON employees (LOWER(department), id);
+CREATE INDEX IF NOT EXISTS idx_projects_lower_status_id ON projects (LOWER(status), id);
+CREATE INDEX IF NOT EXISTS idx_issues_lower_priority_id ON issues (LOWER(priority), id);
+
+ANALYZE employees;
+ANALYZE projects;
+ANALYZE issues;
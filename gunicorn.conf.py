@@ -0,0 +1,27 @@
+"""
+Gunicorn settings for the Docker image (workers come from WEB_CONCURRENCY).
+
+The hooks keep Prometheus multiprocess mode (PROMETHEUS_MULTIPROC_DIR) honest:
+the directory holds one file per worker pid, so files left by a previous run
+or by a dead worker would otherwise keep being added into /metrics - e.g. the
+DB pool "in use" gauges of workers that no longer exist.
+"""
+import os
+import shutil
+
+bind = "0.0.0.0:8000"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def on_starting(server):
+    # Master, before any worker starts: drop the previous run's files
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,36 @@
+import pytest
+
+from app.agents.intent_router import IntentRouter
+from app.agents.planner_agent import PlannerAgent
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter(PlannerAgent(llm=None).tools_schema, threshold=0.5)
+
+
+@pytest.mark.parametrize("query, tool, parameters", [
+    ("who is working in backend?", "get_employees_by_department", {"department": "Backend"}),
+    ("average salary in the AI department", "get_department_stats", {"department": "AI"}),
+    ("which projects are completed right now", "get_projects_by_status", {"status": "Completed"}),
+])
+def test_routes(router, query, tool, parameters):
+    plan = router.route(query)
+    assert plan is not None
+    assert (plan["tool"], plan["parameters"]) == (tool, parameters)
+
+
+@pytest.mark.parametrize("query", [
+    # Constraints the routed tool has no parameter for
+    "projects in progress led by Alice",
+    "employees in AI hired this year",
+    "AI employees named John",
+    "high priority issues created yesterday",
+    "average salary in AI of inactive people",
+    # Negation and other tables
+    "employees not in Backend",
+    "issues assigned to employees in Backend",
+    "what is the weather today",
+])
+def test_falls_back_to_planner(router, query):
+    assert router.route(query) is None
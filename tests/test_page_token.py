@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from app.utils.page_token import decode_page_token, encode_page_token
+
+
+def test_round_trip():
+    state = {"plan": {"tool": "get_all_employees", "args": {}}, "after": 42}
+    assert decode_page_token(encode_page_token(state)) == state
+
+
+def test_tampered_payload_is_rejected():
+    token = encode_page_token({"after": 1})
+    payload, signature = token.split(".")
+    other = encode_page_token({"after": 2}).split(".")[0]
+
+    with pytest.raises(ValueError, match="Invalid"):
+        decode_page_token(f"{other}.{signature}")
+    with pytest.raises(ValueError, match="Invalid"):
+        decode_page_token(payload)
+    with pytest.raises(ValueError, match="Invalid"):
+        decode_page_token(f"{payload}.{signature[:-2]}AA")
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    token = encode_page_token({"after": 1})
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + 10 ** 7)
+
+    with pytest.raises(ValueError, match="expired"):
+        decode_page_token(token)
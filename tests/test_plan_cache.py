@@ -0,0 +1,38 @@
+from app.agents.plan_cache import PlanCache, extract_slots
+
+
+def test_extract_slots_replaces_literals():
+    shape, slots = extract_slots("Show me employees in the AI department")
+    assert shape == "employees <department> department"
+    assert slots == {"department": "AI"}
+
+
+def test_extract_slots_numbers_and_multi_word_values():
+    shape, slots = extract_slots("Projects in progress with a budget over 150,000")
+    assert slots == {"status": "In Progress", "number0": "150000"}
+    assert "<status>" in shape and "<number0>" in shape
+
+
+def test_template_round_trip_fills_new_values():
+    cache = PlanCache()
+    cache.put("employees in AI", {"tool": "get_employees_by_department", "args": {"department": "AI"}})
+
+    plan = cache.get("employees in Backend")
+    assert plan == {"tool": "get_employees_by_department", "args": {"department": "Backend"}}
+
+
+def test_slot_missing_from_plan_is_keyed_on_literal_values():
+    cache = PlanCache()
+    cache.put("employees in AI", {"tool": "get_all_employees", "args": {}})
+
+    assert cache.get("employees in AI") == {"tool": "get_all_employees", "args": {}}
+    assert cache.get("employees in Backend") is None
+
+
+def test_ambiguous_number_is_not_templated():
+    cache = PlanCache()
+    # 10 is both the threshold and the LIMIT: can't tell which to replace
+    cache.put("top 10 issues", {"sql": "SELECT * FROM issues WHERE id > 10 LIMIT 10"})
+
+    assert cache.get("top 20 issues") is None
+    assert cache.get("top 10 issues") == {"sql": "SELECT * FROM issues WHERE id > 10 LIMIT 10"}
@@ -0,0 +1,26 @@
+import pytest
+
+from app.database.result_cache import referenced_tables
+
+
+@pytest.mark.parametrize("query, tables", [
+    ("SELECT * FROM employees", {"employees"}),
+    ("SELECT * FROM public.employees e, projects p WHERE e.id = p.lead_id", {"employees", "projects"}),
+    ("SELECT e.name FROM employees e JOIN issues i ON i.assignee_id = e.id", {"employees", "issues"}),
+    ("SELECT * FROM (SELECT * FROM issues) AS i", {"issues"}),
+    ("SELECT * FROM projects WHERE lead_id IN (SELECT id FROM employees)", {"projects", "employees"}),
+])
+def test_tables(query, tables):
+    assert referenced_tables(query) == tables
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT 1",
+    # The tables of a parenthesized join aren't listed
+    "SELECT * FROM (employees e JOIN projects p ON p.lead_id = e.id)",
+    "SELECT * FROM employees WHERE hire_date > now() - interval '1 year'",
+    "SELECT name, age(hire_date) FROM employees",
+    "SELECT * FROM issues WHERE created_at > CURRENT_DATE",
+])
+def test_uncacheable(query):
+    assert referenced_tables(query) is None
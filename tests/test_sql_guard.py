@@ -0,0 +1,78 @@
+import pytest
+
+from app.core.config import settings
+from app.database.db_executor import QueryRejected, guard_untrusted_sql
+
+
+class FakeConnection:
+    """Records what the guard executes and answers EXPLAIN with a canned plan."""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+
+    def fetchone(self):
+        return ([{"Plan": self.plan}],)
+
+
+def node(node_type, cost=10.0, rows=10, *children):
+    plan = {"Node Type": node_type, "Total Cost": cost, "Plan Rows": rows}
+    if children:
+        plan["Plans"] = list(children)
+    return plan
+
+
+def limited(inner):
+    return node("Limit", inner["Total Cost"], min(inner["Plan Rows"], 1001), inner)
+
+
+def test_query_is_wrapped_not_appended():
+    conn = FakeConnection(limited(node("Seq Scan")))
+    query = guard_untrusted_sql(conn, "SELECT * FROM employees -- all of them;", max_rows=1000)
+
+    # A trailing comment would swallow an appended LIMIT
+    assert query == "SELECT * FROM (\nSELECT * FROM employees -- all of them\n) AS _q LIMIT 1001"
+    assert conn.executed[0] == "SET LOCAL transaction_read_only = on"
+    assert conn.executed[-1] == f"EXPLAIN (FORMAT JSON) {query}"
+
+
+def test_subquery_limit_does_not_replace_ours():
+    conn = FakeConnection(limited(node("Seq Scan")))
+    query = guard_untrusted_sql(conn, "SELECT * FROM (SELECT * FROM issues LIMIT 5) i, employees", max_rows=1000)
+    assert query.endswith(") AS _q LIMIT 1001")
+
+
+def test_too_expensive_is_rejected():
+    conn = FakeConnection(limited(node("Nested Loop", cost=settings.SQL_GUARD_MAX_COST * 2)))
+    with pytest.raises(QueryRejected) as rejected:
+        guard_untrusted_sql(conn, "SELECT * FROM employees, issues")
+    assert rejected.value.code == "query_too_expensive"
+
+
+def test_own_limit_over_max_rows_is_rejected():
+    rows = settings.SQL_GUARD_MAX_ROWS * 2
+    own_limit = node("Limit", 10.0, rows, node("Seq Scan", 10.0, rows))
+    conn = FakeConnection(limited(node("Subquery Scan", 10.0, rows, own_limit)))
+
+    with pytest.raises(QueryRejected) as rejected:
+        guard_untrusted_sql(conn, f"SELECT * FROM issues LIMIT {rows}")
+    assert rejected.value.code == "result_too_large"
+    assert rejected.value.to_error()["estimated_rows"] == rows
+
+
+def test_large_result_without_own_limit_is_capped_not_rejected():
+    rows = settings.SQL_GUARD_MAX_ROWS * 2
+    conn = FakeConnection(limited(node("Seq Scan", 10.0, rows)))
+    assert guard_untrusted_sql(conn, "SELECT * FROM issues", max_rows=1000).endswith("LIMIT 1001")